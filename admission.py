@@ -0,0 +1,84 @@
+import asyncio
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# ==========================================
+# WORKER POOLS + ADMISSION CONTROL
+# ==========================================
+# Async handlers hand blocking work to a sized pool instead of Starlette's
+# shared threadpool, so slow model calls and CPU-bound search never queue
+# behind each other. Each pool admits at most max_pending requests
+# (running + queued); past that the caller gets Overloaded and api.py
+# answers 429 with a Retry-After estimated from the queue and the recent
+# service time, instead of letting latency grow without bound.
+
+
+class Overloaded(Exception):
+    def __init__(self, pool, retry_after):
+        super().__init__(f"{pool} pool is full, retry after {retry_after}s")
+        self.pool = pool
+        self.retry_after = retry_after
+
+
+class AdmissionGate:
+    """
+    Counts requests in flight for one kind of work. Only touched from the
+    event loop thread, so no lock is needed.
+    workers: how many of them make progress at once (for Retry-After).
+    """
+
+    def __init__(self, name, max_pending, workers=1):
+        self.name = name
+        self.max_pending = max_pending
+        self.workers = max(1, workers)
+        self.pending = 0
+        self.rejected = 0
+        self.service_time = 0.01   # EWMA seconds per request
+
+    def retry_after(self):
+        return max(1, math.ceil(self.pending * self.service_time / self.workers))
+
+    def enter(self):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise Overloaded(self.name, self.retry_after())
+        self.pending += 1
+        return time.perf_counter()
+
+    def exit(self, started):
+        self.pending -= 1
+        self.service_time = 0.9 * self.service_time + 0.1 * (time.perf_counter() - started)
+
+    async def wait(self, submit):
+        """
+        Runs submit() (e.g. lambda: batcher.submit(item)) once admitted and
+        awaits the concurrent.futures.Future it returns. Rejected requests
+        are never submitted, so the work behind the gate stays bounded.
+        """
+        started = self.enter()
+        try:
+            return await asyncio.wrap_future(submit())
+        finally:
+            self.exit(started)
+
+    def stats(self):
+        return {"pending": self.pending, "max_pending": self.max_pending, "workers": self.workers,
+                "rejected": self.rejected, "service_ms": round(self.service_time * 1000, 3)}
+
+
+class WorkerPool(AdmissionGate):
+    """
+    Dedicated thread pool behind an admission gate.
+    """
+
+    def __init__(self, name, workers, max_pending):
+        super().__init__(name, max_pending, workers)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+
+    async def run(self, fn, *args):
+        started = self.enter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.exit(started)
@@ -1,137 +1,627 @@
-import os
-# Force Legacy Keras for TensorFlow Recommenders
-os.environ["TF_USE_LEGACY_KERAS"] = "1"
-
-import tensorflow as tf
-from fastapi import FastAPI
-from pydantic import BaseModel
-import pandas as pd
-import numpy as np
-
-app = FastAPI()
-
-# ==========================================
-# 1. LOAD DATABASE (Robustly)
-# ==========================================
-try:
-    # Read as string to avoid type errors
-    movie_db = pd.read_csv("movies.csv", dtype=str)
-    
-    # CRITICAL: Fill empty values so the server doesn't crash on filter
-    movie_db.fillna("", inplace=True)
-    
-    print(f"✅ Loaded Movie DB: {len(movie_db)} movies.")
-except Exception as e:
-    print(f"⚠️ CSV Error: {e}")
-    movie_db = pd.DataFrame(columns=["title", "genre", "rating", "poster_path"])
-
-# ==========================================
-# 2. LOAD AI MODEL
-# ==========================================
-MODEL_PATH = os.path.join(os.getcwd(), "my_model")
-serving_fn = None
-try:
-    loaded_obj = tf.saved_model.load(MODEL_PATH)
-    serving_fn = loaded_obj.signatures["serving_default"]
-    print("✅ AI Brain Loaded")
-except:
-    print("⚠️ AI Brain not found (Running in Fallback Mode)")
-
-# ==========================================
-# 3. HELPER FUNCTIONS
-# ==========================================
-def get_movie_details(title_list):
-    """
-    Takes a list of titles (from AI) and finds their posters in our Real DB.
-    """
-    results = []
-    for title in title_list:
-        clean_title = title.strip()
-        # Case-insensitive search
-        match = movie_db[movie_db['title'].str.lower() == clean_title.lower()]
-        
-        if not match.empty:
-            row = match.iloc[0]
-            results.append({
-                "title": row['title'],
-                "poster_path": row['poster_path'],
-                "rating": f"{row['rating']}% Match"
-            })
-    return results
-
-# ==========================================
-# 4. API ENDPOINTS
-# ==========================================
-class UserRequest(BaseModel):
-    user_id: str
-
-class SearchRequest(BaseModel):
-    query: str
-    genre: str = "All"
-
-@app.get("/")
-def home():
-    return {"status": "Online", "movies_loaded": len(movie_db)}
-
-@app.post("/recommend")
-def recommend(req: UserRequest):
-    ai_picks_data = []
-    
-    # A. Try AI Prediction
-    if serving_fn:
-        try:
-            input_tensor = tf.constant([req.user_id])
-            try:
-                preds = serving_fn(input_tensor)
-            except:
-                key = list(serving_fn.structured_input_signature[1].keys())[0]
-                preds = serving_fn(**{key: input_tensor})
-            
-            for k in preds:
-                if preds[k].dtype.kind in {'S', 'U', 'O'}:
-                    raw = preds[k].numpy()[0]
-                    titles = [t.decode('utf-8') for t in raw]
-                    
-                    # Convert AI Titles -> Real Objects with Posters
-                    ai_picks_data = get_movie_details(titles)
-                    break
-        except Exception as e:
-            print(f"AI Prediction Error: {e}")
-
-    # B. If AI returns < 4 movies (because our 2025 DB doesn't have 1998 movies),
-    # FILL the rest with Trending movies so the UI looks full.
-    if len(ai_picks_data) < 4:
-        needed = 8 - len(ai_picks_data)
-        if not movie_db.empty:
-            trending = movie_db.sample(n=min(needed, len(movie_db))).to_dict(orient="records")
-            for m in trending:
-                ai_picks_data.append({
-                    "title": m['title'],
-                    "poster_path": m['poster_path'],
-                    "rating": f"{m['rating']}% Match"
-                })
-
-    return {"movies": ai_picks_data[:8]}
-
-@app.post("/search")
-def search_movies(req: SearchRequest):
-    df = movie_db.copy()
-    
-    # 1. Keyword Search
-    if req.query:
-        df = df[df['title'].str.contains(req.query, case=False, na=False)]
-    
-    # 2. Genre Filter
-    if req.genre != "All":
-        df = df[df['genre'].str.contains(req.genre, case=False, na=False)]
-    
-    # 3. Format Output
-    results = []
-    for _, row in df.head(12).iterrows():
-        results.append({
-            "title": row['title'],
-            "poster_path": row['poster_path'],
-            "rating": f"{row['rating']}%"
-        })
-        
-    return {"results": results}
\ No newline at end of file
+import os
+import json
+import asyncio
+import hashlib
+import threading
+from time import perf_counter
+from typing import Annotated
+IMPORT_START = perf_counter()
+# Force Legacy Keras for TensorFlow Recommenders
+os.environ["TF_USE_LEGACY_KERAS"] = "1"
+
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+
+from catalog import TitleIndex, load_catalog, row_tuples
+from search_index import SORTS, SearchIndex
+from batcher import MicroBatcher
+from model_registry import ModelRegistry
+from rec_cache import RecommendationCache
+from trending import BACKFILL_MODES, TrendingIndex
+from metrics import metrics
+from admission import AdmissionGate, Overloaded, WorkerPool
+from serving_cache import cache_key, load_indexes, save_indexes
+
+app = FastAPI()
+
+# ==========================================
+# 1. LOAD DATABASE (Robustly, in the background)
+# ==========================================
+# Importing api.py only sets things up; the catalog, its indexes and the
+# model are loaded by load() on a background thread, so uvicorn accepts
+# connections within a second. Until then:
+#   /healthz  200 as soon as the event loop runs (liveness)
+#   /readyz   503 until everything below is loaded (readiness)
+#   /search   503 + Retry-After until the catalog + search index are in
+#   /recommend, /feed  503 until the title/trending indexes are in, then
+#             trending picks (fallback mode) until the model is live
+# API_EAGER_LOAD=1 loads during import instead; serve.py calls load()
+# itself before forking its workers.
+# Prefer the compiled, memory-mapped catalog (`python catalog.py compile`);
+# it is shared between workers. Otherwise read the CSV as strings.
+CATALOG_PATH = os.path.join(os.getcwd(), "movies_catalog")
+EAGER_LOAD = os.getenv("API_EAGER_LOAD", "0") == "1"
+# Built indexes are pickled here and reused while the catalog is unchanged
+# (see serving_cache.py); empty disables.
+SERVING_CACHE_DIR = os.getenv("SERVING_CACHE_DIR", "")
+
+# Trending pools (overall + per genre) for topping up thin AI results.
+# RECOMMEND_BACKFILL: "trending", or "genre" to fill from the AI picks' main genre
+BACKFILL = os.getenv("RECOMMEND_BACKFILL", "trending")
+if BACKFILL not in BACKFILL_MODES:
+    raise ValueError(f"RECOMMEND_BACKFILL must be one of {BACKFILL_MODES}")
+
+# Filled in by load(); handlers check the events before touching them
+movie_db = []
+movie_rows = []
+title_index = search_index = trending = None
+catalog_version = ""                # fingerprint of the catalog files (feed ETags)
+search_ready = threading.Event()    # catalog + search index
+catalog_ready = threading.Event()   # + title and trending indexes
+loaded = threading.Event()          # + model (or fallback mode if there is none)
+startup_seconds = {}                # stage -> seconds, served on /readyz
+startup_error = None
+
+def load_database():
+    global movie_db, movie_rows, title_index, search_index, trending, catalog_version
+    start = perf_counter()
+    try:
+        movie_db = load_catalog("movies.csv", CATALOG_PATH)
+        catalog_version = cache_key("movies.csv", CATALOG_PATH)
+        
+        print(f"✅ Loaded Movie DB: {len(movie_db)} movies.")
+    except Exception as e:
+        print(f"⚠️ CSV Error: {e}")
+        import pandas as pd
+        movie_db = pd.DataFrame(columns=["title", "genre", "rating", "poster_path"])
+
+    # (title, poster_path, rating) per row for formatting responses
+    movie_rows = row_tuples(movie_db)
+    startup_seconds["catalog"] = round(perf_counter() - start, 3)
+
+    start = perf_counter()
+    key = cache_key("movies.csv", CATALOG_PATH, backfill=BACKFILL) if SERVING_CACHE_DIR else None
+    cached = load_indexes(SERVING_CACHE_DIR, key, movie_rows) if key else None
+    if cached:
+        search_index, title_index, trending = cached["search"], cached["title"], cached["trending"]
+        search_ready.set()
+        startup_seconds["indexes_cached"] = round(perf_counter() - start, 3)
+        print(f"✅ Indexes loaded from {SERVING_CACHE_DIR}")
+        return
+
+    # /search first: trigram/genre index
+    search_index = SearchIndex(movie_db, index_overview=True)
+    search_ready.set()
+    startup_seconds["search_index"] = round(perf_counter() - start, 3)
+
+    start = perf_counter()
+    # Build the title index once so /recommend never scans the whole DB
+    title_index = TitleIndex(movie_db, rows=movie_rows)
+    trending = TrendingIndex(movie_db, movie_rows)
+    startup_seconds["indexes"] = round(perf_counter() - start, 3)
+    if key and len(movie_db):
+        try:
+            save_indexes(SERVING_CACHE_DIR, key, movie_rows,
+                         {"search": search_index, "title": title_index, "trending": trending})
+        except Exception as e:
+            print(f"⚠️ Serving cache not written: {e}")
+
+# ==========================================
+# 2. LOAD AI MODEL
+# ==========================================
+# "numpy" serves the exported embeddings without importing TensorFlow,
+# "tf" the SavedModel, "auto" prefers numpy when the export exists.
+# Either way the import happens inside load(), off the startup path.
+RETRIEVAL_BACKEND = os.getenv("RETRIEVAL_BACKEND", "auto")
+# Optional override of the index saved with the embeddings ("brute" / "ivfpq")
+RETRIEVAL_INDEX = os.getenv("RETRIEVAL_INDEX") or None
+RETRIEVAL_N_PROBE = int(os.getenv("RETRIEVAL_N_PROBE", "0")) or None
+
+# Handlers are async; blocking work goes to dedicated pools (see section 3).
+# INFERENCE_WORKERS model calls run at once, so TF's own thread pools are
+# sized to share the cores between them instead of oversubscribing.
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "1"))
+INFERENCE_MAX_PENDING = int(os.getenv("INFERENCE_MAX_PENDING", "256"))
+SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", "2"))
+SEARCH_MAX_PENDING = int(os.getenv("SEARCH_MAX_PENDING", "128"))
+os.environ.setdefault("TF_INTRA_OP_THREADS", str(max(1, (os.cpu_count() or 1) // INFERENCE_WORKERS)))
+os.environ.setdefault("TF_INTER_OP_THREADS", str(INFERENCE_WORKERS))
+
+# Versioned models (`python model_registry.py publish`) are picked up and
+# swapped in without a restart; with no versions, my_model/ + my_embeddings/
+# next to api.py are served as version "local".
+MODELS_DIR = os.getenv("MODELS_DIR", os.path.join(os.getcwd(), "models"))
+MODEL_POLL_SECONDS = float(os.getenv("MODEL_POLL_SECONDS", "10"))
+registry = ModelRegistry(MODELS_DIR, fallback_path=os.getcwd(), backend=RETRIEVAL_BACKEND,
+                         index=RETRIEVAL_INDEX, n_probe=RETRIEVAL_N_PROBE,
+                         poll_seconds=MODEL_POLL_SECONDS)
+
+def load_model():
+    if registry.load_latest():
+        print(f"✅ AI Brain Loaded (model {registry.version})")
+        startup_seconds["model_load"] = round(registry.last_load_seconds - registry.last_warm_seconds, 3)
+        startup_seconds["model_warmup"] = registry.last_warm_seconds
+    else:
+        print("⚠️ AI Brain not found (Running in Fallback Mode until a model is published)")
+
+def load():
+    """
+    Catalog, indexes, then the model. Idempotent; the events above flip as
+    each part becomes servable.
+    """
+    global startup_error
+    if loaded.is_set():
+        return
+    start = perf_counter()
+    try:
+        load_database()
+        catalog_ready.set()
+        load_model()
+    except Exception as e:
+        # /healthz turns 500 so the orchestrator restarts the process
+        startup_error = f"{type(e).__name__}: {e}"
+        print(f"⚠️ Startup failed: {startup_error}")
+        raise
+    startup_seconds["load"] = round(perf_counter() - start, 3)
+    loaded.set()
+    print(f"✅ Ready in {perf_counter() - IMPORT_START:.1f}s")
+
+# Micro-batching: concurrent /recommend calls share one serving call
+MAX_BATCH_SIZE = int(os.getenv("RECOMMEND_MAX_BATCH_SIZE", "64"))
+MAX_WAIT_US = int(os.getenv("RECOMMEND_MAX_WAIT_US", "2000"))
+# /recommend/batch is one inference-pool task however many users it names,
+# so admission control only bounds the work if the list is bounded too
+BATCH_MAX_USERS = 1000
+
+# Per-user cache of the final /recommend payload (LRU + TTL, per model version)
+CACHE_SIZE = int(os.getenv("RECOMMEND_CACHE_SIZE", "10000"))
+CACHE_TTL = float(os.getenv("RECOMMEND_CACHE_TTL", "600"))
+CACHE_WARMUP = os.getenv("RECOMMEND_CACHE_WARMUP", "0") == "1"
+
+# Per-stage latency histograms, served on /metrics (METRICS_ENABLED=0 disables)
+CACHE_STAGE = metrics.histogram("recommend.cache")
+MODEL_STAGE = metrics.histogram("recommend.model")
+DETAILS_STAGE = metrics.histogram("recommend.details")
+BACKFILL_STAGE = metrics.histogram("recommend.backfill")
+RECOMMEND_TOTAL = metrics.histogram("recommend.total")
+BATCH_MODEL_STAGE = metrics.histogram("recommend_batch.model")
+BATCH_TOTAL = metrics.histogram("recommend_batch.total")
+SEARCH_STAGE = metrics.histogram("search.index")
+FORMAT_STAGE = metrics.histogram("search.format")
+SEARCH_TOTAL = metrics.histogram("search.total")
+FEED_TOTAL = metrics.histogram("feed.total")
+
+# /search pages; /search/stream exports every match as NDJSON, one page at a time
+SEARCH_MAX_LIMIT = 100
+SEARCH_STREAM_PAGE = 1000
+
+# Home feed: the rows the UI home page shows, built in one request
+FEED_GENRES = ["Action", "Sci-Fi"]
+FEED_ROW_SIZE = 5
+# Each genre row is one search-pool task over up to the whole genre: bounded like /search
+FEED_MAX_GENRES = 10
+FEED_MAX_GENRE_LENGTH = 64
+FEED_MAX_ROW_SIZE = 50
+FEED_MAX_AGE = int(os.getenv("FEED_MAX_AGE", "60"))  # Cache-Control max-age (seconds)
+
+# ==========================================
+# 3. HELPER FUNCTIONS
+# ==========================================
+def get_movie_details(title_list):
+    """
+    Takes a list of titles (from AI) and finds their posters in our Real DB.
+    Uses the prebuilt normalized-title index: O(k) per request.
+    """
+    return title_index.lookup(title_list)
+
+def build_recommendations(titles):
+    """
+    Convert AI Titles -> Real Objects with Posters, topped up with Trending.
+    """
+    start = perf_counter()
+    ai_picks_data = get_movie_details(titles)
+    DETAILS_STAGE.observe(perf_counter() - start)
+
+    # If AI returns < 4 movies (because our 2025 DB doesn't have 1998 movies),
+    # FILL the rest with Trending movies so the UI looks full.
+    if len(ai_picks_data) < 4:
+        metrics.inc("recommend_source", source="backfill" if ai_picks_data else "fallback")
+        start = perf_counter()
+        needed = 8 - len(ai_picks_data)
+        genre = trending.dominant_genre(title_index.rows(titles)) if BACKFILL == "genre" else None
+        ai_picks_data += trending.sample(needed, genre=genre,
+                                         exclude=[pick["title"] for pick in ai_picks_data])
+        BACKFILL_STAGE.observe(perf_counter() - start)
+    else:
+        metrics.inc("recommend_source", source="ai")
+
+    return ai_picks_data[:8]
+
+def model_version():
+    return registry.version
+
+def warm_cache(user_ids=None):
+    """
+    Offline precompute: fills the cache for every user in the model vocabulary
+    (or the given user_ids), one serving call per MAX_BATCH_SIZE users.
+    """
+    version, retriever = registry.snapshot()
+    if not retriever:
+        return 0
+    if user_ids is None:
+        user_ids = retriever.known_users()
+    for start in range(0, len(user_ids), MAX_BATCH_SIZE):
+        chunk = user_ids[start:start + MAX_BATCH_SIZE]
+        for user_id, titles in zip(chunk, retriever(chunk)):
+            rec_cache.put(user_id, build_recommendations(titles), model_version=version)
+    print(f"✅ Recommendation cache warmed: {len(user_ids)} users")
+    return len(user_ids)
+
+rec_cache = RecommendationCache(CACHE_SIZE, CACHE_TTL, model_version=model_version())
+
+def on_model_swap(version):
+    rec_cache.set_model_version(version)
+    if CACHE_WARMUP and batcher is not None:   # not in serve.py's parent
+        threading.Thread(target=warm_cache, name="cache-warmup", daemon=True).start()
+
+registry.on_swap = on_model_swap
+
+batcher = inference_pool = search_pool = None
+
+def start_runtime():
+    """
+    Starts this process's threads: micro-batcher, worker pools, model
+    watcher (+ cache warmup). Threads do not survive fork(), so under
+    serve.py (API_PREFORK=1) every forked worker calls this itself and
+    the parent, which only holds the shared catalog and model, never does.
+    """
+    global batcher, inference_pool, search_pool
+    # Admission control: past max_pending in-flight requests a pool answers 429.
+    # /recommend waits on the micro-batcher, /recommend/batch runs on the
+    # inference pool; both count against the same "inference" limit.
+    inference_pool = WorkerPool("inference", INFERENCE_WORKERS, INFERENCE_MAX_PENDING)
+    search_pool = WorkerPool("search", SEARCH_WORKERS, SEARCH_MAX_PENDING)
+
+    # Each batch runs on one model snapshot and reports its version per user.
+    # Batches run on the inference pool's threads, so at most INFERENCE_WORKERS
+    # model calls are in flight across /recommend and /recommend/batch.
+    batcher = MicroBatcher(registry.predict, MAX_BATCH_SIZE, MAX_WAIT_US, workers=INFERENCE_WORKERS,
+                           executor=inference_pool.executor)
+
+    registry.watch()
+    if CACHE_WARMUP and registry.ready:
+        threading.Thread(target=warm_cache, name="cache-warmup", daemon=True).start()
+
+if os.getenv("API_PREFORK") != "1":
+    start_runtime()
+    if EAGER_LOAD:
+        load()
+    else:
+        threading.Thread(target=load, name="startup-loader", daemon=True).start()
+
+# ==========================================
+# 4. API ENDPOINTS
+# ==========================================
+class UserRequest(BaseModel):
+    user_id: str
+
+class BatchUserRequest(BaseModel):
+    user_ids: list[str] = Field(max_length=BATCH_MAX_USERS)
+
+class SearchRequest(BaseModel):
+    query: str
+    genre: str = "All"
+    include_overview: bool = False
+    sort: str = "relevance"      # "relevance" (popularity), "rating" or "title"
+    limit: int = 12
+    cursor: str | None = None    # next_cursor of the previous page
+    count: bool = False          # always report total (costs a full match for text queries)
+
+class FeedRequest(BaseModel):
+    user_id: str = "42"
+    genres: list[Annotated[str, Field(max_length=FEED_MAX_GENRE_LENGTH)]] = Field(FEED_GENRES,
+                                                                              max_length=FEED_MAX_GENRES)
+    row_size: int = Field(FEED_ROW_SIZE, ge=1, le=FEED_MAX_ROW_SIZE)
+
+class ModelRequest(BaseModel):
+    version: str | None = None  # None: unpin and follow the newest version
+
+@app.exception_handler(Overloaded)
+async def overloaded(request, e):
+    metrics.inc("rejected", pool=e.pool)
+    return JSONResponse({"detail": str(e)}, status_code=429,
+                        headers={"Retry-After": str(e.retry_after)})
+
+def require(event, what):
+    # Still starting up: 503 so load balancers / clients retry instead of seeing empty results
+    if not event.is_set():
+        raise HTTPException(status_code=503, detail=f"{what} is still loading",
+                            headers={"Retry-After": "1"})
+
+@app.get("/")
+def home():
+    return {"status": "Online" if loaded.is_set() else "Starting", "movies_loaded": len(movie_db),
+            "model": registry.version,
+            "worker": os.getpid(),
+            "cache": rec_cache.stats(),
+            "pools": {"inference": inference_pool.stats(), "search": search_pool.stats(),
+                      "batcher": batcher.stats()}}
+
+@app.get("/healthz")
+async def healthz():
+    # Liveness: answers while loading; only a failed startup needs a restart
+    if startup_error:
+        return JSONResponse({"status": "failed", "error": startup_error}, status_code=500)
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    # Readiness: 200 once the catalog, indexes and model (or fallback mode) are loaded
+    body = {"ready": loaded.is_set(), "search": search_ready.is_set(), "catalog": catalog_ready.is_set(),
+            "model": registry.version, "startup_seconds": startup_seconds}
+    return JSONResponse(body, status_code=200 if loaded.is_set() else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/model")
+def model_status():
+    return registry.stats()
+
+@app.post("/model/rollback")
+def model_rollback():
+    try:
+        return {"version": registry.rollback()}
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.post("/model/activate")
+def model_activate(req: ModelRequest):
+    # Loads + warms in this request's thread; serving traffic keeps the old model meanwhile
+    try:
+        version = registry.unpin() if req.version is None else registry.load(req.version, pin=True)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"{req.version}: {e}")
+    return {"version": version, "pinned": registry.pinned}
+
+async def recommend_user(user_id):
+    """
+    The /recommend path: (movies, model version) for one user.
+    """
+    require(catalog_ready, "catalog")
+    # A. Hot users are served straight from the cache
+    start = perf_counter()
+    version = rec_cache.model_version
+    cached = rec_cache.get(user_id)
+    CACHE_STAGE.observe(perf_counter() - start)
+    if cached is not None:
+        metrics.inc("recommend_source", source="cache")
+        RECOMMEND_TOTAL.observe(perf_counter() - start)
+        return cached, version
+
+    titles = []
+    version = model_version()
+    cacheable = True
+    
+    # B. Try AI Prediction (queued into the shared micro-batch)
+    if registry.ready:
+        model_start = perf_counter()
+        try:
+            version, titles = await inference_pool.wait(lambda: batcher.submit(user_id))
+        except Overloaded:
+            raise
+        except Exception as e:
+            print(f"AI Prediction Error: {e}")
+            metrics.error("recommend.model", e)
+            cacheable = False
+        MODEL_STAGE.observe(perf_counter() - model_start)
+
+    # C. Posters + Trending top-up
+    movies = build_recommendations(titles)
+    if cacheable:
+        rec_cache.put(user_id, movies, model_version=version)
+    RECOMMEND_TOTAL.observe(perf_counter() - start)
+    return movies, version
+
+@app.post("/recommend")
+async def recommend(req: UserRequest):
+    movies, version = await recommend_user(req.user_id)
+    return {"movies": movies, "version": version}
+
+def retrieve_chunks(retriever, user_ids):
+    # One serving call per MAX_BATCH_SIZE users (runs on the inference pool)
+    titles_per_user = []
+    for offset in range(0, len(user_ids), MAX_BATCH_SIZE):
+        titles_per_user += retriever(user_ids[offset:offset + MAX_BATCH_SIZE])
+    return titles_per_user
+
+@app.post("/recommend/batch")
+async def recommend_batch(req: BatchUserRequest):
+    require(catalog_ready, "catalog")
+    # A. Cache first; only the misses go to the model
+    start = perf_counter()
+    movies_by_user = {}
+    for user_id in req.user_ids:
+        cached = rec_cache.get(user_id)
+        if cached is not None:
+            movies_by_user[user_id] = cached
+    misses = list(dict.fromkeys(u for u in req.user_ids if u not in movies_by_user))
+
+    titles_per_user = [[] for _ in misses]
+    # One model for the whole request, even if a new version goes live meanwhile
+    version, retriever = registry.snapshot()
+    cacheable = True
+    
+    # B. One serving call per MAX_BATCH_SIZE users
+    if retriever and misses:
+        model_start = perf_counter()
+        try:
+            titles_per_user = await inference_pool.run(retrieve_chunks, retriever, misses)
+        except Overloaded:
+            raise
+        except Exception as e:
+            print(f"AI Prediction Error: {e}")
+            metrics.error("recommend_batch.model", e)
+            titles_per_user = [[] for _ in misses]
+            cacheable = False
+        BATCH_MODEL_STAGE.observe(perf_counter() - model_start)
+
+    for user_id, titles in zip(misses, titles_per_user):
+        movies_by_user[user_id] = build_recommendations(titles)
+        if cacheable:
+            rec_cache.put(user_id, movies_by_user[user_id], model_version=version)
+
+    BATCH_TOTAL.observe(perf_counter() - start)
+    return {"version": version, "results": [
+        {"user_id": user_id, "movies": movies_by_user[user_id]}
+        for user_id in req.user_ids
+    ]}
+
+@app.post("/search")
+async def search_movies(req: SearchRequest):
+    # CPU-bound: runs on the search pool so it never waits behind model calls
+    require(search_ready, "search index")
+    start = perf_counter()
+    response = await search_pool.run(run_search, req)
+    SEARCH_TOTAL.observe(perf_counter() - start)
+    return response
+
+def format_rows(rows):
+    results = []
+    for i in rows:
+        title, poster_path, rating = movie_rows[i]
+        results.append({
+            "title": title,
+            "poster_path": poster_path,
+            "rating": f"{rating}%"
+        })
+    return results
+
+def search_page(req, limit):
+    # 1. Keyword + Genre filter (prebuilt index; presorted arrays for sort + cursor)
+    start = perf_counter()
+    if req.sort not in SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {SORTS}")
+    try:
+        rows, next_cursor, total = search_index.page(
+            req.query, req.genre, req.sort, limit=limit, cursor=req.cursor,
+            include_overview=req.include_overview, count=req.count)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    searched = perf_counter()
+    SEARCH_STAGE.observe(searched - start)
+
+    # 2. Format Output
+    results = format_rows(rows)
+    FORMAT_STAGE.observe(perf_counter() - searched)
+        
+    return {"results": results, "next_cursor": next_cursor, "total": total}
+
+def run_search(req):
+    return search_page(req, min(max(req.limit, 1), SEARCH_MAX_LIMIT))
+
+@app.post("/search/stream")
+async def search_stream(req: SearchRequest):
+    """
+    Every match in `sort` order as NDJSON (one movie per line), fetched
+    SEARCH_STREAM_PAGE rows at a time on the search pool.
+    """
+    require(search_ready, "search index")
+    page = await search_pool.run(search_page, req, SEARCH_STREAM_PAGE)
+
+    async def lines():
+        nonlocal page
+        while True:
+            yield "".join(json.dumps(movie) + "\n" for movie in page["results"])
+            if not page["next_cursor"]:
+                return
+            page = await search_pool.run(search_page, req.model_copy(update={"cursor": page["next_cursor"]}),
+                                         SEARCH_STREAM_PAGE)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+async def build_feed(req):
+    """
+    Recommendations and one row per genre, computed concurrently; a title
+    appears in the first row that has it only. Genre rows over-fetch so
+    they stay full after deduplication.
+    """
+    require(catalog_ready, "catalog")
+    limit = req.row_size * len(req.genres) + 8
+    rec, *genre_rows = await asyncio.gather(
+        recommend_user(req.user_id),
+        *(search_pool.run(search_index.search, "", genre, limit) for genre in req.genres),
+    )
+    movies, version = rec
+    seen = {m["title"] for m in movies}
+    rows = [{"name": "recommended", "movies": movies}]
+    for genre, row_ids in zip(req.genres, genre_rows):
+        picks = []
+        for movie in format_rows(row_ids):
+            if len(picks) == req.row_size:
+                break
+            if movie["title"] not in seen:
+                seen.add(movie["title"])
+                picks.append(movie)
+        rows.append({"name": genre, "movies": picks})
+    return {"version": version, "rows": rows}
+
+def feed_etag(req):
+    """
+    Weak validator over what the feed is built from: user, model version,
+    catalog, genres and row size. It is known before anything is computed,
+    so a matching If-None-Match costs no recommendation or genre search.
+    Weak because trending top-ups may pick differently between builds.
+    """
+    key = json.dumps([req.user_id, model_version(), catalog_version, req.genres, req.row_size])
+    return f'W/"{hashlib.sha1(key.encode("utf-8")).hexdigest()[:20]}"'
+
+def etag_matches(if_none_match, etag):
+    """
+    If-None-Match is "*" or a comma-separated list of (possibly weak) tags,
+    compared weakly: W/"x" and "x" are the same tag.
+    """
+    opaque = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque:
+            return True
+    return False
+
+async def feed_response(request, req):
+    # Compact JSON + ETag; a matching If-None-Match gets an empty 304
+    start = perf_counter()
+    require(catalog_ready, "catalog")
+    # Fallback feeds (no model yet) are not validated, so clients refetch once it is live
+    etag = feed_etag(req) if registry.ready else None
+    headers = {"Cache-Control": f"private, max-age={FEED_MAX_AGE}"}
+    if etag:
+        headers["ETag"] = etag
+        if etag_matches(request.headers.get("if-none-match", ""), etag):
+            metrics.inc("feed", status="not_modified")
+            FEED_TOTAL.observe(perf_counter() - start)
+            return Response(status_code=304, headers=headers)
+    body = json.dumps(await build_feed(req), separators=(",", ":")).encode("utf-8")
+    FEED_TOTAL.observe(perf_counter() - start)
+    metrics.inc("feed", status="ok")
+    return Response(body, media_type="application/json", headers=headers)
+
+@app.post("/feed")
+async def feed(req: FeedRequest, request: Request):
+    return await feed_response(request, req)
+
+@app.get("/feed")
+async def feed_get(request: Request, user_id: str = "42", genres: str = ",".join(FEED_GENRES),
+                   row_size: int = Query(FEED_ROW_SIZE, ge=1, le=FEED_MAX_ROW_SIZE)):
+    # Same feed for plain conditional GETs / HTTP caches: ?genres=Action,Sci-Fi
+    try:
+        req = FeedRequest(user_id=user_id, genres=[g for g in genres.split(",") if g], row_size=row_size)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False))
+    return await feed_response(request, req)
+
+# What importing this module costs (load() carries on in the background)
+startup_seconds["import"] = round(perf_counter() - IMPORT_START, 3)
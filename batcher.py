@@ -0,0 +1,108 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# ==========================================
+# DYNAMIC MICRO-BATCHER
+# ==========================================
+# Concurrent single-user /recommend calls are queued here and sent to the
+# model as one batch, at most `workers` batches at a time. A batch is
+# flushed when it reaches max_batch_size or when the oldest request has
+# waited max_wait_us microseconds, whichever comes first. Batches run on
+# the batcher's own threads, or on a shared executor (api.py passes the
+# inference pool's, so /recommend and /recommend/batch share its threads).
+
+
+class MicroBatcher:
+    def __init__(self, batch_fn, max_batch_size=64, max_wait_us=2000, name="micro-batcher", workers=1,
+                 executor=None):
+        """
+        batch_fn: takes a list of inputs, returns a list of results (same order).
+        workers: batches running at once (the inference pool size).
+        executor: runs the batches instead of `workers` own threads; one
+        collector thread then hands it a batch whenever a slot is free.
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0, int(max_wait_us)) / 1_000_000
+        self._queue = queue.Queue()
+        self.batches = 0
+        self.items = 0
+        self._executor = executor
+        self._slots = threading.Semaphore(max(1, int(workers)))
+        count = 1 if executor is not None else max(1, int(workers))
+        self._workers = [threading.Thread(target=self._run, name=f"{name}-{i}", daemon=True)
+                         for i in range(count)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, item):
+        """
+        Queues one input; returns a Future that resolves to its result.
+        """
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item, timeout=None):
+        return self.submit(item).result(timeout=timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    # Deadline passed: still take whatever is already queued
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            # Only collect once a batch can start, so requests keep
+            # accumulating into it while every slot is busy
+            self._slots.acquire()
+            batch = self._collect()
+            if self._executor is None:
+                self._execute(batch)
+            else:
+                self._executor.submit(self._execute, batch)
+
+    def _execute(self, batch):
+        try:
+            # Callers cancelled while queued (client gone, timeout) are dropped.
+            # The rest are marked running, so a late cancel() can no longer
+            # make set_result raise halfway through the batch.
+            batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                return
+            items = [item for item, _ in batch]
+            results = self.batch_fn(items)
+            if len(results) != len(items):
+                raise RuntimeError(f"batch_fn returned {len(results)} results for {len(items)} inputs")
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+
+        self.batches += 1
+        self.items += len(batch)
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        avg = self.items / self.batches if self.batches else 0.0
+        return {"batches": self.batches, "items": self.items, "avg_batch_size": round(avg, 2),
+                "queued": self.qsize()}
@@ -0,0 +1,82 @@
+"""
+Retrieval index comparison: brute force vs IVF-PQ.
+Reports recall@k against brute force, build time, index memory and QPS.
+
+    python -m benchmarks.bench_ann --movies 1000000 --n-probe 8 16 32
+    python -m benchmarks.bench_ann --embeddings my_embeddings
+"""
+import argparse
+import time
+
+import numpy as np
+
+from vector_index import BruteForceIndex, IVFPQIndex
+
+
+def synthetic_embeddings(n_movies, n_queries, dim=32, n_topics=256, seed=0):
+    """
+    Clustered vectors (items around topic centers), closer to trained
+    embeddings than pure Gaussian noise.
+    """
+    rng = np.random.default_rng(seed)
+    topics = rng.normal(size=(n_topics, dim)).astype(np.float32)
+    movies = topics[rng.integers(0, n_topics, n_movies)] + 0.5 * rng.normal(size=(n_movies, dim))
+    users = topics[rng.integers(0, n_topics, n_queries)] + 0.5 * rng.normal(size=(n_queries, dim))
+    return movies.astype(np.float32), users.astype(np.float32)
+
+
+def recall_at_k(truth, found):
+    return np.mean([len(set(t) & set(f)) / len(t) for t, f in zip(truth.tolist(), found.tolist())])
+
+
+def timed_search(index, queries, k, batch_size):
+    ids = []
+    start = time.perf_counter()
+    for i in range(0, len(queries), batch_size):
+        ids.append(index.search(queries[i:i + batch_size], k)[1])
+    elapsed = time.perf_counter() - start
+    return np.concatenate(ids), len(queries) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--movies", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--embeddings", help="use an exported my_embeddings/ dir instead")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--n-lists", type=int, default=0, help="0 = sqrt(movies)")
+    parser.add_argument("--n-probe", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--refine", type=int, default=4)
+    args = parser.parse_args()
+
+    if args.embeddings:
+        from retrieval import load_embeddings
+        data = load_embeddings(args.embeddings, mmap=False)
+        movies, users = data["movie_embeddings"], data["user_embeddings"]
+        users = users[np.random.default_rng(0).integers(0, len(users), args.queries)]
+    else:
+        movies, users = synthetic_embeddings(args.movies, args.queries)
+    print(f"{len(movies)} candidates x {movies.shape[1]} dims, {len(users)} queries, k={args.k}\n")
+
+    brute = BruteForceIndex(movies)
+    truth, qps = timed_search(brute, users, args.k, args.batch_size)
+    print(f"{'index':>22} {'recall@k':>9} {'build s':>8} {'memory MB':>10} {'QPS':>9}")
+    print(f"{'brute':>22} {1.0:9.3f} {0.0:8.2f} {brute.nbytes() / 2**20:10.1f} {qps:9.0f}")
+
+    start = time.perf_counter()
+    ivf = IVFPQIndex.build(movies, n_lists=args.n_lists or None, refine=args.refine)
+    build_s = time.perf_counter() - start
+
+    for refine in sorted({1, args.refine}):
+        ivf.refine = refine
+        for n_probe in args.n_probe:
+            ivf.n_probe = n_probe
+            found, qps = timed_search(ivf, users, args.k, args.batch_size)
+            name = f"ivfpq probe={n_probe} rf={refine}"
+            print(f"{name:>22} {recall_at_k(truth, found):9.3f} {build_s:8.2f} "
+                  f"{ivf.nbytes() / 2**20:10.1f} {qps:9.0f}")
+
+
+if __name__ == "__main__":
+    main()
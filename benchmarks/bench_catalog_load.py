@@ -0,0 +1,76 @@
+"""
+Worker startup time and memory: pandas CSV load vs memory-mapped columnar catalog.
+
+    python -m benchmarks.bench_catalog_load --movies 1000000
+    python -m benchmarks.bench_catalog_load --movies 1000000 --with-indexes
+
+Each variant runs in a fresh process. RssAnon is private to the worker;
+RssFile is mmap'd file pages that every worker shares.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from catalog import compile_catalog
+from benchmarks.synthetic import make_catalog
+
+WORKER = """
+import json, random, time
+start = time.perf_counter()
+from catalog import TitleIndex, load_catalog, row_tuples
+movie_db = load_catalog({csv!r}, {catalog!r})
+rows = row_tuples(movie_db)
+for i in random.sample(range(len(rows)), 1000):
+    rows[i]
+load_s = time.perf_counter() - start
+if {with_indexes}:
+    from search_index import SearchIndex
+    TitleIndex(movie_db, rows=rows)
+    SearchIndex(movie_db)
+status = dict(line.split(":", 1) for line in open("/proc/self/status"))
+mb = lambda key: int(status.get(key, "0 kB").split()[0]) / 1024
+print(json.dumps({{"load_s": load_s, "total_s": time.perf_counter() - start,
+                  "rss": mb("VmRSS"), "anon": mb("RssAnon"), "file": mb("RssFile")}}))
+"""
+
+
+def measure(csv_path, catalog_path, with_indexes):
+    code = WORKER.format(csv=csv_path, catalog=catalog_path, with_indexes=with_indexes)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                         check=True, cwd=os.getcwd())
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--movies", type=int, default=1_000_000)
+    parser.add_argument("--with-indexes", action="store_true",
+                        help="also build the title and search indexes like api.py does")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "movies.csv")
+        catalog_path = os.path.join(tmp, "movies_catalog")
+        make_catalog(args.movies).to_csv(csv_path, index=False)
+
+        start = time.perf_counter()
+        compile_catalog(csv_path, catalog_path)
+        compile_s = time.perf_counter() - start
+        size = lambda p: os.path.getsize(p) / 2**20
+        disk = sum(size(os.path.join(catalog_path, f)) for f in os.listdir(catalog_path))
+
+        print(f"{args.movies} movies: CSV {size(csv_path):.0f} MB, "
+              f"catalog {disk:.0f} MB (compiled in {compile_s:.1f} s)\n")
+        print(f"{'':>10} {'load s':>8} {'total s':>8} {'RSS MB':>8} {'private':>8} {'shared':>8}")
+        for name, catalog in (("csv", os.path.join(tmp, "missing")), ("columnar", catalog_path)):
+            r = measure(csv_path, catalog, args.with_indexes)
+            print(f"{name:>10} {r['load_s']:8.2f} {r['total_s']:8.2f} {r['rss']:8.0f} "
+                  f"{r['anon']:8.0f} {r['file']:8.0f}")
+
+
+if __name__ == "__main__":
+    main()
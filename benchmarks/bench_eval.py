@@ -0,0 +1,87 @@
+"""
+Offline evaluation cost: per-user Python loop vs. evaluate.py's batched NumPy.
+
+    python -m benchmarks.bench_eval --movies 1000000 --users 10000
+
+Synthetic export with planted relevance: every user has 1-3 held-out
+movies and a query vector near one of them. Times the two halves of an
+evaluation run separately and checks that both give the same numbers:
+  search   one index.search per user vs. --batch-size users per call
+           (capped by evaluate.MAX_SCORE_BYTES: 42 users at 1M movies)
+  metrics  recall/NDCG/hit rate/coverage with Python sets per user vs.
+           Relevance + retrieval_metrics over the whole [users, k] matrix
+"""
+import argparse
+import time
+
+import numpy as np
+
+from evaluate import Relevance, retrieval_metrics, search_all
+from vector_index import BruteForceIndex
+from benchmarks.bench_ann import synthetic_embeddings
+
+
+def loop_metrics(found, relevant, n_candidates, k):
+    recall, ndcg, hit = [], [], []
+    for row, positives in zip(found.tolist(), relevant):
+        gains = [1.0 if r in positives else 0.0 for r in row]
+        dcg = sum(g / np.log2(i + 2) for i, g in enumerate(gains))
+        idcg = sum(1.0 / np.log2(i + 2) for i in range(min(len(positives), k)))
+        recall.append(sum(gains) / len(positives))
+        ndcg.append(dcg / idcg)
+        hit.append(any(gains))
+    return {f"recall@{k}": np.mean(recall), f"ndcg@{k}": np.mean(ndcg), f"hit_rate@{k}": np.mean(hit),
+            "coverage": len({r for row in found.tolist() for r in row}) / n_candidates}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--movies", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--loop-users", type=int, default=500, help="users timed one at a time (extrapolated)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    movies, _ = synthetic_embeddings(args.movies, 1)
+    counts = rng.integers(1, 4, args.users)
+    held = [rng.choice(args.movies, c, replace=False) for c in counts]
+    queries = (movies[[h[0] for h in held]] + 0.3 * rng.normal(size=(args.users, movies.shape[1])))
+    queries = queries.astype(np.float32)
+    user_ids = [str(u) for u, h in enumerate(held) for _ in h]
+    titles = [str(m) for h in held for m in h]
+    relevance = Relevance(user_ids, titles, [str(u) for u in range(args.users)],
+                          [str(m) for m in range(args.movies)])
+    queries = queries[relevance.users]
+    relevant = [set(h.tolist()) for h in held]
+    index = BruteForceIndex(movies)
+    print(f"{args.movies} candidates, {args.users} held-out users ({len(titles)} pairs), k={args.k}\n")
+
+    start = time.perf_counter()
+    for q in queries[:args.loop_users]:
+        index.search(q[None], args.k)
+    loop_search = (time.perf_counter() - start) * args.users / args.loop_users
+    start = time.perf_counter()
+    found = search_all(index, queries, args.k, args.batch_size, args.movies)
+    batched_search = time.perf_counter() - start
+
+    start = time.perf_counter()
+    expected = loop_metrics(found, relevant, args.movies, args.k)
+    loop_s = time.perf_counter() - start
+    start = time.perf_counter()
+    got = retrieval_metrics(relevance, found, args.k)
+    vector_s = time.perf_counter() - start
+
+    print(f"{'':>8} {'per user s':>11} {'batched s':>10} {'speedup':>8}")
+    print(f"{'search':>8} {loop_search:11.2f} {batched_search:10.2f} {loop_search / batched_search:8.1f}x"
+          f"   (per-user time extrapolated from {args.loop_users} users)")
+    print(f"{'metrics':>8} {loop_s:11.2f} {vector_s:10.3f} {loop_s / vector_s:8.1f}x")
+    print()
+    for name, value in got.items():
+        print(f"{name:>12} {value:.4f}   loop {expected[name]:.4f}   "
+              f"{'ok' if np.isclose(value, expected[name]) else 'MISMATCH'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark: rendering the UI home page, old fan-out vs. POST /feed.
+
+    python -m benchmarks.bench_feed --movies 100000 --rtt-ms 80
+
+Runs api.app in-process (TestClient) over a synthetic catalog and a stub
+embedding export, and times one home-page render per user:
+  fanout  - the old ui.py: /recommend, /search Action, /search Sci-Fi, one after another
+  feed    - one POST /feed (rows computed concurrently on the server)
+  cached  - ui.py now: st.cache_data serves reruns within FEED_TTL, then one
+            conditional /feed that usually comes back 304
+--rtt-ms adds a client-side sleep per HTTP request to stand in for the
+browser host -> API round trip the in-process client does not have.
+--reruns is how many Streamlit reruns (clicks) fall in one FEED_TTL window.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from benchmarks.loadtest import InProcessTarget, prepare_workdir
+from benchmarks.synthetic import zipf_user_ids
+
+
+class Client:
+    def __init__(self, client, rtt):
+        self.client = client
+        self.rtt = rtt
+        self.requests = 0
+
+    def post(self, path, body, headers=None):
+        self.requests += 1
+        if self.rtt:
+            time.sleep(self.rtt)
+        return self.client.post(path, json=body, headers=headers or {})
+
+
+def fanout(client, user_id):
+    rec = client.post("/recommend", {"user_id": user_id}).json()["movies"]
+    act = client.post("/search", {"query": "", "genre": "Action"}).json()["results"]
+    sci = client.post("/search", {"query": "", "genre": "Sci-Fi"}).json()["results"]
+    return rec, act, sci
+
+
+def feed(client, user_id, etag=None):
+    r = client.post("/feed", {"user_id": user_id, "genres": ["Action", "Sci-Fi"]},
+                    headers={"If-None-Match": etag} if etag else None)
+    return r
+
+
+def run(name, client, users, render):
+    times = np.empty(len(users))
+    client.requests = 0
+    for i, user_id in enumerate(users):
+        start = time.perf_counter()
+        render(user_id)
+        times[i] = time.perf_counter() - start
+    times *= 1000
+    print(f"{name:>8}: mean {times.mean():8.2f} ms   p50 {np.percentile(times, 50):8.2f} ms   "
+          f"p99 {np.percentile(times, 99):8.2f} ms   {client.requests / len(users):.2f} requests/render")
+    return times.mean()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--movies", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--renders", type=int, default=500)
+    parser.add_argument("--rtt-ms", type=float, default=80)
+    parser.add_argument("--reruns", type=int, default=10, help="reruns per FEED_TTL window")
+    args = parser.parse_args()
+
+    setup = {"movies": args.movies, "users": args.users, "seed": 0}
+    workdir, model = prepare_workdir(setup, None)
+    os.environ["RECOMMEND_CACHE_SIZE"] = "0"   # every render pays for the model, like a cold user
+    target = InProcessTarget(workdir)
+    client = Client(target.client, args.rtt_ms / 1000)
+    users = zipf_user_ids(args.users, args.renders)
+    print(f"{args.movies} movies, {model} model, {args.renders} renders, {args.rtt_ms} ms RTT")
+    try:
+        for user_id in users[:20]:   # warm up the batcher and pools
+            fanout(client, user_id)
+            feed(client, user_id)
+        base = run("fanout", client, users, lambda u: fanout(client, u))
+        new = run("feed", client, users, lambda u: feed(client, u).json())
+
+        # ui.py: the first render of a TTL window asks with the last ETag,
+        # the other reruns in the window never leave Streamlit's cache
+        etags, payloads, window = {}, {}, {}
+
+        def cached(user_id):
+            window[user_id] = window.get(user_id, 0) + 1
+            if user_id in payloads and (window[user_id] - 1) % args.reruns:
+                return payloads[user_id]
+            r = feed(client, user_id, etags.get(user_id))
+            if r.status_code == 200:
+                etags[user_id], payloads[user_id] = r.headers["ETag"], r.json()
+            return payloads[user_id]
+
+        # each user renders for two TTL windows: one full response, then one 304
+        sessions = users[:max(1, len(users) // (2 * args.reruns))]
+        run("cached", client, [u for u in sessions for _ in range(2 * args.reruns)], cached)
+    finally:
+        target.close()
+    print(f"feed is {base / new:.1f}x faster per render than the fan-out")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Offline check + timing of fetch_real_data.py against the local TMDB stub.
+
+    python -m benchmarks.bench_fetch --latency-ms 50 --pages 50
+
+1. old sequential loop vs the pooled, rate-limited fetcher
+2. resume: a run with injected failures leaves a checkpoint, the rerun
+   only requests the missing pages
+3. incremental: changed movies are merged by id, row order is kept; a title
+   new on the popular list is inserted at its rank
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+import requests
+
+import fetch_real_data as fetcher
+from benchmarks.synthetic import make_catalog
+from benchmarks.tmdb_stub import StubTMDB
+
+
+def legacy_fetch(base_url, pages):
+    # The original fetch loop: one request at a time, fixed sleep, stop on error
+    all_movies = []
+    for page in range(1, pages + 1):
+        response = requests.get(f"{base_url}/movie/popular?api_key=x&language=en-US&page={page}")
+        if response.status_code != 200:
+            break
+        all_movies += [fetcher.to_row(item) for item in response.json().get('results', [])]
+        time.sleep(0.1)
+    return all_movies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=40)
+    args = parser.parse_args()
+
+    source = make_catalog(args.pages * 20)
+    stub = StubTMDB(source, latency_ms=args.latency_ms)
+    server, base_url = stub.serve()
+    expected = source["id"].tolist()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            # 1. Throughput
+            start = time.perf_counter()
+            legacy = legacy_fetch(base_url, args.pages)
+            legacy_s = time.perf_counter() - start
+
+            client = fetcher.TMDBClient("stub", base_url, workers=args.workers, rate=args.rate)
+            start = time.perf_counter()
+            fetcher.fetch_movies(args.pages, "movies.csv", client=client)
+            pooled_s = time.perf_counter() - start
+            fetched = pd.read_csv("movies.csv", dtype=str)
+            assert fetched["id"].tolist() == expected, "pooled fetch lost popularity order"
+
+            # 2. Resume after failures
+            stub.fail_rate = 0.3
+            flaky = fetcher.TMDBClient("stub", base_url, workers=args.workers, rate=args.rate, retries=0)
+            failed = fetcher.fetch_movies(args.pages, "resumed.csv", client=flaky)
+            stub.fail_rate = 0.0
+            before = stub.requests
+            fetcher.fetch_movies(args.pages, "resumed.csv", client=client)
+            resumed_requests = stub.requests - before
+            assert resumed_requests == len(failed), "resume refetched completed pages"
+            assert pd.read_csv("resumed.csv", dtype=str)["id"].tolist() == expected
+
+            # 3. Incremental merge
+            changed = [stub.items[i]["id"] for i in range(0, len(stub.items), 50)]
+            for movie_id in changed:
+                stub.by_id[movie_id]["title"] += " (Director's Cut)"
+            stub.changed = changed + [10**9 + 1]  # plus an id that is not in our catalog
+            premiere = dict(stub.items[0], id=10**9 + 2, title="Premiere")
+            stub.items.insert(0, premiere)
+            stub.by_id[premiere["id"]] = premiere
+            before = stub.requests
+            updated = fetcher.update_movies("movies.csv", since="2025-01-01", client=client)
+            incremental_requests = stub.requests - before
+            merged = pd.read_csv("movies.csv", dtype=str)
+            assert merged["id"].tolist() == [str(premiere["id"])] + expected
+            assert updated == len(changed) + 1
+            assert merged["title"].str.endswith("(Director's Cut)").sum() == len(changed)
+        finally:
+            os.chdir(cwd)
+            server.shutdown()
+
+    print(f"\n{args.pages} pages, {args.latency_ms:.0f} ms simulated latency")
+    print(f"  sequential (old):  {legacy_s:6.2f} s  ({len(legacy)} movies)")
+    print(f"  pooled x{args.workers}:         {pooled_s:6.2f} s  ({len(fetched)} movies)")
+    print(f"  resume: {len(failed)} failed pages -> {resumed_requests} requests on rerun")
+    print(f"  incremental: {updated} movies merged/added with {incremental_requests} requests "
+          f"(full refetch: {args.pages})")
+
+
+if __name__ == "__main__":
+    main()
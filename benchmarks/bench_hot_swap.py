@@ -0,0 +1,94 @@
+"""
+Load test for model hot-swap: latency of the /recommend serving path
+(registry + micro-batcher) while a new version is published, loaded,
+warmed and swapped in.
+
+    python -m benchmarks.bench_hot_swap --backend tf --clients 16 --seconds 20
+
+Versions are copies of my_model/ + my_embeddings/ from --source, published
+into a temporary models dir. Latency is reported per phase: before the
+publish, while the new version loads in the background, and after the swap.
+Also prints the blocking cold start a restarted worker would pay instead.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+os.environ["TF_USE_LEGACY_KERAS"] = "1"
+
+import numpy as np
+
+from batcher import MicroBatcher
+from model_registry import ModelRegistry, publish
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--source", default=os.getcwd(), help="dir with my_model/ and/or my_embeddings/")
+    parser.add_argument("--backend", choices=["auto", "numpy", "tf"], default="tf")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--poll", type=float, default=0.2)
+    args = parser.parse_args()
+
+    models_dir = tempfile.mkdtemp(prefix="models-")
+    try:
+        publish(models_dir, "v1", args.source)
+        registry = ModelRegistry(models_dir, backend=args.backend, poll_seconds=args.poll)
+        registry.load_latest()
+        cold_start = registry.last_load_seconds  # includes the TF import, like a fresh worker
+        registry.watch()
+        batcher = MicroBatcher(registry.predict)
+        user_ids = [str(u) for u in np.random.default_rng(0).integers(1, 944, 100_000)]
+
+        samples = []  # (finished_at, latency_ms, version)
+        stop = threading.Event()
+
+        def client(offset):
+            i = offset
+            while not stop.is_set():
+                start = time.perf_counter()
+                version, _ = batcher(user_ids[i % len(user_ids)])
+                end = time.perf_counter()
+                samples.append((end, (end - start) * 1000, version))
+                i += args.clients
+
+        threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(args.clients)]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        time.sleep(args.seconds / 3)
+        published = time.perf_counter()
+        publish(models_dir, "v2", args.source)
+        while registry.version != "v2" and time.perf_counter() - published < args.seconds:
+            time.sleep(0.01)
+        swapped = time.perf_counter()
+        time.sleep(max(0.0, t0 + args.seconds - swapped))
+        stop.set()
+        for t in threads:
+            t.join()
+
+        phases = [("before publish", t0, published), ("loading v2", published, swapped),
+                  ("after swap", swapped, float("inf"))]
+        print(f"{args.backend} backend, {args.clients} clients, {len(samples)} requests")
+        for name, lo, hi in phases:
+            lat = np.array([ms for at, ms, _ in samples if lo <= at < hi])
+            if len(lat) == 0:
+                continue
+            rate = len(lat) / max(1e-9, min(hi, samples[-1][0]) - lo)
+            print(f"{name:>15}: {rate:8.0f} req/s   p50 {np.percentile(lat, 50):7.2f} ms   "
+                  f"p99 {np.percentile(lat, 99):7.2f} ms   max {lat.max():7.2f} ms")
+        versions = [v for _, _, v in samples]
+        print(f"{'':>15}  swap after {swapped - published:.2f}s (load + warm {registry.last_load_seconds}s), "
+              f"responses: v1={versions.count('v1')} v2={versions.count('v2')}, "
+              f"other={len(versions) - versions.count('v1') - versions.count('v2')}")
+        print(f"{'restart':>15}: {cold_start:.2f}s cold start before a restarted worker serves")
+    finally:
+        shutil.rmtree(models_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Parity + cold start / RSS / latency: SavedModel (TF) vs NumPy embeddings.
+
+    python retrieval.py export          # once, if train.py predates the export
+    python -m benchmarks.bench_numpy_backend --model my_model --embeddings my_embeddings
+
+Exits non-zero if the NumPy backend returns different titles than the SavedModel.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+COLD_START = """
+import json, resource, sys, time
+start = time.perf_counter()
+from retrieval import {cls}
+retriever = {cls}({path!r})
+retriever(["42"])
+print(json.dumps({{"seconds": time.perf_counter() - start,
+                  "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                  "tensorflow_imported": "tensorflow" in sys.modules}}))
+"""
+
+
+def cold_start(cls, path):
+    out = subprocess.run([sys.executable, "-c", COLD_START.format(cls=cls, path=path)],
+                         capture_output=True, text=True, check=True,
+                         env={**os.environ, "TF_CPP_MIN_LOG_LEVEL": "3"})
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def check_parity(numpy_backend, tf_backend, user_ids):
+    expected = tf_backend(user_ids)
+    got = numpy_backend(user_ids)
+    mismatched = [u for u, a, b in zip(user_ids, got, expected) if a != b]
+    # Near-ties may swap places between TF and BLAS; the set must still agree
+    reordered = [u for u, a, b in zip(user_ids, got, expected) if a != b and set(a) == set(b)]
+    return len(user_ids) - len(mismatched), mismatched, reordered
+
+
+def time_batches(fn, user_ids, batch_size, repeat=3):
+    times = []
+    for _ in range(repeat):
+        for i in range(0, len(user_ids), batch_size):
+            start = time.perf_counter()
+            fn(user_ids[i:i + batch_size])
+            times.append(time.perf_counter() - start)
+    return np.array(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=os.path.join(os.getcwd(), "my_model"))
+    parser.add_argument("--embeddings", default=os.path.join(os.getcwd(), "my_embeddings"))
+    args = parser.parse_args()
+
+    print("Cold start (fresh process: import + load + first query)")
+    for cls, path in (("SavedModelRetrieval", args.model), ("NumpyRetrieval", args.embeddings)):
+        r = cold_start(cls, path)
+        print(f"{cls:>20}: {r['seconds']:6.2f} s   max RSS {r['rss_mb']:7.1f} MB   "
+              f"tensorflow imported: {r['tensorflow_imported']}")
+
+    from retrieval import NumpyRetrieval, SavedModelRetrieval
+    numpy_backend = NumpyRetrieval(args.embeddings)
+    tf_backend = SavedModelRetrieval(args.model)
+
+    user_ids = list(numpy_backend._user_rows) + ["not-a-user", ""]
+    same, mismatched, reordered = check_parity(numpy_backend, tf_backend, user_ids)
+    print(f"\nParity: {same}/{len(user_ids)} users identical top-k "
+          f"({len(reordered)} differ only by tie order)")
+
+    print("\nLatency per call")
+    for batch_size in (1, 64, 512):
+        for name, fn in (("tf", tf_backend), ("numpy", numpy_backend)):
+            t = time_batches(fn, user_ids, batch_size)
+            print(f"  batch {batch_size:>4} {name:>6}: p50 {np.percentile(t, 50):8.3f} ms   "
+                  f"p99 {np.percentile(t, 99):8.3f} ms")
+
+    if len(mismatched) > len(reordered):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Candidate precompute: train.py's old pass vs. features.py's streaming, sharded stage.
+
+    python -m benchmarks.bench_precompute --movies 1000000 --workers 1 2 4
+
+A stub movie tower with the real one's shape (hashed title / text / id
+embeddings + genre bag, then a small MLP) is saved as a SavedModel and
+loaded through features.load_movie_tower, so the tower calls cost what
+TF costs. Runs, in order, over one synthetic catalog:
+  old        whole catalog's features in memory, batches of 100, one at a
+             time, no store (the index_from_dataset(batch(100)) pass)
+  full       empty store, --batch-size, each --workers count
+  unchanged  rerun on the same catalog (hash + checksum only)
+  edited     rerun after editing --edit-fraction of the overviews and
+             appending as many new movies
+  corrupt    rerun after flipping a byte in one shard
+Each store run checks its vectors against a from-scratch embedding.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from catalog import compile_catalog, load_catalog
+from features import (GENRES, GENRE_SEP, MOVIE_FEATURES, STORE_DIR, catalog_chunks, catalog_features,
+                      feature_chunks, load_movie_tower, precompute_candidates)
+from benchmarks.synthetic import make_catalog
+
+
+def save_stub_tower(path, dim=32, buckets=2**18, hidden=128, seed=0):
+    import tensorflow as tf
+
+    rng = np.random.default_rng(seed)
+    weights = lambda *shape: tf.Variable(rng.normal(scale=0.1, size=shape).astype(np.float32))
+
+    class StubTower(tf.Module):
+        def __init__(self):
+            self.tokens = weights(buckets, dim)
+            self.genres = tf.lookup.StaticHashTable(
+                tf.lookup.KeyValueTensorInitializer(GENRES, list(range(len(GENRES))), value_dtype=tf.int64), 0)
+            self.genre_table = weights(len(GENRES), dim)
+            self.w1, self.w2 = weights(dim, hidden), weights(hidden, dim)
+
+        @tf.function(input_signature=[tf.TensorSpec([None], tf.string, name=name) for name in MOVIE_FEATURES])
+        def __call__(self, movie_title, genres, text, tmdb_id):
+            embed = lambda values: tf.gather(self.tokens, tf.strings.to_hash_bucket_fast(values, buckets))
+            words = tf.reduce_mean(embed(tf.strings.split(text)), axis=1)
+            genre = tf.reduce_mean(tf.gather(self.genre_table, self.genres.lookup(
+                tf.strings.split(genres, GENRE_SEP))), axis=1)
+            x = embed(movie_title) + embed(tmdb_id) + words + tf.where(tf.math.is_nan(genre), 0.0, genre)
+            x = x + tf.matmul(tf.nn.relu(tf.matmul(x, self.w1)), self.w2)
+            return {"embedding": tf.math.l2_normalize(x, axis=1)}
+
+    module = StubTower()
+    tf.saved_model.save(module, path, signatures={"serving_default": module.__call__})
+    return path
+
+
+def write_catalog(workdir, movie_db):
+    movie_db.to_csv(os.path.join(workdir, "movies.csv"), index=False)
+    compile_catalog(os.path.join(workdir, "movies.csv"), os.path.join(workdir, "movies_catalog"))
+    return os.path.join(workdir, "movies.csv"), os.path.join(workdir, "movies_catalog")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--movies", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=4096)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--prefetch", type=int, default=2)
+    parser.add_argument("--edit-fraction", type=float, default=0.01)
+    parser.add_argument("--old-rows", type=int, default=100_000, help="rows timed for the old pass (extrapolated)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="precompute-")
+    movie_db = make_catalog(args.movies)
+    csv_path, catalog_path = write_catalog(workdir, movie_db)
+    tower = load_movie_tower(save_stub_tower(os.path.join(workdir, "my_movie_tower")))
+    store = os.path.join(workdir, "my_embeddings", STORE_DIR)
+    print(f"{args.movies} movies, {os.cpu_count()} cores, batch {args.batch_size}, prefetch {args.prefetch}\n")
+    print(f"{'run':>10} {'workers':>7} {'seconds':>8} {'rows/s':>9} {'embedded':>9} {'shards':>7}  check")
+
+    def report(run, workers, stats, check=""):
+        print(f"{run:>10} {workers:7d} {stats['seconds']:8.1f} {stats['rows'] / stats['seconds']:9.0f} "
+              f"{stats['embedded']:9d} {stats['shards_written']:7d}  {check}")
+
+    def checked(vectors):
+        _, expected, _ = precompute_candidates(tower, catalog_chunks(csv_path, catalog_path), "stub",
+                                               batch_size=args.batch_size)
+        return "ok" if np.allclose(vectors, expected, atol=1e-6) else "MISMATCH"
+
+    old = feature_chunks(catalog_features(load_catalog(csv_path, catalog_path)), args.old_rows)
+    _, _, stats = precompute_candidates(tower, [next(old)], "stub", batch_size=100, workers=1, prefetch=0)
+    stats.update(rows=args.movies, seconds=stats["seconds"] * args.movies / args.old_rows)
+    report("old", 1, stats, f"(extrapolated from {args.old_rows} rows)")
+
+    for workers in args.workers:
+        shutil.rmtree(store, ignore_errors=True)
+        _, vectors, stats = precompute_candidates(tower, catalog_chunks(csv_path, catalog_path), "stub", store,
+                                                  args.batch_size, workers, args.prefetch)
+        report("full", workers, stats)
+    workers = args.workers[-1]
+    run = lambda: precompute_candidates(tower, catalog_chunks(csv_path, catalog_path), "stub", store,
+                                        args.batch_size, workers, args.prefetch)
+
+    _, vectors, stats = run()
+    report("unchanged", workers, stats, checked(vectors))
+
+    rng = np.random.default_rng(1)
+    n_edit = int(args.movies * args.edit_fraction)
+    edited = rng.choice(args.movies, n_edit, replace=False)
+    movie_db.loc[edited, "overview"] = movie_db.loc[edited, "overview"] + " Remastered."
+    added = make_catalog(n_edit, seed=2)
+    added["title"] = added["title"] + " (new)"
+    added["id"] = (np.arange(n_edit) + args.movies + 1).astype(str)
+    csv_path, catalog_path = write_catalog(workdir, pd.concat([movie_db, added], ignore_index=True))
+    _, vectors, stats = run()
+    report("edited", workers, stats, checked(vectors))
+
+    shard = os.path.join(store, sorted(name for name in os.listdir(store) if name.startswith("shard-"))[0])
+    with open(shard, "r+b") as f:
+        f.seek(os.path.getsize(shard) // 2)
+        byte = f.read(1)
+        f.seek(-1, os.SEEK_CUR)
+        f.write(bytes([byte[0] ^ 0xFF]))
+    _, vectors, stats = run()
+    report("corrupt", workers, stats, checked(vectors))
+    shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Quantized retrieval: float32 brute force vs. int8 / float16 candidates.
+Reports scoring-table memory, QPS and recall@k against float32 brute force.
+
+    python -m benchmarks.bench_quantized --movies 1000000
+    python -m benchmarks.bench_quantized --embeddings my_embeddings
+
+"+rerank" re-scores the best k * refine candidates against the float32
+table (memory-mapped in serving, so only those rows are read); without
+it the float table is not needed at all.
+Export for serving with `python retrieval.py reindex --index int8`.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from vector_index import BruteForceIndex, QuantizedIndex
+from benchmarks.bench_ann import recall_at_k, synthetic_embeddings, timed_search
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--movies", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=512)
+    parser.add_argument("--embeddings", help="use an exported my_embeddings/ dir instead")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--refine", type=int, default=4)
+    args = parser.parse_args()
+
+    if args.embeddings:
+        from retrieval import load_embeddings
+        data = load_embeddings(args.embeddings, mmap=False)
+        movies, users = data["movie_embeddings"], data["user_embeddings"]
+        users = users[np.random.default_rng(0).integers(0, len(users), args.queries)]
+    else:
+        movies, users = synthetic_embeddings(args.movies, args.queries)
+    print(f"{len(movies)} candidates x {movies.shape[1]} dims, {len(users)} queries, k={args.k}, "
+          f"batch {args.batch_size}\n")
+
+    brute = BruteForceIndex(movies)
+    truth, brute_qps = timed_search(brute, users, args.k, args.batch_size)
+    print(f"{'index':>16} {'table MB':>9} {'build s':>8} {'QPS':>8} {'recall@k':>9}")
+    print(f"{'float32':>16} {brute.nbytes() / 2**20:9.1f} {0:8.2f} {brute_qps:8.0f} {1:9.3f}")
+
+    for kind in ("int8", "float16"):
+        start = time.perf_counter()
+        index = QuantizedIndex.build(kind, movies, refine=args.refine)
+        build = time.perf_counter() - start
+        for name, refine in ((kind, 1), (f"{kind}+rerank", args.refine)):
+            index.refine = refine
+            found, qps = timed_search(index, users, args.k, args.batch_size)
+            print(f"{name:>16} {index.nbytes() / 2**20:9.1f} {build:8.2f} {qps:8.0f} "
+                  f"{recall_at_k(truth, found):9.3f}")
+
+
+if __name__ == "__main__":
+    main()
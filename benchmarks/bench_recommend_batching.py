@@ -0,0 +1,85 @@
+"""
+Throughput / p99 of the serving call: one-at-a-time vs micro-batched.
+
+    python -m benchmarks.bench_recommend_batching --model my_model --clients 32
+
+Only the model path is measured (no HTTP), so the numbers isolate the
+TF dispatch overhead that batching removes.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ["TF_USE_LEGACY_KERAS"] = "1"
+
+import numpy as np
+import tensorflow as tf
+
+from batcher import MicroBatcher
+
+
+def make_predict(serving_fn):
+    key = list(serving_fn.structured_input_signature[1].keys())[0]
+
+    def predict(user_ids):
+        preds = serving_fn(**{key: tf.constant(user_ids)})
+        for k in preds:
+            if preds[k].dtype == tf.string:
+                return [[t.decode('utf-8') for t in row] for row in preds[k].numpy()]
+        return [[] for _ in user_ids]
+    return predict
+
+
+def run_clients(call, user_ids, clients):
+    latencies = np.zeros(len(user_ids))
+
+    def one(i):
+        start = time.perf_counter()
+        call(user_ids[i])
+        latencies[i] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(one, range(len(user_ids))))
+    return time.perf_counter() - start, latencies * 1000
+
+
+def report(name, elapsed, latencies):
+    print(f"{name:>22}: {len(latencies) / elapsed:8.0f} req/s   "
+          f"p50 {np.percentile(latencies, 50):7.2f} ms   p99 {np.percentile(latencies, 99):7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=os.path.join(os.getcwd(), "my_model"))
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-us", type=int, default=2000)
+    args = parser.parse_args()
+
+    serving_fn = tf.saved_model.load(args.model).signatures["serving_default"]
+    predict = make_predict(serving_fn)
+    rng = np.random.default_rng(0)
+    user_ids = [str(u) for u in rng.integers(1, 944, args.requests)]
+    predict(user_ids[:8])  # warmup / trace
+
+    print(f"{args.requests} requests, {args.clients} concurrent clients")
+    elapsed, lat = run_clients(lambda u: predict([u]), user_ids, args.clients)
+    report("one-at-a-time", elapsed, lat)
+
+    batcher = MicroBatcher(predict, args.max_batch_size, args.max_wait_us)
+    elapsed, lat = run_clients(batcher, user_ids, args.clients)
+    report("micro-batched", elapsed, lat)
+    print(f"{'':>22}  {batcher.stats()}")
+
+    start = time.perf_counter()
+    for i in range(0, len(user_ids), args.max_batch_size):
+        predict(user_ids[i:i + args.max_batch_size])
+    elapsed = time.perf_counter() - start
+    print(f"{'/recommend/batch':>22}: {len(user_ids) / elapsed:8.0f} users/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Replays /search queries against the old pandas filter and the SearchIndex.
+
+    python -m benchmarks.bench_search --movies 1000000
+    python -m benchmarks.bench_search --csv movies.csv --queries my_queries.jsonl
+
+A query file is JSON lines: {"query": "star", "genre": "Sci-Fi"}.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from search_index import SearchIndex
+from benchmarks.synthetic import GENRES, WORDS, make_catalog
+
+
+def legacy_search(movie_db, query, genre, limit=12):
+    # The original api.search_movies filter, kept here as the baseline
+    df = movie_db.copy()
+    if query:
+        df = df[df['title'].str.contains(query, case=False, na=False)]
+    if genre != "All":
+        df = df[df['genre'].str.contains(genre, case=False, na=False)]
+    return df.head(limit).index.tolist()
+
+
+def make_queries(n, seed=2):
+    """
+    Mix of what the UI sends: genre rows, words, fragments, 1-2 char typing, misses.
+    """
+    rng = np.random.default_rng(seed)
+    genres = ["All"] + GENRES
+    queries = []
+    for i in range(n):
+        word = WORDS[rng.integers(len(WORDS))]
+        kind = i % 5
+        if kind == 0:
+            query = ""
+        elif kind == 1:
+            query = word
+        elif kind == 2:
+            query = word[1:4]
+        elif kind == 3:
+            query = word[:int(rng.integers(1, 3))]
+        else:
+            query = f"{word} zzz"
+        queries.append({"query": query, "genre": genres[rng.integers(len(genres))]})
+    return queries
+
+
+def load_queries(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def replay(fn, queries):
+    times, results = [], []
+    for q in queries:
+        start = time.perf_counter()
+        results.append(fn(q["query"], q.get("genre", "All")))
+        times.append(time.perf_counter() - start)
+    return np.array(times) * 1000, results
+
+
+def report(name, times):
+    print(f"{name:>12}: p50 {np.percentile(times, 50):9.4f} ms   "
+          f"p99 {np.percentile(times, 99):9.4f} ms   max {times.max():9.4f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--movies", type=int, default=100_000)
+    parser.add_argument("--csv", help="use a real movies.csv instead of a synthetic catalog")
+    parser.add_argument("--queries", help="JSON lines query file to replay")
+    parser.add_argument("--n-queries", type=int, default=500)
+    parser.add_argument("--legacy-queries", type=int, default=50,
+                        help="how many queries to also run through the slow pandas path")
+    args = parser.parse_args()
+
+    if args.csv:
+        movie_db = pd.read_csv(args.csv, dtype=str).fillna("")
+    else:
+        movie_db = make_catalog(args.movies)
+    queries = load_queries(args.queries) if args.queries else make_queries(args.n_queries)
+
+    start = time.perf_counter()
+    index = SearchIndex(movie_db)
+    print(f"Catalog: {len(movie_db)} movies, {len(queries)} queries")
+    print(f"Index build: {time.perf_counter() - start:.2f} s ({len(index._trigrams)} trigrams)")
+
+    indexed_t, indexed_r = replay(lambda q, g: index.search(q, g, limit=12), queries)
+    sample = queries[:args.legacy_queries]
+    legacy_t, legacy_r = replay(lambda q, g: legacy_search(movie_db, q, g), sample)
+
+    mismatches = sum(a != b for a, b in zip(indexed_r, legacy_r))
+    print(f"Parity: {len(sample) - mismatches}/{len(sample)} queries identical")
+    report("legacy", legacy_t)
+    report("index", indexed_t)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Deep pagination for /search: pandas filter + sort + offset vs. SearchIndex.page cursors.
+
+    python -m benchmarks.bench_search_pages --movies 1000000
+
+For each (query, genre, sort) the cursor path walks pages 1..N and the
+time of the page at each reported depth is compared with the offset
+baseline, which re-filters and re-sorts the whole catalog per page.
+Also checks that both return the same rows.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from search_index import SearchIndex
+from benchmarks.synthetic import make_catalog
+
+CASES = [("", "All", "rating"), ("", "Action", "title"), ("star", "All", "rating"), ("", "Drama", "relevance")]
+
+
+def legacy_page(movie_db, query, genre, sort, offset, limit):
+    # What offset pagination on the original pandas filter would cost
+    df = movie_db
+    if query:
+        df = df[df["title"].str.contains(query, case=False, na=False)]
+    if genre != "All":
+        df = df[df["genre"].str.contains(genre, case=False, na=False)]
+    if sort == "rating":
+        df = df.assign(_r=pd.to_numeric(df["rating"], errors="coerce").fillna(-1), _row=df.index)
+        df = df.sort_values(["_r", "_row"], ascending=[False, True], kind="stable")
+    elif sort == "title":
+        df = df.assign(_t=df["title"].str.lower()).sort_values("_t", kind="stable")
+    return df.iloc[offset:offset + limit].index.tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--movies", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=12)
+    parser.add_argument("--depths", type=int, nargs="+", default=[1, 10, 100, 1000])
+    args = parser.parse_args()
+
+    movie_db = make_catalog(args.movies)
+    start = time.perf_counter()
+    index = SearchIndex(movie_db)
+    for sort in ("rating", "title"):
+        index.order(sort)
+    print(f"{args.movies} movies, index + sort orders built in {time.perf_counter() - start:.1f}s\n")
+    print(f"{'query':>6} {'genre':>8} {'sort':>10} {'page':>6} {'offset ms':>10} {'cursor ms':>10} {'same':>5}")
+
+    for query, genre, sort in CASES:
+        cursor, page_times, pages = None, [], []
+        for page in range(1, max(args.depths) + 1):
+            start = time.perf_counter()
+            rows, cursor, _ = index.page(query, genre, sort, limit=args.limit, cursor=cursor)
+            page_times.append((time.perf_counter() - start) * 1000)
+            pages.append(rows)
+            if cursor is None:
+                break
+        for depth in args.depths:
+            if depth > len(pages):
+                continue
+            start = time.perf_counter()
+            legacy = legacy_page(movie_db, query, genre, sort, (depth - 1) * args.limit, args.limit)
+            legacy_ms = (time.perf_counter() - start) * 1000
+            print(f"{query!r:>6} {genre:>8} {sort:>10} {depth:>6} {legacy_ms:10.2f} "
+                  f"{page_times[depth - 1]:10.3f} {str(legacy == pages[depth - 1]):>5}")
+        print(f"{'':>27} mean cursor page {np.mean(page_times):.3f} ms over {len(pages)} pages")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Cold-start breakdown of api.py: eager import-time loading vs. background loading.
+
+    python -m benchmarks.bench_startup --movies 1000000
+    python -m benchmarks.bench_startup --movies 100000 --model . --backend tf
+
+Every scenario starts `uvicorn api:app` in a fresh process and polls it.
+The first three columns are wall-clock times from process start:
+  listening  first 200 from /healthz
+  search     first 200 from /search
+  ready      /readyz turns 200
+The rest is the server's own breakdown from /readyz: import of api.py,
+catalog load, index builds (or the SERVING_CACHE_DIR hit), model load
+and warmup.
+Scenarios:
+  eager   API_EAGER_LOAD=1 (the old behaviour: everything before the port opens)
+  lazy    background load, no serving cache
+  cold    background load, SERVING_CACHE_DIR empty (builds and writes it)
+  cached  same cache dir again: indexes are unpickled instead of built
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.loadtest import prepare_workdir, server_env
+
+SCENARIOS = ("eager", "lazy", "cold", "cached")
+STAGES = ("import", "catalog", "indexes", "model_load", "model_warmup")
+
+
+def start(workdir, env, timeout=600):
+    import requests
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    url = f"http://127.0.0.1:{port}"
+    began = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "api:app", "--port", str(port),
+                             "--log-level", "warning"], cwd=workdir, env=env, stdout=subprocess.DEVNULL)
+    seen, stages = {}, {}
+    try:
+        while "ready" not in seen:
+            if time.perf_counter() - began > timeout or proc.poll() is not None:
+                raise RuntimeError("server did not become ready")
+            for name, method, path, body in (("listening", "get", "/healthz", None),
+                                             ("search", "post", "/search", {"query": "star"}),
+                                             ("ready", "get", "/readyz", None)):
+                if name in seen:
+                    continue
+                try:
+                    r = requests.request(method, url + path, json=body, timeout=5)
+                except requests.RequestException:
+                    break
+                if r.status_code == 200:
+                    seen[name] = time.perf_counter() - began
+                    if name == "ready":
+                        stages = r.json()["startup_seconds"]
+            time.sleep(0.01)
+    finally:
+        proc.terminate()
+        proc.wait()
+    stages["indexes"] = sum(stages.pop(key, 0) for key in ("search_index", "indexes", "indexes_cached"))
+    return seen, stages
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--movies", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--model", help="dir with my_model/ and/or my_embeddings/ (default: stub export)")
+    parser.add_argument("--backend", choices=["auto", "numpy", "tf"], default="auto")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    args = parser.parse_args()
+
+    workdir, model = prepare_workdir({"movies": args.movies, "users": args.users, "seed": 0}, args.model)
+    cache_dir = tempfile.mkdtemp(prefix="serving-cache-")
+    print(f"{args.movies} movies, {model} model, backend {args.backend}\n")
+    print(f"{'scenario':>8} {'listening':>10} {'search':>8} {'ready':>8} | "
+          + " ".join(f"{stage:>12}" for stage in STAGES))
+    for scenario in args.scenarios:
+        env = dict(server_env(workdir), RETRIEVAL_BACKEND=args.backend)
+        if scenario == "eager":
+            env["API_EAGER_LOAD"] = "1"
+        if scenario in ("cold", "cached"):
+            env["SERVING_CACHE_DIR"] = cache_dir
+        seen, stages = start(workdir, env)
+        print(f"{scenario:>8} {seen['listening']:10.2f} {seen['search']:8.2f} {seen['ready']:8.2f} | "
+              + " ".join(f"{stages.get(stage, 0):12.2f}" for stage in STAGES))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Micro-benchmark: per-title DataFrame scan (old get_movie_details) vs TitleIndex.
+
+    python -m benchmarks.bench_title_lookup --movies 100000 --k 10
+"""
+import argparse
+import time
+
+import numpy as np
+
+from catalog import TitleIndex
+from benchmarks.synthetic import make_catalog
+
+
+def legacy_lookup(movie_db, title_list):
+    # The original api.get_movie_details, kept here as the baseline
+    results = []
+    for title in title_list:
+        clean_title = title.strip()
+        match = movie_db[movie_db['title'].str.lower() == clean_title.lower()]
+        if not match.empty:
+            row = match.iloc[0]
+            results.append({
+                "title": row['title'],
+                "poster_path": row['poster_path'],
+                "rating": f"{row['rating']}% Match"
+            })
+    return results
+
+
+def time_calls(fn, batches, repeat):
+    times = []
+    for _ in range(repeat):
+        for batch in batches:
+            start = time.perf_counter()
+            fn(batch)
+            times.append(time.perf_counter() - start)
+    return np.array(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--movies", type=int, default=100_000)
+    parser.add_argument("--k", type=int, default=10, help="titles per request")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    movie_db = make_catalog(args.movies)
+    rng = np.random.default_rng(1)
+
+    # Half the titles hit (mixed case + padding), half miss, like MovieLens picks
+    titles = movie_db["title"].tolist()
+    batches = []
+    for _ in range(args.requests):
+        picks = [f"  {titles[i].upper()} " for i in rng.integers(0, len(titles), args.k // 2)]
+        picks += [f"Unknown Movie ({1990 + j})" for j in range(args.k - len(picks))]
+        batches.append(picks)
+
+    start = time.perf_counter()
+    index = TitleIndex(movie_db)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    assert [r["title"] for r in index.lookup(batches[0])] == \
+        [r["title"] for r in legacy_lookup(movie_db, batches[0])]
+
+    legacy = time_calls(lambda b: legacy_lookup(movie_db, b), batches, 1)
+    indexed = time_calls(index.lookup, batches, args.repeat)
+
+    print(f"Catalog: {args.movies} movies, {args.k} titles/request")
+    print(f"Index build: {build_ms:.1f} ms ({len(index)} keys)")
+    for name, t in (("legacy scan", legacy), ("title index", indexed)):
+        print(f"{name:>12}: p50 {np.percentile(t, 50):9.4f} ms   p99 {np.percentile(t, 99):9.4f} ms")
+    print(f"Speedup (p50): {np.percentile(legacy, 50) / np.percentile(indexed, 50):.0f}x")
+
+
+if __name__ == "__main__":
+    main()
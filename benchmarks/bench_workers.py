@@ -0,0 +1,158 @@
+"""
+Multi-process serving: `uvicorn --workers N` vs. `serve.py --workers N` (pre-fork, shared state).
+
+    python -m benchmarks.bench_workers --movies 1000000 --workers 1 2 4 8
+
+For each launcher and worker count the server is started over localhost
+on a synthetic catalog (compiled, memory-mapped) and a stub embedding
+export, then driven closed-loop for --seconds with a /recommend + /search
+mix. Reported per run: time until every worker is up, req/s and p50/p99,
+and memory over the whole process tree after the load:
+  RSS  summed per process (counts shared pages once per process)
+  PSS  proportional set size: shared pages split between their users,
+       i.e. what the workers really cost the machine
+The client runs on the same machine, so req/s only scales while it has
+spare cores; memory is the number that does not depend on the host.
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.loadtest import REPO, prepare_workdir, server_env
+from benchmarks.synthetic import WORDS, zipf_user_ids
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def process_tree(pid):
+    pids = [pid]
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/task/{p}/children") as f:
+                pids += [int(c) for c in f.read().split()]
+        except FileNotFoundError:
+            pass
+    return pids
+
+
+def tree_memory_mb(pid):
+    rss = pss = 0
+    for p in process_tree(pid):
+        try:
+            with open(f"/proc/{p}/smaps_rollup") as f:
+                fields = dict(line.split(":", 1) for line in f if ":" in line and not line.startswith(" "))
+        except FileNotFoundError:
+            continue
+        rss += int(fields.get("Rss", "0 kB").split()[0])
+        pss += int(fields.get("Pss", "0 kB").split()[0])
+    return rss / 1024, pss / 1024
+
+
+def start_server(launcher, workers, workdir, port, timeout=600):
+    """
+    Starts the server and waits for every worker's "Application startup complete".
+    """
+    if launcher == "uvicorn":
+        cmd = [sys.executable, "-m", "uvicorn", "api:app", "--port", str(port), "--workers", str(workers)]
+    else:
+        cmd = [sys.executable, os.path.join(REPO, "serve.py"), "--port", str(port), "--workers", str(workers)]
+    # Eager load: "startup complete" then means the catalog and model are in
+    env = dict(server_env(workdir), RETRIEVAL_BACKEND="numpy", RECOMMEND_CACHE_SIZE="0",
+               PYTHONUNBUFFERED="1", API_EAGER_LOAD="1")
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                            text=True)
+    ready = 0
+    deadline = time.monotonic() + timeout
+    for line in proc.stderr:
+        ready += "Application startup complete" in line
+        if ready == workers:
+            break
+        if time.monotonic() > deadline:
+            break
+    if ready < workers:
+        proc.kill()
+        raise RuntimeError(f"{launcher}: only {ready}/{workers} workers started")
+    startup = time.perf_counter() - start
+    # keep draining the log so workers never block on a full pipe
+    threading.Thread(target=lambda: [None for _ in proc.stderr], daemon=True).start()
+    return proc, startup
+
+
+def drive(url, seconds, clients, users, movies_per_query=12):
+    """
+    Closed loop: each client thread sends its next request when the last one returns.
+    """
+    import requests
+
+    latencies = [[] for _ in range(clients)]
+    errors = [0] * clients
+    stop = time.perf_counter() + seconds
+
+    def client(i):
+        session = requests.Session()
+        rng = np.random.default_rng(i)
+        while time.perf_counter() < stop:
+            if rng.random() < 0.7:
+                path, body = "/recommend", {"user_id": users[int(rng.integers(len(users)))]}
+            else:
+                path, body = "/search", {"query": str(rng.choice(WORDS)), "limit": movies_per_query}
+            sent = time.perf_counter()
+            try:
+                ok = session.post(url + path, json=body, timeout=30).status_code == 200
+            except Exception:
+                ok = False
+            latencies[i].append(time.perf_counter() - sent)
+            errors[i] += not ok
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    ms = np.concatenate([np.asarray(l) for l in latencies]) * 1000
+    return len(ms) / seconds, np.percentile(ms, 50), np.percentile(ms, 99), sum(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--movies", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--launchers", nargs="+", choices=["uvicorn", "serve"], default=["uvicorn", "serve"])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--clients", type=int, default=16)
+    args = parser.parse_args()
+
+    workdir, model = prepare_workdir({"movies": args.movies, "users": args.users, "seed": 0}, None)
+    users = zipf_user_ids(args.users, 100_000)
+    print(f"{args.movies} movies, {model} model, {os.cpu_count()} cores, "
+          f"{args.clients} clients x {args.seconds:.0f}s\n")
+    print(f"{'launcher':>8} {'workers':>7} {'start s':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'err':>5} {'RSS MB':>8} {'PSS MB':>8} {'PSS/worker':>10}")
+    for launcher in args.launchers:
+        for workers in args.workers:
+            port = free_port()
+            proc, startup = start_server(launcher, workers, workdir, port)
+            try:
+                qps, p50, p99, errors = drive(f"http://127.0.0.1:{port}", args.seconds, args.clients, users)
+                rss, pss = tree_memory_mb(proc.pid)
+            finally:
+                proc.terminate()
+                proc.wait()
+            print(f"{launcher:>8} {workers:7d} {startup:8.1f} {qps:8.0f} {p50:8.2f} {p99:8.2f} "
+                  f"{errors:5d} {rss:8.0f} {pss:8.0f} {pss / workers:10.0f}")
+
+
+if __name__ == "__main__":
+    main()
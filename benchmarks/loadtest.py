@@ -0,0 +1,316 @@
+"""
+Replayable load test for the FastAPI service (no network needed).
+
+    # 1. Record a trace: synthetic catalog + Zipfian users -> benchmarks/requests.jsonl
+    python -m benchmarks.loadtest record --movies 100000 --users 50000 --requests 20000
+
+    # 2. Replay it against api.app in-process, or over localhost uvicorn
+    python -m benchmarks.loadtest replay --target inprocess --qps 300
+    python -m benchmarks.loadtest replay --target uvicorn --qps 300
+
+The first trace line holds the setup (catalog size, users, seed), so a
+replay regenerates the same catalog in a temp working directory and
+starts api.py there. The model is --model (a dir with my_model/ and/or
+my_embeddings/); when it has neither, a random stub export over the
+synthetic titles is served through NumpyRetrieval.
+
+Requests are sent open-loop at --qps (0 = as fast as --workers allow);
+latency counts from the scheduled send time, so a stalled server is not
+hidden by the client slowing down. Endpoints are replayed one at a time
+(or interleaved with --mixed) and reported with throughput, p50/p95/p99,
+429 rejections, errors and server RSS.
+Every run is appended to benchmarks/results/loadtest.jsonl with the git
+commit, and compared with the previous run of the same configuration.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.synthetic import GENRES, WORDS, make_catalog, make_stub_embeddings, zipf_user_ids
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TRACE_PATH = os.path.join(REPO, "benchmarks", "requests.jsonl")
+RESULTS_PATH = os.path.join(REPO, "benchmarks", "results", "loadtest.jsonl")
+ENDPOINT_MIX = {"/recommend": 0.7, "/search": 0.2, "/recommend/batch": 0.1}
+
+
+# ==========================================
+# 1. TRACES
+# ==========================================
+def record(path, movies, users, n_requests, seed=0):
+    rng = np.random.default_rng(seed)
+    user_stream = iter(zipf_user_ids(users, n_requests * 8, seed=seed))
+    paths = rng.choice(list(ENDPOINT_MIX), n_requests, p=list(ENDPOINT_MIX.values()))
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        f.write(json.dumps({"setup": {"movies": movies, "users": users, "seed": seed}}) + "\n")
+        for endpoint in paths:
+            if endpoint == "/recommend":
+                body = {"user_id": next(user_stream)}
+            elif endpoint == "/recommend/batch":
+                body = {"user_ids": [next(user_stream) for _ in range(8)]}
+            else:
+                query = str(rng.choice(WORDS))[:int(rng.integers(2, 6))]
+                genre = "All" if rng.random() < 0.5 else str(rng.choice(GENRES))
+                body = {"query": query, "genre": genre}
+            f.write(json.dumps({"path": str(endpoint), "body": body}) + "\n")
+    print(f"SUCCESS: Recorded {n_requests} requests to {path}")
+
+
+def load_trace(path):
+    with open(path) as f:
+        setup = json.loads(f.readline())["setup"]
+        return setup, [json.loads(line) for line in f if line.strip()]
+
+
+# ==========================================
+# 2. SERVER UNDER TEST
+# ==========================================
+def prepare_workdir(setup, model):
+    """
+    Temp dir laid out like the repo root: movies.csv (+ compiled catalog)
+    and either the given model or a stub export.
+    """
+    from catalog import compile_catalog
+
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    movie_db = make_catalog(setup["movies"], seed=setup["seed"])
+    movie_db.to_csv(os.path.join(workdir, "movies.csv"), index=False)
+    compile_catalog(os.path.join(workdir, "movies.csv"), os.path.join(workdir, "movies_catalog"))
+    linked = False
+    for name in ("my_model", "my_embeddings"):
+        if model and os.path.isdir(os.path.join(model, name)):
+            os.symlink(os.path.abspath(os.path.join(model, name)), os.path.join(workdir, name))
+            linked = True
+    if not linked:
+        make_stub_embeddings(os.path.join(workdir, "my_embeddings"), movie_db, setup["users"])
+    return workdir, "model" if linked else "stub"
+
+
+def rss_mb(pid="self"):
+    status = dict(line.split(":", 1) for line in open(f"/proc/{pid}/status"))
+    return {"rss_mb": int(status["VmRSS"].split()[0]) // 1024,
+            "peak_rss_mb": int(status["VmHWM"].split()[0]) // 1024}
+
+
+def server_env(workdir):
+    env = dict(os.environ, MODELS_DIR=os.path.join(workdir, "models"), RECOMMEND_CACHE_WARMUP="0")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [REPO, env.get("PYTHONPATH")]))
+    return env
+
+
+class InProcessTarget:
+    """
+    api.app through FastAPI's TestClient: no sockets, measures the app itself.
+    """
+
+    def __init__(self, workdir):
+        os.environ.update(server_env(workdir))
+        os.chdir(workdir)
+        from fastapi.testclient import TestClient
+        import api
+        api.loaded.wait()   # the catalog and model load on a background thread
+        self.client = TestClient(api.app)
+        self.pid = "self"
+
+    def send(self, path, body):
+        return self.client.post(path, json=body).status_code
+
+    def close(self):
+        os.chdir(REPO)
+
+
+class UvicornTarget:
+    """
+    `uvicorn api:app` in a subprocess on a free localhost port.
+    """
+
+    def __init__(self, workdir, timeout=300):
+        import requests
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "api:app", "--port", str(port), "--log-level", "warning"],
+            cwd=workdir, env=server_env(workdir), stdout=subprocess.DEVNULL,
+        )
+        self.pid = self.proc.pid
+        self._local = threading.local()
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                if requests.get(self.url + "/readyz", timeout=1).status_code == 200:
+                    return
+            except requests.RequestException:
+                pass
+            if self.proc.poll() is not None:
+                raise RuntimeError("uvicorn exited during startup")
+            time.sleep(0.2)
+        raise TimeoutError("uvicorn did not start")
+
+    def send(self, path, body):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            import requests
+            session = self._local.session = requests.Session()
+        return session.post(self.url + path, json=body, timeout=30).status_code
+
+    def close(self):
+        self.proc.terminate()
+        self.proc.wait()
+
+
+# ==========================================
+# 3. REPLAY
+# ==========================================
+def replay(target, trace, qps, workers):
+    """
+    Open-loop: request i is due at start + i / qps.
+    Returns stats per endpoint (one entry when replaying a single endpoint).
+    """
+    latencies = np.zeros(len(trace))
+    statuses = np.zeros(len(trace), dtype=np.int32)
+
+    def one(i, due):
+        try:
+            statuses[i] = target.send(trace[i]["path"], trace[i]["body"])
+        except Exception:
+            statuses[i] = -1
+        latencies[i] = time.perf_counter() - due
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for i in range(len(trace)):
+            due = start + i / qps if qps else time.perf_counter()
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(one, i, due)
+    elapsed = time.perf_counter() - start
+    memory = rss_mb(target.pid)
+    paths = np.array([r["path"] for r in trace])
+    stats = {}
+    for endpoint in dict.fromkeys(paths.tolist()):
+        mask = paths == endpoint
+        ms = latencies[mask] * 1000
+        stats[endpoint] = {
+            "requests": int(mask.sum()),
+            "throughput": round(float(mask.sum()) / elapsed, 1),
+            "p50_ms": round(float(np.percentile(ms, 50)), 2),
+            "p95_ms": round(float(np.percentile(ms, 95)), 2),
+            "p99_ms": round(float(np.percentile(ms, 99)), 2),
+            "max_ms": round(float(ms.max()), 2),
+            "rejected": int((statuses[mask] == 429).sum()),
+            "errors": int(((statuses[mask] != 200) & (statuses[mask] != 429)).sum()),
+            **memory,
+        }
+    return stats
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def store(run, path=RESULTS_PATH):
+    """
+    Appends the run and returns the previous run with the same configuration.
+    """
+    previous = None
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                old = json.loads(line)
+                if old["config"] == run["config"]:
+                    previous = old
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a") as f:
+        f.write(json.dumps(run) + "\n")
+    return previous
+
+
+def report(run, previous):
+    print(f"{'endpoint':>18} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'429':>5} {'err':>5} "
+          f"{'rss MB':>7}")
+    for endpoint, s in run["endpoints"].items():
+        line = (f"{endpoint:>18} {s['throughput']:8.0f} {s['p50_ms']:8.2f} {s['p95_ms']:8.2f} "
+                f"{s['p99_ms']:8.2f} {s['max_ms']:8.2f} {s.get('rejected', 0):5d} {s['errors']:5d} "
+                f"{s['rss_mb']:7d}")
+        old = previous and previous["endpoints"].get(endpoint)
+        if old:
+            line += (f"   vs {previous['commit']}: p99 {s['p99_ms'] - old['p99_ms']:+.2f} ms, "
+                     f"req/s {s['throughput'] - old['throughput']:+.0f}")
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record / replay load tests against api.py")
+    parser.add_argument("command", choices=["record", "replay"])
+    parser.add_argument("--trace", default=TRACE_PATH)
+    parser.add_argument("--movies", type=int, default=100_000, help="record: catalog size (1k-1M)")
+    parser.add_argument("--users", type=int, default=50_000, help="record: user population")
+    parser.add_argument("--requests", type=int, default=20_000, help="record: trace length")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--target", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--qps", type=float, default=300, help="replay: 0 = closed loop")
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--mixed", action="store_true",
+                        help="replay: all endpoints interleaved as recorded, instead of one at a time")
+    parser.add_argument("--model", default=os.getcwd(), help="dir with my_model/ or my_embeddings/")
+    parser.add_argument("--stub", action="store_true", help="ignore --model, serve a stub export")
+    parser.add_argument("--results", default=RESULTS_PATH)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args.trace, args.movies, args.users, args.requests, args.seed)
+        return
+
+    setup, trace = load_trace(args.trace)
+    workdir, model = prepare_workdir(setup, None if args.stub else args.model)
+    print(f"{len(trace)} requests, {setup['movies']} movies, {setup['users']} users, "
+          f"{model} model, {args.target}, {args.qps or 'max'} qps")
+    start = time.perf_counter()
+    target = InProcessTarget(workdir) if args.target == "inprocess" else UvicornTarget(workdir)
+    startup = time.perf_counter() - start
+    try:
+        if args.mixed:
+            endpoints = replay(target, trace, args.qps, args.workers)
+        else:
+            endpoints = {}
+            for endpoint in ENDPOINT_MIX:
+                requests_for = [r for r in trace if r["path"] == endpoint]
+                if requests_for:
+                    endpoints.update(replay(target, requests_for, args.qps, args.workers))
+    finally:
+        target.close()
+
+    run = {
+        "commit": git_commit(),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "config": {"target": args.target, "qps": args.qps, "workers": args.workers, "model": model,
+                   "mixed": args.mixed, **setup, "requests": len(trace)},
+        "startup_s": round(startup, 2),
+        "endpoints": endpoints,
+    }
+    previous = store(run, args.results)
+    print(f"startup {run['startup_s']}s")
+    report(run, previous)
+    print(f"Results appended to {args.results}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# SYNTHETIC CATALOGS (no network needed)
+# ==========================================
+GENRES = ["Action", "Adventure", "Animation", "Comedy", "Crime", "Documentary",
+          "Drama", "Family", "Fantasy", "History", "Horror", "Music", "Mystery",
+          "Romance", "Sci-Fi", "Thriller", "War", "Western"]
+
+WORDS = ["night", "star", "dark", "love", "last", "city", "war", "king", "dream",
+         "river", "ghost", "fire", "blood", "storm", "shadow", "heart", "road",
+         "home", "queen", "iron", "secret", "wild", "lost", "silent", "golden",
+         "red", "blue", "winter", "summer", "hunter", "island", "machine", "zero"]
+
+
+def make_catalog(n_movies, seed=0):
+    """
+    Builds a movies.csv-shaped DataFrame (all str columns, like api.py loads it).
+    Titles are random word combos plus a unique suffix, so every title is distinct.
+    """
+    rng = np.random.default_rng(seed)
+    words = np.array(WORDS)
+    w1 = words[rng.integers(0, len(words), n_movies)]
+    w2 = words[rng.integers(0, len(words), n_movies)]
+    titles = [f"The {a.title()} {b.title()} {i}" for i, (a, b) in enumerate(zip(w1, w2))]
+
+    genres = np.array(GENRES)[rng.integers(0, len(GENRES), n_movies)]
+    ratings = rng.integers(0, 101, n_movies)
+    ids = rng.permutation(n_movies) + 1
+
+    return pd.DataFrame({
+        "title": titles,
+        "genre": genres,
+        "rating": ratings.astype(str),
+        "poster_path": [f"/poster{i}.jpg" for i in range(n_movies)],
+        "overview": [f"A story about the {a} and the {b}." for a, b in zip(w1, w2)],
+        "id": ids.astype(str),
+    })
+
+
+def zipf_user_ids(n_users, n_requests, a=1.1, seed=0):
+    """
+    Request stream over user ids "1".."n_users" with Zipfian popularity:
+    a few heavy users, a long tail (rank r has weight 1 / r**a).
+    """
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, n_users + 1) ** a
+    users = rng.choice(n_users, n_requests, p=weights / weights.sum()) + 1
+    return [str(u) for u in users]
+
+
+def make_stub_embeddings(path, movie_db, n_users, dim=32, seed=0):
+    """
+    Random two-tower export over the catalog's titles, served by
+    NumpyRetrieval like a real model (for when my_model/ is absent).
+    """
+    from retrieval import OOV_TOKEN, save_embeddings
+
+    rng = np.random.default_rng(seed)
+    titles = movie_db["title"].tolist()
+    save_embeddings(
+        path,
+        user_ids=[OOV_TOKEN] + [str(u) for u in range(1, n_users + 1)],
+        user_embeddings=rng.normal(size=(n_users + 1, dim)).astype(np.float32),
+        movie_titles=titles,
+        movie_embeddings=rng.normal(size=(len(titles), dim)).astype(np.float32),
+    )
+    return path
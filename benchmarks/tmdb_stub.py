@@ -0,0 +1,131 @@
+"""
+Local stand-in for the TMDB v3 API, replaying canned pages built from a
+movies.csv (or a synthetic catalog). Serves:
+  /3/movie/popular?page=N   /3/movie/changes?page=N   /3/movie/<id>
+
+    python -m benchmarks.tmdb_stub --port 8765 --latency-ms 50 --fail-rate 0.1
+    TMDB_API_KEY=stub TMDB_BASE_URL=http://127.0.0.1:8765/3 python fetch_real_data.py
+"""
+import argparse
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+from fetch_real_data import GENRE_MAP
+
+GENRE_IDS = {name: gid for gid, name in GENRE_MAP.items()}
+PAGE_SIZE = 20
+
+
+def tmdb_item(row):
+    return {
+        "id": int(row["id"]),
+        "title": row["title"],
+        "genre_ids": [GENRE_IDS.get(row["genre"], 18)],
+        "vote_average": int(row["rating"] or 0) / 10,
+        "poster_path": row["poster_path"] or None,
+        "overview": row["overview"],
+    }
+
+
+class StubTMDB:
+    """
+    Canned TMDB responses plus knobs for latency and injected failures
+    (429 with Retry-After, or 500). `changed` is the id list /movie/changes returns.
+    """
+
+    def __init__(self, movie_db, latency_ms=0, fail_rate=0.0, seed=0):
+        self.items = [tmdb_item(row) for row in movie_db.to_dict(orient="records")]
+        self.by_id = {item["id"]: item for item in self.items}
+        self.latency = latency_ms / 1000
+        self.fail_rate = fail_rate
+        self.changed = []
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def respond(self, path, query):
+        """
+        Returns (status, headers, body dict).
+        """
+        with self._lock:
+            self.requests += 1
+            fail = self._rng.random() < self.fail_rate
+        if fail:
+            if self._rng.random() < 0.5:
+                return 429, {"Retry-After": "0.05"}, {"status_message": "rate limited"}
+            return 500, {}, {"status_message": "internal error"}
+
+        page = int(query.get("page", ["1"])[0])
+        if path == "/3/movie/popular":
+            total = max(1, -(-len(self.items) // PAGE_SIZE))
+            results = self.items[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+            return 200, {}, {"page": page, "results": results, "total_pages": total}
+        if path == "/3/movie/changes":
+            total = max(1, -(-len(self.changed) // 100))
+            ids = self.changed[(page - 1) * 100:page * 100]
+            return 200, {}, {"page": page, "results": [{"id": i} for i in ids], "total_pages": total}
+        if path.startswith("/3/movie/"):
+            item = self.by_id.get(int(path.rsplit("/", 1)[1]) if path.rsplit("/", 1)[1].isdigit() else -1)
+            if item is None:
+                return 404, {}, {"status_message": "not found"}
+            details = {k: v for k, v in item.items() if k != "genre_ids"}
+            details["genres"] = [{"id": g, "name": GENRE_MAP.get(g, "Drama")} for g in item["genre_ids"]]
+            return 200, {}, details
+        return 404, {}, {"status_message": "not found"}
+
+    def serve(self, port=0):
+        """
+        Starts a threaded HTTP server in the background; returns (server, base_url).
+        """
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if stub.latency:
+                    threading.Event().wait(stub.latency)
+                url = urlparse(self.path)
+                status, headers, body = stub.respond(url.path, parse_qs(url.query))
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server, f"http://127.0.0.1:{server.server_address[1]}/3"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--csv", default="movies.csv")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stub = StubTMDB(pd.read_csv(args.csv, dtype=str).fillna(""), args.latency_ms, args.fail_rate)
+    server, base_url = stub.serve(args.port)
+    print(f"Stub TMDB serving {len(stub.items)} movies at {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+import json
+import os
+import re
+import unicodedata
+
+import numpy as np
+
+from vector_index import save_atomic
+
+# ==========================================
+# 1. TITLE NORMALIZATION
+# ==========================================
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_title(title):
+    """
+    Canonical form used as the lookup key: NFKC + casefold,
+    punctuation turned into spaces, whitespace collapsed.
+    "  Spider-Man: No Way Home " -> "spider man no way home"
+    """
+    text = unicodedata.normalize("NFKC", str(title)).casefold()
+    text = _PUNCT_RE.sub(" ", text)
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+# ==========================================
+# 2. TITLE INDEX
+# ==========================================
+DUPLICATE_POLICIES = ("first", "last", "best_rated")
+
+
+def _rating_value(rating):
+    try:
+        return float(rating)
+    except (TypeError, ValueError):
+        return -1.0
+
+
+class TitleIndex:
+    """
+    Hash index from normalized title -> catalog row.
+    Built once at startup so resolving k titles is O(k) instead of
+    k full scans over the catalog.
+
+    on_duplicate decides which row wins when two titles normalize to
+    the same key: "first" (CSV order, same as the old scan), "last",
+    or "best_rated".
+    rows: (title, poster_path, rating) sequence to format results from;
+    defaults to row_tuples(movie_db).
+    """
+
+    def __init__(self, movie_db, on_duplicate="first", rows=None):
+        if on_duplicate not in DUPLICATE_POLICIES:
+            raise ValueError(f"on_duplicate must be one of {DUPLICATE_POLICIES}")
+        self.on_duplicate = on_duplicate
+        self._keys = {}
+        self._rows = rows
+
+        if movie_db is None or len(movie_db) == 0:
+            return
+        if self._rows is None:
+            self._rows = row_tuples(movie_db)
+
+        # Plain lists are much cheaper to walk than DataFrame rows
+        for row, title in enumerate(movie_db["title"].tolist()):
+            key = normalize_title(title)
+            if not key:
+                continue
+            current = self._keys.get(key)
+            if current is None or self._replaces(current, row):
+                self._keys[key] = row
+
+    def _replaces(self, current, candidate):
+        if self.on_duplicate == "last":
+            return True
+        if self.on_duplicate == "best_rated":
+            return _rating_value(self._rows[candidate][2]) > _rating_value(self._rows[current][2])
+        return False
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, title):
+        return normalize_title(title) in self._keys
+
+    def get(self, title):
+        """
+        Returns the (title, poster_path, rating) record or None.
+        """
+        row = self._keys.get(normalize_title(title))
+        return None if row is None else self._rows[row]
+
+    def rows(self, title_list):
+        """
+        Catalog row ids of the known titles, in order.
+        """
+        keys = (self._keys.get(normalize_title(title)) for title in title_list)
+        return [row for row in keys if row is not None]
+
+    def lookup(self, title_list):
+        """
+        Resolves AI titles to response objects, skipping unknown titles.
+        """
+        results = []
+        for row in self.rows(title_list):
+            record = self._rows[row]
+            results.append({
+                "title": record[0],
+                "poster_path": record[1],
+                "rating": f"{record[2]}% Match"
+            })
+        return results
+
+
+# ==========================================
+# 3. COLUMNAR CATALOG (memory-mapped)
+# ==========================================
+# `python catalog.py compile` turns movies.csv into a directory of .npy
+# files that every uvicorn worker memory-maps, so the pages are shared
+# between processes instead of each one holding its own pandas frame:
+#   <col>.offsets.npy + <col>.blob.npy   string columns (int32/int64 offsets, utf-8 bytes)
+#   rating.npy                           int8, -1 = missing
+#   id.npy                               int32, -1 = missing
+#   meta.json                            row count + column kinds
+# Columns read back as str, like pd.read_csv(dtype=str).fillna("").
+
+CATALOG_COLUMNS = {
+    "title": "str",
+    "genre": "str",
+    "rating": "int8",
+    "poster_path": "str",
+    "overview": "str",
+    "id": "int32",
+}
+ROW_COLUMNS = ("title", "poster_path", "rating")
+
+
+def _to_int(values, dtype, low, high):
+    out = np.full(len(values), -1, dtype=dtype)
+    for i, value in enumerate(values):
+        try:
+            number = int(float(value))
+        except (TypeError, ValueError):
+            continue
+        if low <= number <= high:
+            out[i] = number
+    return out
+
+
+def _source_stamp(csv_path):
+    stat = os.stat(csv_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _column_files(name, kind):
+    return [f"{name}.offsets.npy", f"{name}.blob.npy"] if kind == "str" else [f"{name}.npy"]
+
+
+def compile_catalog(csv_path, out_path):
+    """
+    Offline step: movies.csv -> columnar catalog directory. meta.json
+    records the CSV's size and mtime so load_catalog can tell when it is stale.
+    """
+    import pandas as pd
+    # Stamped before reading: an edit made while compiling leaves it stale
+    source = _source_stamp(csv_path)
+    df = pd.read_csv(csv_path, dtype=str).fillna("")
+    os.makedirs(out_path, exist_ok=True)
+    columns = {}
+    for name, kind in CATALOG_COLUMNS.items():
+        if name not in df.columns:
+            continue
+        values = df[name].tolist()
+        if kind == "str":
+            encoded = [v.encode("utf-8") for v in values]
+            lengths = np.fromiter((len(b) for b in encoded), dtype=np.int64, count=len(encoded))
+            # int32 offsets unless the column's text passes 2 GB
+            dtype = np.int32 if lengths.sum() < 2**31 else np.int64
+            offsets = np.zeros(len(encoded) + 1, dtype=dtype)
+            np.cumsum(lengths, out=offsets[1:])
+            blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+            arrays = [offsets, blob]
+        elif kind == "int8":
+            arrays = [_to_int(values, np.int8, 0, 127)]
+        else:
+            arrays = [_to_int(values, np.int32, 0, 2**31 - 1)]
+        # A running API may have the previous columns memory-mapped
+        for file_name, array in zip(_column_files(name, kind), arrays):
+            save_atomic(os.path.join(out_path, file_name), lambda f: np.save(f, array))
+        columns[name] = kind
+
+    meta = {"rows": len(df), "columns": columns, "source": source}
+    save_atomic(os.path.join(out_path, "meta.json"), lambda f: f.write(json.dumps(meta, indent=2).encode()))
+    # Columns the CSV no longer has would otherwise linger from an earlier compile
+    for name, kind in CATALOG_COLUMNS.items():
+        if name not in columns:
+            for file_name in _column_files(name, kind):
+                if os.path.exists(os.path.join(out_path, file_name)):
+                    os.remove(os.path.join(out_path, file_name))
+    return out_path
+
+
+def catalog_is_current(csv_path, catalog_path):
+    """
+    True when catalog_path was compiled from csv_path as it is now. A
+    catalog deployed without its CSV counts as current; one compiled
+    before meta.json recorded its source does not.
+    """
+    try:
+        with open(os.path.join(catalog_path, "meta.json")) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if not os.path.exists(csv_path):
+        return True
+    return meta.get("source") == _source_stamp(csv_path)
+
+
+class StringColumn:
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    def tolist(self, start=0, stop=None):
+        # Rows [start, stop) only decode their slice of the blob
+        bounds = self.offsets[start:(len(self) if stop is None else stop) + 1].tolist()
+        if len(bounds) < 2:
+            return []
+        base = bounds[0]
+        data = self.blob[base:bounds[-1]].tobytes()
+        return [data[a - base:b - base].decode("utf-8") for a, b in zip(bounds, bounds[1:])]
+
+
+class IntColumn:
+    def __init__(self, values):
+        self.values = values
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, i):
+        value = int(self.values[i])
+        return str(value) if value >= 0 else ""
+
+    def tolist(self, start=0, stop=None):
+        return [str(v) if v >= 0 else "" for v in self.values[start:stop].tolist()]
+
+
+class ColumnarCatalog:
+    """
+    Read-only, memory-mapped catalog. Supports the slice of the DataFrame
+    API the indexes use: len(), .columns, .empty and catalog[col].tolist().
+    """
+
+    def __init__(self, path, mmap=True):
+        mode = "r" if mmap else None
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        self.path = path
+        self.rows = meta["rows"]
+        self._columns = {}
+        for name, kind in meta["columns"].items():
+            if kind == "str":
+                self._columns[name] = StringColumn(
+                    np.load(os.path.join(path, f"{name}.offsets.npy"), mmap_mode=mode),
+                    np.load(os.path.join(path, f"{name}.blob.npy"), mmap_mode=mode),
+                )
+            else:
+                self._columns[name] = IntColumn(np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode))
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    @property
+    def empty(self):
+        return self.rows == 0
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, name):
+        return self._columns[name]
+
+
+class RowView:
+    """
+    Lazy (title, poster_path, rating) tuples decoded from the mmap on access.
+    """
+
+    def __init__(self, catalog, columns=ROW_COLUMNS):
+        self._columns = [catalog[name] for name in columns]
+        self._len = len(catalog)
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, i):
+        return tuple(column[i] for column in self._columns)
+
+
+def row_tuples(movie_db, columns=ROW_COLUMNS):
+    """
+    Row accessor for formatting responses without touching pandas per request.
+    """
+    if isinstance(movie_db, ColumnarCatalog):
+        return RowView(movie_db, columns)
+    return list(zip(*(movie_db[name].tolist() for name in columns)))
+
+
+def load_catalog(csv_path="movies.csv", catalog_path="movies_catalog"):
+    """
+    Memory-maps the compiled catalog when it is current, else parses the CSV.
+    """
+    if os.path.isdir(catalog_path):
+        if catalog_is_current(csv_path, catalog_path):
+            return ColumnarCatalog(catalog_path)
+        print(f"⚠️ {catalog_path} does not match {csv_path}; reading the CSV instead "
+              f"(python catalog.py compile to refresh it)")
+    # pandas is only imported for the CSV path (~0.3s of startup otherwise)
+    import pandas as pd
+    movie_db = pd.read_csv(csv_path, dtype=str)
+    # CRITICAL: Fill empty values so the server doesn't crash on filter
+    movie_db.fillna("", inplace=True)
+    return movie_db
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compile movies.csv into a memory-mapped catalog")
+    parser.add_argument("command", choices=["compile"])
+    parser.add_argument("--csv", default="movies.csv")
+    parser.add_argument("--out", default="movies_catalog")
+    args = parser.parse_args()
+
+    compile_catalog(args.csv, args.out)
+    print(f"SUCCESS: Catalog compiled to {args.out}")
@@ -0,0 +1,123 @@
+import os
+import time
+
+import numpy as np
+
+# Import after TF_USE_LEGACY_KERAS is set (train.py does this first)
+import tensorflow as tf
+
+# ==========================================
+# STREAMING INTERACTION LOGS (TFRecord shards)
+# ==========================================
+# Each record is a tf.train.Example with the fields train.py keeps from
+# MovieLens: user_id and movie_title, plus the content and history features
+# the towers read (see features.py). Those are optional so older shards
+# still parse; missing ones come back as "" (timestamp as 0).
+# Everything below streams: memory depends on the shuffle buffer and the
+# number of distinct ids, never on the number of rows.
+
+FEATURES = {
+    "user_id": tf.io.FixedLenFeature([], tf.string),
+    "movie_title": tf.io.FixedLenFeature([], tf.string),
+    "genres": tf.io.FixedLenFeature([], tf.string, default_value=""),
+    "text": tf.io.FixedLenFeature([], tf.string, default_value=""),
+    "tmdb_id": tf.io.FixedLenFeature([], tf.string, default_value=""),
+    "history": tf.io.FixedLenFeature([], tf.string, default_value=""),
+    "timestamp": tf.io.FixedLenFeature([], tf.int64, default_value=0),
+}
+AUTOTUNE = tf.data.AUTOTUNE
+
+
+def _feature(value):
+    if isinstance(value, (int, np.integer)):
+        return tf.train.Feature(int64_list=tf.train.Int64List(value=[int(value)]))
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    return tf.train.Feature(bytes_list=tf.train.BytesList(value=[value]))
+
+
+def write_shards(records, out_dir, num_shards=16, prefix="interactions"):
+    """
+    Writes an iterable of {"user_id", "movie_title", ...} dicts (str or
+    bytes values, int timestamp) into round-robin TFRecord shards; keys
+    outside FEATURES are dropped. Returns the number of records written.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    paths = [os.path.join(out_dir, f"{prefix}-{i:05d}-of-{num_shards:05d}.tfrecord")
+             for i in range(num_shards)]
+    writers = [tf.io.TFRecordWriter(p) for p in paths]
+    count = 0
+    try:
+        for record in records:
+            example = tf.train.Example(features=tf.train.Features(feature={
+                name: _feature(value) for name, value in record.items() if name in FEATURES
+            }))
+            writers[count % num_shards].write(example.SerializeToString())
+            count += 1
+    finally:
+        for writer in writers:
+            writer.close()
+    return count
+
+
+def interactions_dataset(pattern, batch_size=4096, shuffle_buffer=0, cycle_length=8, seed=None):
+    """
+    Batched FEATURES dataset over TFRecord shards.
+    Shards are read in parallel (interleave), examples shuffled in a
+    bounded buffer, parsed a whole batch at a time, and prefetched.
+    shuffle_buffer=0 keeps file order (used for the vocabulary pass).
+    """
+    shuffle = shuffle_buffer > 0
+    files = tf.data.Dataset.list_files(pattern, shuffle=shuffle, seed=seed)
+    dataset = files.interleave(
+        lambda path: tf.data.TFRecordDataset(path, buffer_size=8 << 20),
+        cycle_length=cycle_length,
+        num_parallel_calls=AUTOTUNE,
+        deterministic=not shuffle,
+    )
+    if shuffle:
+        dataset = dataset.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size).map(
+        lambda serialized: tf.io.parse_example(serialized, FEATURES),
+        num_parallel_calls=AUTOTUNE,
+    )
+    return dataset.prefetch(AUTOTUNE)
+
+
+def scan_vocabularies(dataset, on_batch=None):
+    """
+    One streaming pass over a batched interaction dataset.
+    Returns (sorted user_ids, sorted movie_titles, number of records);
+    replaces one StringLookup.adapt pass per column. on_batch(batch) sees
+    every NumPy batch too (e.g. features.FeatureScan.update).
+    """
+    users, titles, count = set(), set(), 0
+    for batch in dataset.as_numpy_iterator():
+        if on_batch is not None:
+            on_batch(batch)
+        users.update(batch["user_id"].tolist())
+        titles.update(batch["movie_title"].tolist())
+        count += len(batch["user_id"])
+    decode = lambda values: sorted(v.decode("utf-8") for v in values)
+    return decode(users), decode(titles), count
+
+
+class ThroughputLogger(tf.keras.callbacks.Callback):
+    """
+    Prints records/sec per epoch. `records` is the number of training
+    examples per epoch (counted during the vocabulary pass).
+    """
+
+    def __init__(self, records):
+        super().__init__()
+        self.records = records
+        self.history = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        elapsed = time.perf_counter() - self._start
+        rate = self.records / elapsed if elapsed > 0 else 0.0
+        self.history.append(rate)
+        print(f"⏱️ Epoch {epoch + 1}: {self.records} records in {elapsed:.1f}s ({rate:,.0f} records/sec)")
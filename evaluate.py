@@ -0,0 +1,265 @@
+import csv
+import glob
+import json
+import os
+import time
+
+import numpy as np
+
+from retrieval import DEFAULT_K, OOV_TOKEN, load_embeddings
+from vector_index import INDEX_KINDS, load_index
+
+# ==========================================
+# OFFLINE RETRIEVAL EVALUATION
+# ==========================================
+# Scores what api.py actually serves (an exported my_embeddings/ table and
+# its retrieval index) on held-out interactions, for both quality and cost:
+#   quality  recall@k, NDCG@k, hit rate and catalog coverage of the top-k
+#            lists, plus overlap with brute force (how much the index loses)
+#   cost     index memory, and search latency / QPS per batch size
+# Several exports (models/*/my_embeddings) x index kinds go in one report:
+#
+#   python train.py --holdout holdout.csv
+#   python evaluate.py --holdout holdout.csv --index brute int8 ivfpq
+#   python evaluate.py --holdout "new_logs/*.tfrecord" --embeddings models/*/my_embeddings
+#
+# Held-out pairs whose user or title the export does not know cannot be
+# retrieved by any index and are counted, not scored. MovieLens titles
+# never match movies.csv, so `train.py --holdout` exports the training
+# titles as candidates rather than the catalog.
+# Everything is batched NumPy: one search per --batch-size users, then
+# the metrics over the whole [users, k] result matrix at once.
+
+# ==========================================
+# 1. HELD-OUT INTERACTIONS
+# ==========================================
+def leave_last_out(user_ids, timestamps, min_count=2):
+    """
+    Mask of each user's latest interaction, for users with at least
+    min_count (the rest stay in training so they keep a user vector).
+    """
+    users = np.unique(np.asarray(user_ids), return_inverse=True)[1]
+    order = np.lexsort((np.asarray(timestamps), users))
+    last = np.r_[users[order][1:] != users[order][:-1], True]
+    counts = np.bincount(users)
+    held = np.zeros(len(users), dtype=bool)
+    held[order[last]] = counts[users[order[last]]] >= min_count
+    return held
+
+
+def save_holdout(path, user_ids, titles):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["user_id", "movie_title"])
+        writer.writerows(zip(user_ids, titles))
+    return path
+
+
+def load_holdout(path):
+    """
+    (user_ids, titles) from a user_id,movie_title CSV or a glob of
+    TFRecord interaction shards (data_pipeline.py format).
+    """
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        return [r["user_id"] for r in rows], [r["movie_title"] for r in rows]
+
+    from data_pipeline import interactions_dataset
+    if not glob.glob(path):
+        raise FileNotFoundError(path)
+    user_ids, titles = [], []
+    for batch in interactions_dataset(path, batch_size=65536).as_numpy_iterator():
+        user_ids += [u.decode("utf-8") for u in batch["user_id"]]
+        titles += [t.decode("utf-8") for t in batch["movie_title"]]
+    return user_ids, titles
+
+
+# ==========================================
+# 2. METRICS
+# ==========================================
+class Relevance:
+    """
+    Held-out pairs mapped onto one export: `users` are the user-table rows
+    to query, and each (query i, candidate row) pair is encoded as
+    i * n_candidates + row in the sorted `keys` array.
+    """
+
+    def __init__(self, user_ids, titles, export_users, export_titles):
+        user_rows = {u: i for i, u in enumerate(export_users) if u != OOV_TOKEN}
+        title_rows = {t: i for i, t in enumerate(export_titles)}
+        self.n_candidates = len(export_titles)
+        u = np.fromiter((user_rows.get(x, -1) for x in user_ids), dtype=np.int64, count=len(user_ids))
+        t = np.fromiter((title_rows.get(x, -1) for x in titles), dtype=np.int64, count=len(titles))
+        self.pairs = len(user_ids)
+        self.unknown_users = int((u < 0).sum())
+        self.unknown_titles = int(((u >= 0) & (t < 0)).sum())
+        known = (u >= 0) & (t >= 0)
+        self.users, query = np.unique(u[known], return_inverse=True)
+        self.keys = np.unique(query * self.n_candidates + t[known])
+        self.counts = np.bincount(self.keys // self.n_candidates, minlength=len(self.users))
+
+    def hits(self, found):
+        """
+        Boolean [queries, k]: which retrieved rows are held-out positives.
+        """
+        keys = np.arange(len(found), dtype=np.int64)[:, None] * self.n_candidates + found
+        pos = np.searchsorted(self.keys, keys)
+        pos[pos == len(self.keys)] = 0
+        return (self.keys[pos] == keys) & (found >= 0)
+
+
+def retrieval_metrics(relevance, found, k):
+    hits = relevance.hits(found)
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    ideal = np.cumsum(discounts)[np.minimum(relevance.counts, k) - 1]
+    retrieved = np.unique(found[found >= 0])
+    return {
+        f"recall@{k}": float(np.mean(hits.sum(axis=1) / relevance.counts)),
+        f"ndcg@{k}": float(np.mean((hits * discounts).sum(axis=1) / ideal)),
+        f"hit_rate@{k}": float(np.mean(hits.any(axis=1))),
+        "coverage": len(retrieved) / relevance.n_candidates,
+    }
+
+
+def overlap(found, reference, n_candidates):
+    """
+    Fraction of the reference top-k (brute force) that `found` also returned.
+    """
+    rows = np.arange(len(found), dtype=np.int64)[:, None] * n_candidates
+    keys = np.sort((rows + found)[found >= 0])
+    expected = (rows + reference)[reference >= 0]
+    pos = np.searchsorted(keys, expected)
+    pos[pos == len(keys)] = 0
+    return float((keys[pos] == expected).sum() / max(1, len(expected)))
+
+
+# Brute force materializes [batch, M] scores plus argpartition's int64
+# copy (~12 bytes per cell): big batches are capped to stay under this
+MAX_SCORE_BYTES = 512 * 2**20
+
+
+def search_all(index, queries, k, batch_size, n_candidates=None):
+    if n_candidates:
+        batch_size = max(1, min(batch_size, MAX_SCORE_BYTES // (12 * n_candidates)))
+    return np.concatenate([index.search(queries[i:i + batch_size], k)[1]
+                           for i in range(0, len(queries), batch_size)])
+
+
+def time_batches(index, queries, k, batch_size, min_queries=4096, min_batches=20):
+    """
+    Per-batch search latency over the held-out users (cycled), warm.
+    """
+    queries = np.resize(queries, (max(len(queries), batch_size), queries.shape[1]))
+    n_batches = max(min_batches, -(-min_queries // batch_size))
+    index.search(queries[:batch_size], k)
+    latencies = np.empty(n_batches)
+    for b in range(n_batches):
+        start = (b * batch_size) % (len(queries) - batch_size + 1)
+        began = time.perf_counter()
+        index.search(queries[start:start + batch_size], k)
+        latencies[b] = time.perf_counter() - began
+    return {"batch_size": batch_size, "qps": batch_size / float(latencies.mean()),
+            "p50_ms": float(np.percentile(latencies, 50) * 1000),
+            "p99_ms": float(np.percentile(latencies, 99) * 1000)}
+
+
+def model_name(embeddings_path):
+    path = os.path.abspath(embeddings_path)
+    return os.path.basename(os.path.dirname(path)) if os.path.basename(path) == "my_embeddings" else path
+
+
+def evaluate(embeddings_path, holdout, kinds=("brute",), k=DEFAULT_K, batch_size=1024,
+             timing_batch_sizes=(1, 16, 64, 256), n_probe=None):
+    """
+    One result dict per index kind for one export.
+    """
+    data = load_embeddings(embeddings_path, mmap=False)
+    relevance = Relevance(*holdout, data["user_ids"].tolist(), data["movie_titles"].tolist())
+    if not len(relevance.users):
+        raise ValueError(f"{embeddings_path}: no held-out pair has a known user and title")
+    queries = np.ascontiguousarray(data["user_embeddings"][relevance.users], dtype=np.float32)
+    vectors = np.ascontiguousarray(data["movie_embeddings"], dtype=np.float32)
+
+    results, reference = [], None
+    for kind in kinds:
+        start = time.perf_counter()
+        index = load_index(embeddings_path, kind, vectors, n_probe=n_probe)
+        load_s = time.perf_counter() - start
+        start = time.perf_counter()
+        found = search_all(index, queries, k, batch_size, len(vectors))
+        search_s = time.perf_counter() - start
+        start = time.perf_counter()
+        metrics = retrieval_metrics(relevance, found, k)
+        metrics_s = time.perf_counter() - start
+        if kind == "brute":
+            reference = found
+        results.append({
+            "model": model_name(embeddings_path),
+            "index": kind,
+            "users": len(relevance.users),
+            "pairs": relevance.pairs,
+            "unknown_users": relevance.unknown_users,
+            "unknown_titles": relevance.unknown_titles,
+            **metrics,
+            "vs_brute": overlap(found, reference, relevance.n_candidates) if reference is not None else None,
+            "index_mb": index.nbytes() / 2**20,
+            "load_s": load_s,
+            "eval_s": search_s,
+            "metrics_s": metrics_s,
+            "latency": [time_batches(index, queries, k, size) for size in timing_batch_sizes],
+        })
+    return results
+
+
+# ==========================================
+# 3. REPORT
+# ==========================================
+def report(results, k):
+    print(f"{'model':>16} {'index':>8} {'users':>7} {f'recall@{k}':>10} {f'ndcg@{k}':>8} "
+          f"{f'hit@{k}':>7} {'coverage':>8} {'vs brute':>8} {'MB':>7} {'eval s':>7}")
+    for r in results:
+        vs = f"{r['vs_brute']:8.3f}" if r["vs_brute"] is not None else f"{'-':>8}"
+        print(f"{r['model'][-16:]:>16} {r['index']:>8} {r['users']:7d} {r[f'recall@{k}']:10.4f} "
+              f"{r[f'ndcg@{k}']:8.4f} {r[f'hit_rate@{k}']:7.4f} {r['coverage']:8.4f} {vs} "
+              f"{r['index_mb']:7.1f} {r['eval_s']:7.2f}")
+    skipped = {(r["model"], r["unknown_users"], r["unknown_titles"], r["pairs"]) for r in results}
+    for model, users, titles, pairs in sorted(skipped):
+        if users or titles:
+            print(f"  {model}: {users} of {pairs} pairs have an unknown user, {titles} an unknown title")
+
+    print(f"\n{'model':>16} {'index':>8} {'batch':>6} {'QPS':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for r in results:
+        for t in r["latency"]:
+            print(f"{r['model'][-16:]:>16} {r['index']:>8} {t['batch_size']:6d} {t['qps']:10.0f} "
+                  f"{t['p50_ms']:8.3f} {t['p99_ms']:8.3f}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Offline recall/NDCG/coverage and search cost of served exports")
+    parser.add_argument("--holdout", required=True,
+                        help="user_id,movie_title CSV (train.py --holdout) or a TFRecord shard glob")
+    parser.add_argument("--embeddings", nargs="+", default=[os.path.join(os.getcwd(), "my_embeddings")])
+    parser.add_argument("--index", nargs="+", choices=INDEX_KINDS, default=["brute"])
+    parser.add_argument("--k", type=int, default=DEFAULT_K)
+    parser.add_argument("--n-probe", type=int, help="ivfpq lists probed (default: as saved)")
+    parser.add_argument("--batch-size", type=int, default=1024, help="users per search for the metrics")
+    parser.add_argument("--timing-batch-sizes", type=int, nargs="+", default=[1, 16, 64, 256])
+    parser.add_argument("--out", help="also write the results as JSON")
+    args = parser.parse_args()
+
+    holdout = load_holdout(args.holdout)
+    print(f"{len(holdout[0])} held-out interactions from {args.holdout}, k={args.k}\n")
+    # brute force first, so the other kinds can be compared against it
+    kinds = sorted(args.index, key=lambda kind: kind != "brute")
+    results = []
+    for path in args.embeddings:
+        results += evaluate(path, holdout, kinds, args.k, args.batch_size, args.timing_batch_sizes,
+                            args.n_probe)
+    report(results, args.k)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSUCCESS: Results written to {args.out}")
@@ -0,0 +1,533 @@
+import hashlib
+import io
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from catalog import normalize_title
+
+# ==========================================
+# MODEL FEATURES (shared by train.py and the catalog precompute)
+# ==========================================
+# Both towers read plain string features, so a MovieLens rating, a TFRecord
+# log line and a movies.csv row all become model input the same way:
+#   movie_title   exact title -> title embedding (masked off for titles never trained on)
+#   genres        GENRE_SEP-joined genre names -> multi-hot over GENRES
+#   text          normalized title + overview -> hashed bag of words
+#   tmdb_id       TMDB id as a string, "" when unknown -> hashed embedding
+#   user_id       user embedding
+#   history       the user's previous titles, most recent first, HISTORY_SEP-joined
+# Catalog titles MovieLens never saw still get a vector from genres, text
+# and id, so serving can rank the live catalog instead of backfilling it.
+# The TMDB id and the overview part of text are only learned when the
+# training data carries them (MovieLens has neither). train.py records
+# which ones it saw next to the movie tower, and the precompute blanks the
+# others, so candidates never mix in embeddings that stayed at their
+# random initialization.
+
+GENRES = ["Action", "Adventure", "Animation", "Comedy", "Crime", "Documentary", "Drama", "Family",
+          "Fantasy", "History", "Horror", "Music", "Mystery", "Romance", "Sci-Fi", "Thriller", "War",
+          "Western"]
+# tfds movielens "movie_genres" ids -> catalog genre names (IMAX / Unknown dropped)
+MOVIELENS_GENRES = {0: "Action", 1: "Adventure", 2: "Animation", 3: "Family", 4: "Comedy", 5: "Crime",
+                    6: "Documentary", 7: "Drama", 8: "Fantasy", 9: "Crime", 10: "Horror", 12: "Music",
+                    13: "Mystery", 14: "Romance", 15: "Sci-Fi", 16: "Thriller", 18: "War", 19: "Western"}
+MOVIE_FEATURES = ("movie_title", "genres", "text", "tmdb_id")
+OPTIONAL_INPUTS = ("tmdb_id", "overview")
+TRAINED_INPUTS_FILE = "trained_inputs.json"
+GENRE_SEP = "|"
+HISTORY_SEP = "\t"
+HISTORY_LENGTH = 10
+
+
+# ==========================================
+# 1. FEATURE EXTRACTION
+# ==========================================
+def movie_text(title, overview=""):
+    return normalize_title(f"{title} {overview}")
+
+
+def movielens_genres(genre_ids):
+    names = dict.fromkeys(MOVIELENS_GENRES[int(g)] for g in genre_ids if int(g) in MOVIELENS_GENRES)
+    return GENRE_SEP.join(names)
+
+
+CATALOG_COLUMNS = ("title", "genre", "overview", "id")
+
+
+def _catalog_rows(columns, seen):
+    """
+    Feature dict for one slice of catalog columns ({name: list of str}),
+    skipping titles already in `seen` (which it extends).
+    """
+    titles = columns["title"]
+    blank = [""] * len(titles)
+    rows = {}
+    for title, genre, overview, tmdb_id in zip(titles, columns.get("genre", blank),
+                                               columns.get("overview", blank), columns.get("id", blank)):
+        if title and title not in seen and title not in rows:
+            rows[title] = (genre, movie_text(title, overview), tmdb_id)
+    seen.update(rows)
+    return {
+        "movie_title": list(rows),
+        "genres": [r[0] for r in rows.values()],
+        "text": [r[1] for r in rows.values()],
+        "tmdb_id": [r[2] for r in rows.values()],
+    }
+
+
+def catalog_features(movie_db):
+    """
+    Movie-tower input for every catalog row, {feature: list of str}.
+    Accepts the movies.csv DataFrame or a compiled ColumnarCatalog.
+    Duplicate titles keep their first row, like TitleIndex's default policy.
+    """
+    names = [name for name in CATALOG_COLUMNS if name in set(movie_db.columns)]
+    return _catalog_rows({name: movie_db[name].tolist() for name in names}, set())
+
+
+def catalog_chunks(csv_path="movies.csv", catalog_path="movies_catalog", chunk_rows=100_000):
+    """
+    catalog_features in slices of chunk_rows source rows: row ranges of the
+    memory-mapped catalog when it is compiled, else pandas' chunked CSV
+    reader, so the catalog's features are never all in memory at once.
+    """
+    seen = set()
+    if os.path.isdir(catalog_path):
+        from catalog import ColumnarCatalog
+        movie_db = ColumnarCatalog(catalog_path)
+        names = [name for name in CATALOG_COLUMNS if name in set(movie_db.columns)]
+        for start in range(0, len(movie_db), chunk_rows):
+            yield _catalog_rows({name: movie_db[name].tolist(start, start + chunk_rows) for name in names}, seen)
+        return
+    import pandas as pd
+    for frame in pd.read_csv(csv_path, dtype=str, chunksize=chunk_rows):
+        frame = frame.fillna("")
+        yield _catalog_rows({name: frame[name].tolist() for name in CATALOG_COLUMNS if name in frame.columns},
+                            seen)
+
+
+def feature_chunks(features, chunk_rows=100_000):
+    """
+    An in-memory feature dict (catalog_features, FeatureScan.candidates)
+    as the chunk stream precompute_candidates reads.
+    """
+    for start in range(0, len(features["movie_title"]), chunk_rows):
+        yield {name: features[name][start:start + chunk_rows] for name in MOVIE_FEATURES}
+
+
+def serving_features(features, trained):
+    """
+    Candidate features as the tower was trained: with "tmdb_id" not in
+    `trained` every id is "" (the tower masks the id embedding off), with
+    "overview" not in it the text is the title's alone.
+    """
+    features = dict(features)
+    if "tmdb_id" not in trained:
+        features["tmdb_id"] = [""] * len(features["movie_title"])
+    if "overview" not in trained:
+        features["text"] = [movie_text(title) for title in features["movie_title"]]
+    return features
+
+
+def save_trained_inputs(tower_path, trained):
+    with open(os.path.join(tower_path, TRAINED_INPUTS_FILE), "w") as f:
+        json.dump(sorted(trained), f)
+
+
+def load_trained_inputs(tower_path):
+    """
+    Optional inputs the saved tower learned. Towers saved before this was
+    recorded were trained on MovieLens, so the default is neither.
+    """
+    path = os.path.join(tower_path, TRAINED_INPUTS_FILE)
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return set(json.load(f))
+
+
+def add_histories(user_ids, titles, timestamps, length=HISTORY_LENGTH):
+    """
+    Replays interactions in timestamp order and returns, for each one, the
+    user's `length` previous titles (most recent first) as a HISTORY_SEP-
+    joined string, so no example sees its own title or the future.
+    """
+    histories = [""] * len(titles)
+    recent = {}
+    for i in np.argsort(np.asarray(timestamps), kind="stable").tolist():
+        past = recent.setdefault(user_ids[i], deque(maxlen=length))
+        histories[i] = HISTORY_SEP.join(reversed(past))
+        past.append(titles[i])
+    return histories
+
+
+# ==========================================
+# 2. STREAMING SCAN
+# ==========================================
+class FeatureScan:
+    """
+    Rides along the vocabulary pass (scan_vocabularies on_batch=) and keeps
+    what export needs: each user's latest history, for the precomputed user
+    table, and the features of every title seen, for training candidates.
+    """
+
+    def __init__(self, length=HISTORY_LENGTH):
+        self.length = length
+        self.latest = {}       # user_id -> (timestamp, title, history)
+        self.movies = {}       # title -> (genres, text, tmdb_id)
+        self.trained = set()   # OPTIONAL_INPUTS the interactions carry
+
+    def update(self, batch):
+        decode = lambda values: [v.decode("utf-8") for v in values.tolist()]
+        users, titles = decode(batch["user_id"]), decode(batch["movie_title"])
+        histories = decode(batch["history"])
+        timestamps = batch["timestamp"].tolist()
+        for user, title, history, ts in zip(users, titles, histories, timestamps):
+            seen = self.latest.get(user)
+            if seen is None or ts >= seen[0]:
+                self.latest[user] = (ts, title, history)
+        for title, genres, text, tmdb_id in zip(titles, decode(batch["genres"]), decode(batch["text"]),
+                                                decode(batch["tmdb_id"])):
+            if tmdb_id:
+                self.trained.add("tmdb_id")
+            if title in self.movies:
+                continue
+            own = movie_text(title)
+            if text and text != own:
+                self.trained.add("overview")
+            self.movies[title] = (genres, text or own, tmdb_id)
+
+    def histories(self):
+        """
+        {user_id: history as of the user's last interaction}
+        """
+        out = {}
+        for user, (_, title, history) in self.latest.items():
+            past = [title] + (history.split(HISTORY_SEP) if history else [])
+            out[user] = HISTORY_SEP.join(past[:self.length])
+        return out
+
+    def candidates(self):
+        titles = sorted(self.movies)
+        genres, text, tmdb_ids = zip(*(self.movies[t] for t in titles)) if titles else ((), (), ())
+        return {"movie_title": titles, "genres": list(genres), "text": list(text), "tmdb_id": list(tmdb_ids)}
+
+
+def merge_candidates(old, new):
+    """
+    Union of two candidate feature dicts by title; `new` wins on conflicts.
+    """
+    rows = {}
+    for features in (old, new):
+        for values in zip(*(features[name] for name in MOVIE_FEATURES)):
+            rows[values[0]] = values
+    titles = sorted(rows)
+    return {name: [rows[t][i] for t in titles] for i, name in enumerate(MOVIE_FEATURES)}
+
+
+# ==========================================
+# 3. CANDIDATE PRECOMPUTE (sharded store on disk)
+# ==========================================
+# Serving stays one matmul because the movie tower runs offline: every
+# catalog row is pushed through it and the vectors land in my_embeddings/
+# like any other export. `python features.py embed` is the standalone
+# stage for catalog updates; train.py runs the same code at export.
+#
+# The catalog is streamed in --chunk-rows slices (catalog_chunks), rows
+# that need the tower are cut into --batch-size batches, and --workers
+# batches run at once on a thread pool (TF releases the GIL inside the
+# tower) while up to --prefetch more wait, already built, for a worker.
+#
+# Vectors are kept in my_embeddings/candidates/:
+#   shard-00000.npz ...  ids (int64), hashes (uint64 feature hash), vectors [n, d] float32
+#   manifest.json        tower version, dim, shard count, and per shard its
+#                        rows, content digest (ids + hashes) and file sha256
+# A row's id is its TMDB id; rows without one (or whose id an earlier row
+# took) get a negative hash of the title. Rows live in shard id % shards,
+# so a rerun embeds only rows whose feature hash changed (every row after
+# a new tower) and rewrites only the shards whose content changed. A shard
+# that fails its sha256 is dropped and its rows are embedded again.
+STORE_DIR = "candidates"
+MANIFEST = "manifest.json"
+DEFAULT_SHARDS = 64
+
+
+def _digest64(text):
+    return int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "little")
+
+
+def _tmdb_id(value):
+    try:
+        number = int(float(value))
+    except (TypeError, ValueError, OverflowError):
+        return -1
+    return number if 0 <= number < 2**63 else -1
+
+
+def row_ids(features, seen=None):
+    """
+    Store id per row. `seen` carries the ids handed out so far when a
+    catalog is processed in chunks.
+    """
+    seen = set() if seen is None else seen
+    ids = np.empty(len(features["movie_title"]), dtype=np.int64)
+    for i, (title, tmdb_id) in enumerate(zip(features["movie_title"], features["tmdb_id"])):
+        key = _tmdb_id(tmdb_id)
+        if key < 0 or key in seen:
+            key = -1 - (_digest64(title) >> 1)
+        seen.add(key)
+        ids[i] = key
+    return ids
+
+
+def row_hashes(features):
+    rows = zip(*(features[name] for name in MOVIE_FEATURES))
+    return np.fromiter((_digest64("\x1f".join(values)) for values in rows), dtype=np.uint64,
+                       count=len(features["movie_title"]))
+
+
+class CandidateStore:
+    """
+    The shard files under one store directory. After load(), `ids`,
+    `hashes` and `vectors` hold every usable stored row, sorted by id.
+    """
+
+    def __init__(self, path, shards=DEFAULT_SHARDS):
+        self.path = path
+        self.shards = shards
+        self.ids = np.empty(0, dtype=np.int64)
+        self.hashes = np.empty(0, dtype=np.uint64)
+        self.vectors = None
+        self.files = {}        # shard file -> manifest entry, for the shards read back intact
+        self.corrupt = []
+
+    def load(self, tower_version):
+        """
+        Reads the shards written by tower_version; another tower's store
+        counts as empty (and is replaced on save).
+        """
+        path = os.path.join(self.path, MANIFEST)
+        if not os.path.exists(path):
+            return self
+        with open(path) as f:
+            manifest = json.load(f)
+        if manifest.get("tower") != tower_version:
+            return self
+        self.shards = manifest["shards"]
+        parts = []
+        for name, entry in sorted(manifest["files"].items()):
+            file = os.path.join(self.path, name)
+            try:
+                with open(file, "rb") as f:
+                    data = f.read()
+                if hashlib.sha256(data).hexdigest() != entry["sha256"]:
+                    raise ValueError("checksum mismatch")
+                with np.load(io.BytesIO(data)) as saved:
+                    parts.append((saved["ids"], saved["hashes"], saved["vectors"]))
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️ Candidate shard {file} unusable, re-embedding its rows: {e}")
+                self.corrupt.append(name)
+                continue
+            self.files[name] = entry
+        if parts:
+            ids, hashes, vectors = (np.concatenate(part) for part in zip(*parts))
+            order = np.argsort(ids, kind="stable")
+            self.ids, self.hashes, self.vectors = ids[order], hashes[order], vectors[order]
+        return self
+
+    def lookup(self, ids, hashes):
+        """
+        Row of self.vectors for each (id, feature hash) already stored, -1 otherwise.
+        """
+        if not len(self.ids):
+            return np.full(len(ids), -1, dtype=np.int64)
+        pos = np.searchsorted(self.ids, ids)
+        pos[pos == len(self.ids)] = 0
+        return np.where((self.ids[pos] == ids) & (self.hashes[pos] == hashes), pos, -1)
+
+    def save(self, ids, hashes, vectors, tower_version):
+        """
+        Makes the store hold exactly these rows. Shards whose ids and
+        hashes match what is on disk are kept; returns how many were written.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        order = np.lexsort((ids, ids % self.shards))
+        ids, hashes, vectors = ids[order], hashes[order], vectors[order]
+        bounds = np.r_[0, np.cumsum(np.bincount(ids % self.shards, minlength=self.shards))]
+        files, written = {}, 0
+        for shard in range(self.shards):
+            if bounds[shard] == bounds[shard + 1]:
+                continue
+            rows = slice(bounds[shard], bounds[shard + 1])
+            name = f"shard-{shard:05d}.npz"
+            content = hashlib.sha1(ids[rows].tobytes() + hashes[rows].tobytes()).hexdigest()
+            entry = self.files.get(name)
+            if entry is None or entry["content"] != content:
+                buffer = io.BytesIO()
+                np.savez(buffer, ids=ids[rows], hashes=hashes[rows], vectors=vectors[rows])
+                data = buffer.getvalue()
+                self._write(name, data)
+                entry = {"rows": int(bounds[shard + 1] - bounds[shard]), "content": content,
+                         "sha256": hashlib.sha256(data).hexdigest()}
+                written += 1
+            files[name] = entry
+
+        manifest = {"tower": tower_version, "dim": int(vectors.shape[1]), "shards": self.shards,
+                    "rows": len(ids), "files": files}
+        self._write(MANIFEST, json.dumps(manifest, indent=2).encode())
+        for name in os.listdir(self.path):
+            if name.startswith("shard-") and name not in files:
+                os.remove(os.path.join(self.path, name))
+        order = np.argsort(ids, kind="stable")
+        self.ids, self.hashes, self.vectors = ids[order], hashes[order], vectors[order]
+        self.files, self.corrupt = files, []
+        return written
+
+    def _write(self, name, data):
+        path = os.path.join(self.path, name)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+
+def precompute_candidates(tower, chunks, tower_version, store_path=None, batch_size=1024, workers=1,
+                          prefetch=2, shards=DEFAULT_SHARDS):
+    """
+    tower: callable {feature: np.array of str} -> [n, d] array, safe to
+    call from `workers` threads at once.
+    chunks: candidate feature dicts (catalog_chunks / feature_chunks),
+    read once. Without store_path every row is embedded and nothing is kept.
+    Returns (titles, vectors aligned with them, stats dict).
+    """
+    start = time.perf_counter()
+    store = CandidateStore(store_path, shards)
+    if store_path:
+        store.load(tower_version)
+    titles, ids, hashes, stored, computed = [], [], [], [], []
+    seen = set()
+    batch = {name: [] for name in MOVIE_FEATURES}
+    pending = deque()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="movie-tower") as pool:
+        def submit():
+            values = {name: np.asarray(batch[name], dtype=object) for name in MOVIE_FEATURES}
+            pending.append(pool.submit(tower, values))
+            for column in batch.values():
+                column.clear()
+            # Results are collected in submission order, so the embedded
+            # rows come back in catalog order
+            while len(pending) > workers + prefetch:
+                computed.append(np.asarray(pending.popleft().result(), dtype=np.float32))
+
+        for chunk in chunks:
+            chunk_ids, chunk_hashes = row_ids(chunk, seen), row_hashes(chunk)
+            rows = store.lookup(chunk_ids, chunk_hashes)
+            titles += chunk["movie_title"]
+            ids.append(chunk_ids)
+            hashes.append(chunk_hashes)
+            stored.append(rows)
+            for i in np.flatnonzero(rows < 0).tolist():
+                for name in MOVIE_FEATURES:
+                    batch[name].append(chunk[name][i])
+                if len(batch["movie_title"]) == batch_size:
+                    submit()
+        if batch["movie_title"]:
+            submit()
+        computed += [np.asarray(future.result(), dtype=np.float32) for future in pending]
+
+    stats = {"rows": len(titles), "embedded": sum(len(v) for v in computed), "shards_written": 0,
+             "corrupt_shards": len(store.corrupt)}
+    stats["reused"] = stats["rows"] - stats["embedded"]
+    if not titles:
+        stats["seconds"] = time.perf_counter() - start
+        return titles, None, stats
+    ids, hashes, stored = np.concatenate(ids), np.concatenate(hashes), np.concatenate(stored)
+    dim = computed[0].shape[1] if computed else store.vectors.shape[1]
+    vectors = np.empty((len(ids), dim), dtype=np.float32)
+    reused = stored >= 0
+    if reused.any():
+        vectors[reused] = store.vectors[stored[reused]]
+    if computed:
+        vectors[~reused] = np.concatenate(computed)
+    if store_path:
+        stats["shards_written"] = store.save(ids, hashes, vectors, tower_version)
+    stats["seconds"] = time.perf_counter() - start
+    return titles, vectors, stats
+
+
+def saved_tower_version(tower_path):
+    from retrieval import fingerprint
+    files = [os.path.join(tower_path, "saved_model.pb")]
+    variables = os.path.join(tower_path, "variables")
+    if os.path.isdir(variables):
+        files += sorted(os.path.join(variables, name) for name in os.listdir(variables))
+    return fingerprint(files)
+
+
+def load_movie_tower(tower_path):
+    """
+    The movie tower train.py saves next to my_model, as a callable for
+    precompute_candidates.
+    """
+    import tensorflow as tf
+    from retrieval import configure_tf_threads
+    configure_tf_threads(tf)
+    serve = tf.saved_model.load(tower_path).signatures["serving_default"]
+
+    def tower(batch):
+        outputs = serve(**{name: tf.constant(values.astype(str)) for name, values in batch.items()})
+        return next(iter(outputs.values())).numpy()
+    return tower
+
+
+def embed_catalog(tower_path, out_path, csv_path="movies.csv", catalog_path="movies_catalog",
+                  batch_size=1024, workers=1, prefetch=2, chunk_rows=100_000, shards=DEFAULT_SHARDS):
+    """
+    Re-embeds the live catalog with a saved movie tower and rewrites the
+    candidates in out_path (user tables and index kind are kept).
+    Returns precompute_candidates' stats.
+    """
+    from retrieval import DEFAULT_K, load_embeddings, save_embeddings
+
+    # The workers split the cores instead of each running a full TF thread pool
+    os.environ.setdefault("TF_INTRA_OP_THREADS", str(max(1, (os.cpu_count() or 1) // workers)))
+    saved = load_embeddings(out_path, mmap=False)
+    trained = load_trained_inputs(tower_path)
+    chunks = (serving_features(chunk, trained) for chunk in catalog_chunks(csv_path, catalog_path, chunk_rows))
+    titles, vectors, stats = precompute_candidates(
+        load_movie_tower(tower_path), chunks,
+        saved_tower_version(tower_path), os.path.join(out_path, STORE_DIR), batch_size, workers, prefetch,
+        shards)
+    save_embeddings(out_path, saved["user_ids"].tolist(), saved["user_embeddings"], titles, vectors,
+                    k=saved["meta"].get("k", DEFAULT_K), index=saved["meta"].get("index", "brute"))
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Precompute candidate embeddings for the live catalog")
+    parser.add_argument("command", choices=["embed"])
+    parser.add_argument("--tower", default=os.path.join(os.getcwd(), "my_movie_tower"))
+    parser.add_argument("--csv", default="movies.csv")
+    parser.add_argument("--catalog", default="movies_catalog")
+    parser.add_argument("--out", default=os.path.join(os.getcwd(), "my_embeddings"))
+    parser.add_argument("--batch-size", type=int, default=1024, help="rows per tower call")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1),
+                        help="tower calls in flight at once")
+    parser.add_argument("--prefetch", type=int, default=2, help="batches built ahead of the workers")
+    parser.add_argument("--chunk-rows", type=int, default=100_000, help="catalog rows read at a time")
+    parser.add_argument("--shards", type=int, default=DEFAULT_SHARDS, help="shard files for a new store")
+    args = parser.parse_args()
+
+    stats = embed_catalog(args.tower, args.out, args.csv, args.catalog, args.batch_size, args.workers,
+                          args.prefetch, args.chunk_rows, args.shards)
+    print(f"SUCCESS: {stats['rows']} candidates in {args.out} ({stats['embedded']} embedded, "
+          f"{stats['reused']} from {STORE_DIR}/, {stats['shards_written']} shards written) "
+          f"in {stats['seconds']:.1f}s")
@@ -1,63 +1,386 @@
-import requests
-import pandas as pd
-import time
-import os
-from dotenv import load_dotenv # pip install python-dotenv
-
-# Load environment variables
-load_dotenv()
-
-# Get Key securely (returns None if not found)
-API_KEY = os.getenv("TMDB_API_KEY")
-
-def fetch_movies():
-    if not API_KEY:
-        print("❌ ERROR: API Key not found. Create a .env file with TMDB_API_KEY=your_key")
-        return
-
-    print(f"🚀 Connecting to TMDB...")
-    
-    all_movies = []
-    
-    # Fetch 50 pages (1000 movies)
-    for page in range(1, 51):
-        try:
-            url = f"https://api.themoviedb.org/3/movie/popular?api_key={API_KEY}&language=en-US&page={page}"
-            response = requests.get(url)
-            
-            if response.status_code != 200:
-                print(f"⚠️ Error on page {page}: {response.status_code}")
-                break
-            
-            data = response.json()
-            results = data.get('results', [])
-            
-            for item in results:
-                genre_map = {28: "Action", 12: "Adventure", 16: "Animation", 35: "Comedy", 80: "Crime", 99: "Documentary", 18: "Drama", 10751: "Family", 14: "Fantasy", 36: "History", 27: "Horror", 10402: "Music", 9648: "Mystery", 10749: "Romance", 878: "Sci-Fi", 53: "Thriller", 10752: "War", 37: "Western"}
-                g_id = item['genre_ids'][0] if item.get('genre_ids') else 18
-                
-                movie = {
-                    "title": item.get('title', 'Unknown'),
-                    "genre": genre_map.get(g_id, "Drama"),
-                    "rating": int(item.get('vote_average', 0) * 10),
-                    "poster_path": item.get('poster_path'),
-                    "overview": item.get('overview', ''),
-                    "id": item.get('id')
-                }
-                all_movies.append(movie)
-            
-            print(f"✅ Downloaded Page {page}/50")
-            time.sleep(0.1) 
-            
-        except Exception as e:
-            print(f"❌ Crash on page {page}: {e}")
-
-    if len(all_movies) > 0:
-        df = pd.DataFrame(all_movies)
-        df.to_csv("movies.csv", index=False)
-        print(f"\n🎉 SUCCESS! Saved {len(df)} real movies.")
-    else:
-        print("❌ No movies downloaded.")
-
-if __name__ == "__main__":
-    fetch_movies()
\ No newline at end of file
+import requests
+import pandas as pd
+import time
+import os
+import json
+import math
+import random
+import threading
+import argparse
+from datetime import date, datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv # pip install python-dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Get Key securely (returns None if not found)
+API_KEY = os.getenv("TMDB_API_KEY")
+
+# Point this at a local stub (benchmarks/tmdb_stub.py) to run offline
+BASE_URL = os.getenv("TMDB_BASE_URL", "https://api.themoviedb.org/3")
+
+GENRE_MAP = {28: "Action", 12: "Adventure", 16: "Animation", 35: "Comedy", 80: "Crime", 99: "Documentary", 18: "Drama", 10751: "Family", 14: "Fantasy", 36: "History", 27: "Horror", 10402: "Music", 9648: "Mystery", 10749: "Romance", 878: "Sci-Fi", 53: "Thriller", 10752: "War", 37: "Western"}
+COLUMNS = ["title", "genre", "rating", "poster_path", "overview", "id"]
+
+# Retry these; anything else (401, 404, ...) fails the request immediately
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+CHECKPOINT_PATH = ".fetch_checkpoint.jsonl"
+STATE_PATH = ".fetch_state.json"
+
+# TMDB list endpoints return 20 results per page
+PAGE_SIZE = 20
+
+
+class FetchError(Exception):
+    pass
+
+# ==========================================
+# 1. HTTP: pooled session, rate limit, retries
+# ==========================================
+class TokenBucket:
+    """
+    Allows `rate` requests/second on average with bursts up to `capacity`.
+    Shared by all worker threads.
+    """
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, int(rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def make_session(pool_size):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def retry_after_seconds(value):
+    """
+    Retry-After is either delta-seconds or an HTTP-date; None if it is neither
+    (or not a finite number of seconds).
+    """
+    try:
+        seconds = float(value)
+    except ValueError:
+        pass
+    else:
+        return max(0.0, seconds) if math.isfinite(seconds) else None
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class TMDBClient:
+    def __init__(self, api_key=API_KEY, base_url=BASE_URL, workers=8, rate=20, retries=5, backoff=0.5,
+                 max_backoff=60):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.workers = workers
+        self.session = make_session(workers)
+        self.bucket = TokenBucket(rate)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.requests = 0
+        self.retried = 0
+
+    def get(self, path, **params):
+        """
+        GET with token-bucket rate limiting and exponential backoff
+        (honours Retry-After on 429). No wait exceeds max_backoff seconds,
+        so a hostile or mistaken header cannot park a worker for hours.
+        """
+        params = {"api_key": self.api_key, "language": "en-US", **params}
+        error = None
+        for attempt in range(self.retries + 1):
+            self.bucket.acquire()
+            self.requests += 1
+            retry_after = None
+            try:
+                response = self.session.get(f"{self.base_url}{path}", params=params, timeout=10)
+            except requests.RequestException as e:
+                error = f"{type(e).__name__}: {e}"
+            else:
+                if response.status_code == 200:
+                    return response.json()
+                error = f"HTTP {response.status_code}"
+                if response.status_code not in RETRY_STATUSES:
+                    break
+                retry_after = response.headers.get("Retry-After")
+
+            if attempt < self.retries:
+                self.retried += 1
+                delay = retry_after_seconds(retry_after) if retry_after else None
+                if delay is None:
+                    delay = self.backoff * 2 ** attempt
+                time.sleep(min(delay * random.uniform(1.0, 1.25), self.max_backoff))
+        raise FetchError(f"{path}: {error}")
+
+    def map_concurrent(self, fn, items):
+        """
+        Runs fn(item) on the worker pool; yields (item, result, error) as they finish.
+        """
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(fn, item): item for item in items}
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result(), None
+                except Exception as e:
+                    yield futures[future], None, e
+
+# ==========================================
+# 2. ROWS + FILES
+# ==========================================
+def to_row(item):
+    """
+    TMDB movie (list item with genre_ids, or details with genres) -> catalog row.
+    """
+    if item.get('genre_ids'):
+        g_id = item['genre_ids'][0]
+    elif item.get('genres'):
+        g_id = item['genres'][0]['id']
+    else:
+        g_id = 18
+    return {
+        "title": item.get('title', 'Unknown'),
+        "genre": GENRE_MAP.get(g_id, "Drama"),
+        "rating": int((item.get('vote_average') or 0) * 10),
+        "poster_path": item.get('poster_path'),
+        "overview": item.get('overview', ''),
+        "id": item.get('id')
+    }
+
+
+def read_json(path, default):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def write_json(path, data):
+    # Write-then-rename so a crash never leaves a half-written checkpoint
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def read_checkpoint(path, run):
+    """
+    {page: rows} from an append-only checkpoint: a header line with the
+    `run` parameters it was written for, then one JSON line per page.
+    A checkpoint from a run with other parameters counts as empty; a line
+    torn by a crash mid-write is skipped (that page is just refetched).
+    """
+    done = {}
+    try:
+        with open(path) as f:
+            try:
+                if json.loads(f.readline()).get("run") != run:
+                    return {}
+            except (ValueError, AttributeError):
+                return {}
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    done[int(entry["page"])] = entry["rows"]
+                except (ValueError, KeyError, TypeError):
+                    continue
+    except OSError:
+        pass
+    return done
+
+
+def write_csv(df, path):
+    tmp = f"{path}.tmp"
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+# ==========================================
+# 3. FULL FETCH (resumable)
+# ==========================================
+def fetch_movies(pages=50, output="movies.csv", client=None, checkpoint=CHECKPOINT_PATH, resume=True):
+    if not API_KEY and client is None:
+        print("❌ ERROR: API Key not found. Create a .env file with TMDB_API_KEY=your_key")
+        return
+
+    client = client or TMDBClient()
+    print(f"🚀 Connecting to TMDB ({client.workers} workers)...")
+
+    # Pages already downloaded by an interrupted run of the same fetch are
+    # kept and skipped; any other checkpoint is started over
+    run = {"output": os.path.abspath(output), "pages": pages}
+    done = read_checkpoint(checkpoint, run) if resume else {}
+    todo = [page for page in range(1, pages + 1) if page not in done]
+    if done:
+        print(f"↩️ Resuming: {len(done)} pages from checkpoint, {len(todo)} to go")
+
+    def fetch_page(page):
+        return client.get("/movie/popular", page=page).get('results', [])
+
+    # Results arrive on this thread, so the checkpoint needs no lock. Each page
+    # is appended as one line, so checkpointing stays O(page) rather than
+    # rewriting every page downloaded so far.
+    failed = []
+    with open(checkpoint, "a" if done else "w") as log:
+        if not done:
+            log.write(json.dumps({"run": run}) + "\n")
+        for page, results, error in client.map_concurrent(fetch_page, todo):
+            if error is not None:
+                print(f"⚠️ Error on page {page}: {error}")
+                failed.append(page)
+                continue
+            done[page] = [to_row(item) for item in results]
+            log.write(json.dumps({"page": page, "rows": done[page]}) + "\n")
+            log.flush()
+            print(f"✅ Downloaded Page {page}/{pages}")
+
+    # Popularity order = page order; a movie can drift across pages mid-fetch
+    all_movies = [movie for page in sorted(done) if page <= pages for movie in done[page]]
+    if len(all_movies) > 0:
+        df = pd.DataFrame(all_movies, columns=COLUMNS).drop_duplicates(subset="id", keep="first")
+        write_csv(df, output)
+        write_json(STATE_PATH, {"last_sync": date.today().isoformat()})
+        print(f"\n🎉 SUCCESS! Saved {len(df)} real movies.")
+    else:
+        print("❌ No movies downloaded.")
+
+    if failed:
+        print(f"⚠️ {len(failed)} pages failed {sorted(failed)}; rerun to resume from {checkpoint}")
+    elif os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return failed
+
+# ==========================================
+# 4. INCREMENTAL UPDATE (merge by id)
+# ==========================================
+def changed_ids(client, since):
+    ids = set()
+    page, total = 1, 1
+    while page <= total:
+        data = client.get("/movie/changes", start_date=since, page=page)
+        ids.update(item["id"] for item in data.get("results", []) if item.get("id") is not None)
+        total = data.get("total_pages", 1)
+        page += 1
+    return ids
+
+
+def new_movies(client, known, pages):
+    """
+    [(rank, row)] for movies on the first `pages` popular pages that are not
+    in the catalog yet. /movie/changes only covers edits, so this is how
+    titles released since the full fetch get in.
+    """
+    def fetch_page(page):
+        return client.get("/movie/popular", page=page).get("results", [])
+
+    pages_seen = {}
+    for page, results, error in client.map_concurrent(fetch_page, range(1, pages + 1)):
+        if error is not None:
+            print(f"⚠️ Error on popular page {page}: {error}; its new titles wait for the next sync")
+            continue
+        pages_seen[page] = results
+
+    added, seen = [], set()
+    for page in sorted(pages_seen):
+        for offset, item in enumerate(pages_seen[page]):
+            movie_id = str(item.get("id"))
+            if item.get("id") is None or movie_id in known or movie_id in seen:
+                continue
+            seen.add(movie_id)
+            row = {k: "" if v is None else str(v) for k, v in to_row(item).items()}
+            added.append(((page - 1) * PAGE_SIZE + offset, row))
+    return added
+
+
+def update_movies(output="movies.csv", since=None, client=None, new_pages=5):
+    """
+    Refetches only movies TMDB reports as changed since the last sync and
+    merges them into the existing catalog by id (row order is kept). Movies
+    on the first `new_pages` popular pages that the catalog lacks are
+    inserted at their popularity rank; newer titles further down the list
+    wait for a full fetch.
+    """
+    if not API_KEY and client is None:
+        print("❌ ERROR: API Key not found. Create a .env file with TMDB_API_KEY=your_key")
+        return
+
+    client = client or TMDBClient()
+    existing = pd.read_csv(output, dtype=str).fillna("")
+    since = since or read_json(STATE_PATH, {}).get("last_sync") or (date.today() - timedelta(days=1)).isoformat()
+
+    known = set(existing["id"])
+    targets = sorted(i for i in changed_ids(client, since) if str(i) in known)
+    print(f"🔄 {len(targets)} catalog movies changed since {since}")
+
+    updates = {}
+    for movie_id, details, error in client.map_concurrent(lambda i: client.get(f"/movie/{i}"), targets):
+        if error is not None:
+            print(f"⚠️ Error on movie {movie_id}: {error}")
+            continue
+        updates[str(movie_id)] = {k: "" if v is None else str(v) for k, v in to_row(details).items()}
+
+    added = new_movies(client, known, new_pages) if new_pages else []
+    print(f"🆕 {len(added)} new movies in the top {new_pages} popular pages")
+
+    if updates or added:
+        rows = existing.to_dict(orient="records")
+        rows = [updates.get(row["id"], row) for row in rows]
+        # Ascending rank, so each insert lands at its final position
+        for rank, row in added:
+            rows.insert(min(rank, len(rows)), row)
+        write_csv(pd.DataFrame(rows, columns=COLUMNS), output)
+    write_json(STATE_PATH, {"last_sync": date.today().isoformat()})
+    print(f"🎉 Updated {len(updates)} and added {len(added)} movies in {output}")
+    return len(updates) + len(added)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download the TMDB popular catalog into movies.csv")
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=20, help="max requests/second")
+    parser.add_argument("--output", default="movies.csv")
+    parser.add_argument("--no-resume", action="store_true", help="ignore an existing checkpoint")
+    parser.add_argument("--incremental", action="store_true", help="merge changed movies into --output")
+    parser.add_argument("--since", help="YYYY-MM-DD for --incremental (default: last sync)")
+    parser.add_argument("--new-pages", type=int, default=5, help="popular pages scanned for new titles in --incremental")
+    parser.add_argument("--compile", action="store_true", help="also rebuild movies_catalog/")
+    args = parser.parse_args()
+
+    client = TMDBClient(workers=args.workers, rate=args.rate) if API_KEY else None
+    if args.incremental:
+        update_movies(args.output, since=args.since, client=client, new_pages=args.new_pages)
+    else:
+        fetch_movies(args.pages, args.output, client=client, resume=not args.no_resume)
+
+    if args.compile and os.path.exists(args.output):
+        from catalog import compile_catalog
+        compile_catalog(args.output, "movies_catalog")
+        print("✅ Compiled movies_catalog/")
@@ -0,0 +1,174 @@
+import os
+import threading
+from collections import deque
+
+import numpy as np
+
+# ==========================================
+# SERVING METRICS (Prometheus text format)
+# ==========================================
+# A tiny in-process registry so the serving path can be timed stage by
+# stage without pulling in prometheus_client:
+#   MODEL_STAGE = metrics.histogram("recommend.model")    # once, at import
+#   start = perf_counter(); ...; MODEL_STAGE.observe(perf_counter() - start)
+#   metrics.inc("recommend_source", source="ai")
+#   metrics.error("recommend.model", e)                   # errors_total{stage,type}
+# render() returns the /metrics payload. Histograms use fixed buckets and
+# observing is a lock-free append (< 1us per stage, two perf_counter calls
+# included); p50/p95/p99 are estimated from the buckets the way
+# Prometheus' histogram_quantile does. METRICS_ENABLED=0 turns it all off.
+
+BUCKETS = (0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+           0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUANTILES = (0.5, 0.95, 0.99)
+FLUSH_EVERY = 4096
+
+
+class Histogram:
+    """
+    observe() only appends to a deque (atomic under the GIL, no lock);
+    samples are bucketed in bulk with NumPy when the deque fills up or
+    when the histogram is read.
+    """
+    __slots__ = ("bounds", "counts", "sum", "count", "pending", "lock")
+
+    def __init__(self, bounds=BUCKETS):
+        self.bounds = bounds
+        self.counts = np.zeros(len(bounds) + 1, dtype=np.int64)   # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.pending = deque()
+        self.lock = threading.Lock()
+
+    def observe(self, seconds):
+        self.pending.append(seconds)
+        if len(self.pending) >= FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            pending = self.pending
+            samples = np.array([pending.popleft() for _ in range(len(pending))])
+            if len(samples):
+                idx = np.searchsorted(self.bounds, samples, side="right")
+                self.counts += np.bincount(idx, minlength=len(self.counts))
+                self.sum += float(samples.sum())
+                self.count += len(samples)
+            return self.counts.tolist(), self.sum, self.count
+
+    def quantile(self, q, counts=None):
+        """
+        Linear interpolation inside the bucket holding the q-th observation.
+        """
+        counts = counts if counts is not None else self.flush()[0]
+        total = sum(counts)
+        if not total:
+            return 0.0
+        rank, seen = q * total, 0
+        for i, n in enumerate(counts):
+            if seen + n >= rank and n:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.bounds[-1]
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.bounds[-1]
+
+
+class _NullHistogram:
+    def observe(self, seconds):
+        pass
+
+
+_NULL_HISTOGRAM = _NullHistogram()
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    escaped = (f'{k}="{str(v)}"'.replace("\\", "\\\\").replace("\n", "\\n") for k, v in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+class Metrics:
+    def __init__(self, enabled=True, prefix="recsys"):
+        self.enabled = enabled
+        self.prefix = prefix
+        self.stages = {}      # stage -> Histogram
+        self.counters = {}    # (name, ((label, value), ...)) -> int
+        self._lock = threading.Lock()
+
+    def _hist(self, name):
+        hist = self.stages.get(name)
+        if hist is None:
+            with self._lock:
+                hist = self.stages.setdefault(name, Histogram())
+        return hist
+
+    def histogram(self, name):
+        """
+        Stage histogram handle; resolve it once at import and call
+        .observe(seconds) on the hot path. A no-op when disabled.
+        """
+        if not self.enabled:
+            return _NULL_HISTOGRAM
+        return self._hist(name)
+
+    def observe(self, name, seconds):
+        if self.enabled:
+            self._hist(name).observe(seconds)
+
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def error(self, stage, exc):
+        self.inc("errors", stage=stage, type=type(exc).__name__)
+
+    def snapshot(self):
+        """
+        {stage: {"count", "p50", "p95", "p99"}} in milliseconds, for humans.
+        """
+        out = {}
+        for name, hist in sorted(self.stages.items()):
+            counts, _, count = hist.flush()
+            out[name] = {"count": count, **{f"p{int(q * 100)}": round(hist.quantile(q, counts) * 1000, 3)
+                                            for q in QUANTILES}}
+        return out
+
+    def render(self):
+        p = self.prefix
+        lines = [f"# HELP {p}_stage_seconds Latency of each serving stage.",
+                 f"# TYPE {p}_stage_seconds histogram"]
+        flushed = {name: hist.flush() for name, hist in sorted(self.stages.items())}
+        for name, (counts, total, count) in flushed.items():
+            hist = self.stages[name]
+            cumulative = 0
+            for bound, n in zip(hist.bounds + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{p}_stage_seconds_bucket{_labels([('stage', name), ('le', le)])} {cumulative}")
+            lines.append(f"{p}_stage_seconds_sum{_labels([('stage', name)])} {total}")
+            lines.append(f"{p}_stage_seconds_count{_labels([('stage', name)])} {count}")
+
+        lines += [f"# HELP {p}_stage_seconds_estimate p50/p95/p99 estimated from the histogram buckets.",
+                  f"# TYPE {p}_stage_seconds_estimate gauge"]
+        for name, (counts, _, _) in flushed.items():
+            for q in QUANTILES:
+                lines.append(f"{p}_stage_seconds_estimate{_labels([('stage', name), ('quantile', q)])} "
+                             f"{self.stages[name].quantile(q, counts)}")
+
+        with self._lock:
+            counters = sorted(self.counters.items())
+        for metric in sorted({name for (name, _), _ in counters}):
+            lines.append(f"# TYPE {p}_{metric}_total counter")
+            for (name, labels), value in counters:
+                if name == metric:
+                    lines.append(f"{p}_{metric}_total{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry used by api.py and the retrieval backends
+metrics = Metrics(enabled=os.getenv("METRICS_ENABLED", "1") == "1")
@@ -0,0 +1,246 @@
+import os
+import shutil
+import threading
+import time
+
+from retrieval import NumpyRetrieval, SavedModelRetrieval
+
+# ==========================================
+# HOT-SWAPPABLE MODEL REGISTRY
+# ==========================================
+# Watches a directory of model versions, each laid out like the repo root
+# after `python train.py`:
+#   models/
+#     20261001-0900/my_model/        BruteForce SavedModel
+#     20261001-0900/my_embeddings/   NumPy export (preferred by backend="auto")
+#     20261017-0900/...
+# The newest version (by name) is loaded and warmed on a background thread
+# and then swapped in with one reference assignment; requests that already
+# took a snapshot finish on the old model. The previous model stays loaded
+# so rollback is instant. Names starting with "." are ignored, so publish
+# by copying to models/.<name> and renaming (see publish()).
+
+
+def is_ready(path):
+    return (os.path.exists(os.path.join(path, "my_embeddings", "meta.json"))
+            or os.path.exists(os.path.join(path, "my_model", "saved_model.pb")))
+
+
+def load_retriever(path, backend="auto", index=None, n_probe=None):
+    embeddings = os.path.join(path, "my_embeddings")
+    if backend == "numpy" or (backend == "auto" and os.path.isdir(embeddings)):
+        return NumpyRetrieval(embeddings, index=index, n_probe=n_probe)
+    return SavedModelRetrieval(os.path.join(path, "my_model"))
+
+
+def publish(models_dir, version, source="."):
+    """
+    Copies source/my_model, source/my_embeddings (and the movie tower used
+    to re-embed the catalog, if any) into models_dir/<version> atomically
+    (staging dir + rename), so the watcher never sees half a model.
+    """
+    target = os.path.join(models_dir, version)
+    if os.path.exists(target):
+        raise FileExistsError(target)
+    staging = os.path.join(models_dir, f".{version}")
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    for name in ("my_model", "my_embeddings", "my_movie_tower"):
+        if os.path.isdir(os.path.join(source, name)):
+            shutil.copytree(os.path.join(source, name), os.path.join(staging, name))
+    if not is_ready(staging):
+        shutil.rmtree(staging)
+        raise FileNotFoundError(f"no my_model/ or my_embeddings/ in {source}")
+    os.rename(staging, target)
+    return target
+
+
+class ModelRegistry:
+    """
+    models_dir: versioned directory to watch (may not exist yet).
+    fallback_path: served as version "local" when models_dir has no
+    versions, i.e. the pre-registry layout (my_model/ next to api.py).
+    on_swap(version) runs after every swap (used to reset the cache).
+    """
+
+    def __init__(self, models_dir, fallback_path=None, backend="auto", index=None, n_probe=None,
+                 poll_seconds=10, warmup_users=64, on_swap=None):
+        self.models_dir = models_dir
+        self.fallback_path = fallback_path
+        self.backend = backend
+        self.index = index
+        self.n_probe = n_probe
+        self.poll_seconds = poll_seconds
+        self.warmup_users = warmup_users
+        self.on_swap = on_swap
+        self.active = (None, None)      # (version, retriever); replaced, never mutated
+        self.previous = (None, None)
+        self.pinned = False
+        self.failed = {}                # version -> error, not retried
+        self.swaps = 0
+        self.last_load_seconds = None   # load + warmup of the last version loaded
+        self.last_warm_seconds = None
+        self._lock = threading.Lock()   # one load/swap at a time
+        self._watcher = None
+
+    # --- reads (lock-free) ---
+    @property
+    def version(self):
+        return self.active[0]
+
+    @property
+    def ready(self):
+        return self.active[1] is not None
+
+    def snapshot(self):
+        """
+        (version, retriever) to use for a whole request.
+        """
+        return self.active
+
+    def predict(self, user_ids):
+        """
+        Batch function for MicroBatcher: [(version, titles), ...] per user,
+        all from the same model even if a swap happens mid-call.
+        """
+        version, retriever = self.active
+        if retriever is None:
+            return [(None, []) for _ in user_ids]
+        return [(version, titles) for titles in retriever(user_ids)]
+
+    def versions(self):
+        if not os.path.isdir(self.models_dir):
+            return []
+        return sorted(name for name in os.listdir(self.models_dir)
+                      if not name.startswith(".") and is_ready(os.path.join(self.models_dir, name)))
+
+    # --- loading / swapping ---
+    def _path(self, version):
+        if version == "local":
+            return self.fallback_path
+        return os.path.join(self.models_dir, version)
+
+    def _warm(self, retriever):
+        # First calls pay for tracing / page faults; pay them before taking traffic
+        users = list(retriever.known_users()[:self.warmup_users]) + ["__warmup__"]
+        for size in sorted({1, len(users)}):
+            retriever(users[:size])
+
+    def _swap(self, version, retriever):
+        self.previous = self.active
+        self.active = (version, retriever)
+        self.swaps += 1
+        if self.on_swap:
+            self.on_swap(version)
+
+    def load(self, version, pin=False):
+        """
+        Loads and warms `version` off the request path, then swaps it in.
+        On failure the current model keeps serving and the error is raised.
+        """
+        with self._lock:
+            if version == self.version:
+                self.pinned = pin
+                return version
+            path = self._path(version)
+            if not path or not is_ready(path):
+                raise FileNotFoundError(f"model version {version!r} not found")
+            start = time.perf_counter()
+            try:
+                retriever = load_retriever(path, self.backend, self.index, self.n_probe)
+                loaded = time.perf_counter()
+                self._warm(retriever)
+            except Exception as e:
+                self.failed[version] = f"{type(e).__name__}: {e}"
+                raise
+            self.last_load_seconds = round(time.perf_counter() - start, 3)
+            self.last_warm_seconds = round(time.perf_counter() - loaded, 3)
+            self._swap(version, retriever)
+            self.pinned = pin
+            print(f"✅ Model {version} live (loaded + warmed in {self.last_load_seconds}s)")
+            return version
+
+    def load_latest(self):
+        """
+        Newest version in models_dir, else fallback_path. Returns the version
+        now serving (None = fallback mode; the watcher keeps looking).
+        """
+        versions = [v for v in self.versions() if v not in self.failed]
+        candidates = versions[::-1] or (["local"] if self.fallback_path and is_ready(self.fallback_path) else [])
+        for version in candidates:
+            try:
+                return self.load(version)
+            except Exception as e:
+                print(f"⚠️ Model {version} failed to load: {e}")
+        return self.version
+
+    def poll(self):
+        if self.pinned:
+            return None
+        versions = [v for v in self.versions() if v not in self.failed]
+        if versions and versions[-1] != self.version:
+            try:
+                return self.load(versions[-1])
+            except Exception as e:
+                print(f"⚠️ Model {versions[-1]} failed to load, still serving {self.version}: {e}")
+        return None
+
+    def rollback(self):
+        """
+        Swaps back to the previously served model (kept warm in memory) and
+        pins it, so the watcher does not re-promote the newer version.
+        """
+        with self._lock:
+            version, retriever = self.previous
+            if retriever is None:
+                raise RuntimeError("no previous model to roll back to")
+            self._swap(version, retriever)
+            self.pinned = True
+            print(f"↩️ Rolled back to model {version}")
+            return version
+
+    def unpin(self):
+        self.pinned = False
+        return self.poll() or self.version
+
+    def watch(self):
+        """
+        Starts the background watcher (no-op if already running).
+        """
+        if self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch, name="model-watcher", daemon=True)
+            self._watcher.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_seconds)
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"⚠️ Model watcher error: {e}")
+
+    def stats(self):
+        return {
+            "version": self.version,
+            "previous": self.previous[0],
+            "pinned": self.pinned,
+            "available": self.versions(),
+            "failed": self.failed,
+            "swaps": self.swaps,
+            "last_load_seconds": self.last_load_seconds,
+            "last_warm_seconds": self.last_warm_seconds,
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Publish my_model/ + my_embeddings/ as a new model version")
+    parser.add_argument("command", choices=["publish"])
+    parser.add_argument("--models-dir", default=os.path.join(os.getcwd(), "models"))
+    parser.add_argument("--version", default=time.strftime("%Y%m%d-%H%M%S"))
+    parser.add_argument("--source", default=os.getcwd())
+    args = parser.parse_args()
+
+    os.makedirs(args.models_dir, exist_ok=True)
+    print(f"SUCCESS: Published {publish(args.models_dir, args.version, args.source)}")
@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import OrderedDict
+
+# ==========================================
+# PER-USER RECOMMENDATION CACHE
+# ==========================================
+# Holds the final enriched /recommend payload per user_id. Entries are
+# tagged with the model version that produced them; switching versions
+# drops everything, so a new model never serves stale picks.
+
+
+class RecommendationCache:
+    def __init__(self, max_size=10000, ttl_seconds=600, model_version=None):
+        self.max_size = max_size
+        self.ttl = ttl_seconds
+        self.model_version = model_version
+        self._entries = OrderedDict()   # user_id -> (expires_at, movies)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= now:
+                del self._entries[user_id]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user_id, movies, model_version=None):
+        """
+        Stores a payload. Results computed by an older model are ignored.
+        """
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            if model_version is not None and model_version != self.model_version:
+                return
+            self._entries[user_id] = (time.monotonic() + self.ttl, movies)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def set_model_version(self, model_version):
+        """
+        Called whenever a model is loaded; clears the cache if the version changed.
+        """
+        with self._lock:
+            if model_version != self.model_version:
+                self._entries.clear()
+                self.model_version = model_version
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "model_version": self.model_version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
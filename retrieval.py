@@ -0,0 +1,298 @@
+import hashlib
+import json
+import os
+from time import perf_counter
+
+import numpy as np
+
+from metrics import metrics
+from vector_index import INDEX_KINDS, build_index, index_file, load_index, save_atomic
+
+# ==========================================
+# RETRIEVAL BACKENDS
+# ==========================================
+# Both backends are callables: list of user_ids -> list of title lists.
+#   NumpyRetrieval      - flat .npy embedding tables, no TensorFlow import
+#   SavedModelRetrieval - the BruteForce SavedModel written by train.py
+#
+# Embedding directory layout (written by train.py / `python retrieval.py export`):
+#   user_ids.npy          [U]    user vocabulary, row 0 is the OOV token
+#   user_embeddings.npy   [U, d] float32, aligned with user_ids.npy
+#   movie_titles.npy      [M]    candidate titles
+#   movie_embeddings.npy  [M, d] float32 candidate vectors (movie tower output)
+#   meta.json             dims, default k and the retrieval index kind
+#   index_<kind>.npz      saved ANN / quantized index (see vector_index.py), if not "brute"
+
+OOV_TOKEN = "[UNK]"
+DEFAULT_K = 10
+
+SEARCH_STAGE = metrics.histogram("retrieval.search")
+TENSOR_STAGE = metrics.histogram("retrieval.tensor")
+SERVING_STAGE = metrics.histogram("retrieval.serving_fn")
+RETRY_STAGE = metrics.histogram("retrieval.serving_fn_retry")
+DECODE_STAGE = metrics.histogram("retrieval.decode")
+
+
+def save_embeddings(path, user_ids, user_embeddings, movie_titles, movie_embeddings,
+                    k=DEFAULT_K, index="brute"):
+    """
+    Writes the two towers' tables as plain .npy files that can be memory-mapped,
+    plus the retrieval index chosen at save time ("brute" or "ivfpq").
+    """
+    movie_embeddings = _write_tables(path, user_ids, user_embeddings, movie_titles, movie_embeddings)
+    build_index(index, movie_embeddings).save(index_file(path, index))
+    _write_meta(path, user_ids, movie_titles, movie_embeddings, k, index)
+
+
+def refresh_embeddings(path, user_ids, user_embeddings, movie_titles, movie_embeddings, changed_titles):
+    """
+    Warm-start counterpart of save_embeddings: keeps the saved candidate
+    order, appends new titles, and re-encodes only the new or changed
+    candidates in the saved index instead of rebuilding it.
+    Returns the number of candidate rows refreshed.
+    """
+    saved = load_embeddings(path, mmap=False)
+    rows = {title: i for i, title in enumerate(movie_titles)}
+    order = saved["movie_titles"].tolist()
+    if any(title not in rows for title in order):
+        raise ValueError("refresh can only add candidates; use save_embeddings to drop some")
+    saved_count, known = len(order), set(order)
+    order += [title for title in movie_titles if title not in known]
+    movie_embeddings = np.asarray(movie_embeddings, dtype=np.float32)[[rows[t] for t in order]]
+    changed = set(changed_titles)
+    refreshed = [i for i, title in enumerate(order) if title in changed or i >= saved_count]
+
+    movie_embeddings = _write_tables(path, user_ids, user_embeddings, order, movie_embeddings)
+    meta = saved["meta"]
+    kind = meta.get("index", "brute")
+    index = load_index(path, kind, movie_embeddings)
+    index.update(refreshed)
+    index.save(index_file(path, kind))
+    _write_meta(path, user_ids, order, movie_embeddings, meta.get("k", DEFAULT_K), kind)
+    return len(refreshed)
+
+
+def reindex_embeddings(path, index):
+    """
+    Rebuilds the retrieval index of an existing export and makes it the
+    default, e.g. post-training int8 quantization without retraining.
+    """
+    data = load_embeddings(path, mmap=False)
+    movie_embeddings = np.ascontiguousarray(data["movie_embeddings"], dtype=np.float32)
+    built = build_index(index, movie_embeddings)
+    built.save(index_file(path, index))
+    _write_meta(path, data["user_ids"], data["movie_titles"], movie_embeddings,
+                data["meta"].get("k", DEFAULT_K), index)
+    return built.nbytes()
+
+
+def _write_tables(path, user_ids, user_embeddings, movie_titles, movie_embeddings):
+    os.makedirs(path, exist_ok=True)
+    user_embeddings = np.ascontiguousarray(user_embeddings, dtype=np.float32)
+    movie_embeddings = np.ascontiguousarray(movie_embeddings, dtype=np.float32)
+    if len(user_ids) != len(user_embeddings) or len(movie_titles) != len(movie_embeddings):
+        raise ValueError("vocabulary and embedding table sizes differ")
+
+    # Temp file + rename: the API may have the previous tables memory-mapped
+    for name, array in (("user_ids.npy", np.asarray(user_ids, dtype=str)),
+                        ("user_embeddings.npy", user_embeddings),
+                        ("movie_titles.npy", np.asarray(movie_titles, dtype=str)),
+                        ("movie_embeddings.npy", movie_embeddings)):
+        save_atomic(os.path.join(path, name), lambda f: np.save(f, array))
+    return movie_embeddings
+
+
+def _write_meta(path, user_ids, movie_titles, movie_embeddings, k, index):
+    meta = {
+        "users": len(user_ids),
+        "movies": len(movie_titles),
+        "dim": int(movie_embeddings.shape[1]),
+        "k": k,
+        "index": index,
+    }
+    save_atomic(os.path.join(path, "meta.json"), lambda f: f.write(json.dumps(meta, indent=2).encode()))
+
+
+def load_embeddings(path, mmap=True):
+    mode = "r" if mmap else None
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    return {
+        "user_ids": np.load(os.path.join(path, "user_ids.npy")),
+        "user_embeddings": np.load(os.path.join(path, "user_embeddings.npy"), mmap_mode=mode),
+        "movie_titles": np.load(os.path.join(path, "movie_titles.npy")),
+        "movie_embeddings": np.load(os.path.join(path, "movie_embeddings.npy"), mmap_mode=mode),
+        "meta": meta,
+    }
+
+
+def fingerprint(paths):
+    """
+    Short model version id from file sizes + mtimes (cheap, changes on every save).
+    """
+    digest = hashlib.sha1()
+    for path in paths:
+        if os.path.exists(path):
+            stat = os.stat(path)
+            digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:12]
+
+
+class NumpyRetrieval:
+    """
+    Dot product + top-k over exported embeddings, batched across users.
+    `index` overrides the kind saved in meta.json ("brute" or "ivfpq").
+    """
+
+    def __init__(self, path, k=None, mmap=True, index=None, n_probe=None):
+        data = load_embeddings(path, mmap=mmap)
+        self.k = k or data["meta"].get("k", DEFAULT_K)
+        self.user_embeddings = data["user_embeddings"]
+        self.movie_embeddings = data["movie_embeddings"]
+        self.index_kind = index or data["meta"].get("index", "brute")
+        self.index = load_index(path, self.index_kind, self.movie_embeddings, n_probe=n_probe)
+        self.movie_titles = data["movie_titles"].tolist()
+        # Unknown users map to row 0, same as StringLookup's OOV bucket
+        self._user_rows = {u: i for i, u in enumerate(data["user_ids"].tolist())}
+        self.version = fingerprint([os.path.join(path, name) for name in
+                                    ("meta.json", "user_embeddings.npy", "movie_embeddings.npy")])
+
+    def known_users(self):
+        return [u for u in self._user_rows if u != OOV_TOKEN]
+
+    def user_rows(self, user_ids):
+        return np.fromiter((self._user_rows.get(u, 0) for u in user_ids),
+                           dtype=np.int64, count=len(user_ids))
+
+    def scores(self, user_ids, k=None):
+        """
+        Returns (scores [n, k], candidate rows [n, k]).
+        """
+        queries = self.user_embeddings[self.user_rows(user_ids)]
+        return self.index.search(queries, k or self.k)
+
+    def __call__(self, user_ids):
+        start = perf_counter()
+        _, idx = self.scores(user_ids)
+        searched = perf_counter()
+        titles = self.movie_titles
+        results = [[titles[i] for i in row if i >= 0] for row in idx.tolist()]
+        SEARCH_STAGE.observe(searched - start)
+        DECODE_STAGE.observe(perf_counter() - searched)
+        return results
+
+
+class SavedModelRetrieval:
+    """
+    The BruteForce SavedModel. TensorFlow is only imported when this is used.
+    """
+
+    def __init__(self, model_path):
+        import tensorflow as tf
+        configure_tf_threads(tf)
+        self._tf = tf
+        self.loaded_obj = tf.saved_model.load(model_path)
+        self.serving_fn = self.loaded_obj.signatures["serving_default"]
+        # fingerprint.pb is TF's own content hash of the SavedModel
+        self.version = fingerprint([os.path.join(model_path, "fingerprint.pb"),
+                                    os.path.join(model_path, "saved_model.pb")])
+
+    def known_users(self):
+        user_ids, _ = saved_user_tower(self.loaded_obj)
+        return [u for u in user_ids if u != OOV_TOKEN]
+
+    def __call__(self, user_ids):
+        tf = self._tf
+        start = perf_counter()
+        input_tensor = tf.constant(user_ids)
+        created = perf_counter()
+        TENSOR_STAGE.observe(created - start)
+        try:
+            preds = self.serving_fn(input_tensor)
+            SERVING_STAGE.observe(perf_counter() - created)
+        except Exception as e:
+            # Positional call rejected: retry with the signature's input name
+            metrics.error("retrieval.serving_fn", e)
+            retried = perf_counter()
+            key = list(self.serving_fn.structured_input_signature[1].keys())[0]
+            preds = self.serving_fn(**{key: input_tensor})
+            RETRY_STAGE.observe(perf_counter() - retried)
+
+        start = perf_counter()
+        results = [[] for _ in user_ids]
+        for k in preds:
+            if preds[k].dtype == tf.string:
+                results = [[t.decode('utf-8') for t in row] for row in preds[k].numpy()]
+                break
+        DECODE_STAGE.observe(perf_counter() - start)
+        return results
+
+
+def configure_tf_threads(tf):
+    """
+    Applies TF_INTRA_OP_THREADS / TF_INTER_OP_THREADS (set by api.py to fit
+    its inference pool). TF only accepts this before its first op runs, so
+    it is a no-op on later model loads.
+    """
+    try:
+        intra = int(os.getenv("TF_INTRA_OP_THREADS", "0"))
+        inter = int(os.getenv("TF_INTER_OP_THREADS", "0"))
+        if intra:
+            tf.config.threading.set_intra_op_parallelism_threads(intra)
+        if inter:
+            tf.config.threading.set_inter_op_parallelism_threads(inter)
+    except RuntimeError:
+        pass
+
+
+def saved_user_tower(saved):
+    """
+    (user_ids, user_embeddings) from a loaded BruteForce SavedModel.
+    The user tower is StringLookup -> Embedding; OOV is row 0.
+    """
+    import tensorflow as tf
+    lookup = getattr(saved.query_model, "layer-0")
+    keys, values = tf.raw_ops.LookupTableExportV2(
+        table_handle=lookup.lookup_table.resource_handle, Tkeys=tf.string, Tvalues=tf.int64
+    )
+    tables = [v for v in saved.query_model.variables if v is not None and len(v.shape) == 2]
+    user_embeddings = tables[0].numpy()
+    user_ids = np.full(len(user_embeddings), OOV_TOKEN, dtype=object)
+    for key, value in zip(keys.numpy(), values.numpy()):
+        user_ids[value] = key.decode("utf-8")
+    return user_ids.tolist(), user_embeddings
+
+
+def export_from_saved_model(model_path, out_path, index="brute"):
+    """
+    Pulls the embedding tables out of an existing BruteForce SavedModel,
+    for models trained before train.py exported them itself.
+    """
+    import tensorflow as tf
+    saved = tf.saved_model.load(model_path)
+    user_ids, user_embeddings = saved_user_tower(saved)
+
+    movie_titles = [t.decode("utf-8") for t in saved._identifiers.numpy()]
+    movie_embeddings = saved._candidates.numpy()
+    save_embeddings(out_path, user_ids, user_embeddings, movie_titles, movie_embeddings,
+                    index=index)
+    return out_path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export embeddings from a saved BruteForce index, "
+                                                 "or rebuild the index of an export (reindex)")
+    parser.add_argument("command", choices=["export", "reindex"])
+    parser.add_argument("--model", default=os.path.join(os.getcwd(), "my_model"))
+    parser.add_argument("--out", default=os.path.join(os.getcwd(), "my_embeddings"))
+    parser.add_argument("--index", choices=INDEX_KINDS, default="brute")
+    args = parser.parse_args()
+
+    if args.command == "reindex":
+        nbytes = reindex_embeddings(args.out, args.index)
+        print(f"SUCCESS: {args.out} now serves a {args.index} index ({nbytes / 2**20:.1f} MB)")
+    else:
+        export_from_saved_model(args.model, args.out, index=args.index)
+        print(f"SUCCESS: Embeddings exported to {args.out}")
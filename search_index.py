@@ -0,0 +1,321 @@
+import base64
+import hashlib
+import re
+import zlib
+
+import numpy as np
+
+from catalog import _rating_value
+
+# ==========================================
+# IN-MEMORY SEARCH INDEX FOR /search
+# ==========================================
+# movies.csv is written in TMDB /movie/popular order, so row position is
+# already the popularity rank. Every posting list below holds row ids in
+# ascending order, which means "first N matches" == "N most popular".
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Candidates are verified in growing chunks so dense queries stop after a
+# few hundred rows while sparse ones don't pay per-row Python overhead.
+_FIRST_CHUNK = 256
+_MAX_CHUNK = 65536
+_GENRE_CACHE_SIZE = 64
+_PAGE_CACHE_SIZE = 64
+
+# Orders for page(); "relevance" is catalog order, i.e. popularity
+SORTS = ("relevance", "rating", "title")
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _to_postings(lists):
+    return {key: np.asarray(rows, dtype=np.int32) for key, rows in lists.items()}
+
+
+def _contains_sorted(posting, rows):
+    """
+    Boolean mask of which `rows` appear in the sorted `posting` array.
+    """
+    pos = np.searchsorted(posting, rows)
+    pos[pos == len(posting)] = len(posting) - 1
+    return posting[pos] == rows
+
+
+class SearchIndex:
+    """
+    Prebuilt index over title (character trigrams), genre (one bitmap per
+    distinct genre value) and, optionally, overview (word tokens).
+
+    Query semantics match the old pandas filter: case-insensitive literal
+    substring on title and on genre, results in catalog order. page() adds
+    rating / title order and cursors on top of the same matching.
+    """
+
+    def __init__(self, movie_db, index_overview=False):
+        self.size = len(movie_db)
+        self._all_rows = np.arange(self.size, dtype=np.int32)
+        self._lower_titles = [str(t).lower() for t in movie_db["title"].tolist()] if self.size else []
+        columns = set(movie_db.columns)
+        ratings = movie_db["rating"].tolist() if self.size and "rating" in columns else [None] * self.size
+        self._ratings = np.array([_rating_value(r) for r in ratings], dtype=np.float32)
+        self._orders = {}
+        self._page_cache = {}
+
+        # 1. Title trigrams
+        lists = {}
+        for row, title in enumerate(self._lower_titles):
+            for gram in trigrams(title):
+                lists.setdefault(gram, []).append(row)
+        self._trigrams = _to_postings(lists)
+
+        # 2. Genre bitmaps (the genre column has a tiny vocabulary)
+        genres = np.asarray(movie_db["genre"].tolist() if self.size else [], dtype=object)
+        # Content digest for cursors: a rebuilt catalog of the same size
+        # (re-fetch, hot reload) must not accept the old build's cursors
+        digest = hashlib.sha1("\x1f".join(self._lower_titles).encode("utf-8"))
+        digest.update("\x1f".join(map(str, genres.tolist())).encode("utf-8"))
+        digest.update(self._ratings.tobytes())
+        self._digest = digest.hexdigest()[:16]
+        self._genre_bitmaps = {}
+        for value in set(genres.tolist()):
+            self._genre_bitmaps[str(value).lower()] = genres == value
+        self._genre_cache = {}
+        # Prewarm exact genre names so the UI's genre rows never build a mask
+        for value in self._genre_bitmaps:
+            self.genre_rows(value)
+
+        # 3. Overview tokens (opt-in: large text, only needed for full-text search)
+        self._overview_tokens = {}
+        if index_overview and "overview" in movie_db.columns:
+            lists = {}
+            for row, text in enumerate(movie_db["overview"].tolist()):
+                for token in set(tokenize(str(text))):
+                    lists.setdefault(token, []).append(row)
+            self._overview_tokens = _to_postings(lists)
+
+    # ------------------------------------------
+    # Genre filter
+    # ------------------------------------------
+    def genre_rows(self, genre):
+        """
+        Returns (mask, rows) for a genre substring, or (None, None) for "All".
+        """
+        if genre == "All":
+            return None, None
+        key = genre.lower()
+        cached = self._genre_cache.get(key)
+        if cached is not None:
+            return cached
+
+        mask = np.zeros(self.size, dtype=bool)
+        for value, bitmap in self._genre_bitmaps.items():
+            if key in value:
+                mask |= bitmap
+        cached = (mask, np.flatnonzero(mask).astype(np.int32))
+
+        if len(self._genre_cache) >= _GENRE_CACHE_SIZE:
+            self._genre_cache.clear()
+        self._genre_cache[key] = cached
+        return cached
+
+    # ------------------------------------------
+    # Query
+    # ------------------------------------------
+    def search(self, query="", genre="All", limit=12, include_overview=False):
+        """
+        Returns up to `limit` row ids (catalog order) matching the query.
+        """
+        mask, genre_rows = self.genre_rows(genre)
+        needle = query.lower()
+
+        if not needle:
+            rows = genre_rows if genre_rows is not None else self._all_rows
+            return rows[:limit].tolist()
+
+        hits = self._title_matches(needle, mask, genre_rows, limit)
+
+        if include_overview and self._overview_tokens:
+            extra = self._overview_matches(needle, mask)
+            if len(extra):
+                hits = np.union1d(np.asarray(hits, dtype=np.int32), extra)[:limit].tolist()
+        return hits
+
+    # ------------------------------------------
+    # Sorted pages (cursor pagination)
+    # ------------------------------------------
+    def order(self, sort):
+        """
+        (rows in `sort` order, rank of each row in that order), built on
+        first use. Ties keep catalog order, so every order is total.
+        """
+        cached = self._orders.get(sort)
+        if cached is not None:
+            return cached
+        if sort == "relevance":
+            order = self._all_rows
+        elif sort == "rating":
+            order = np.lexsort((self._all_rows, -self._ratings)).astype(np.int32)
+        elif sort == "title":
+            order = np.asarray(sorted(range(self.size), key=self._lower_titles.__getitem__), dtype=np.int32)
+        else:
+            raise ValueError(f"sort must be one of {SORTS}")
+        rank = np.empty(self.size, dtype=np.int32)
+        rank[order] = np.arange(self.size, dtype=np.int32)
+        cached = self._orders[sort] = (order, rank)
+        return cached
+
+    def matches(self, query="", genre="All", include_overview=False):
+        """
+        Every matching row id, ascending (no limit).
+        """
+        mask, genre_rows = self.genre_rows(genre)
+        needle = query.lower()
+        if not needle:
+            return genre_rows if genre_rows is not None else self._all_rows
+        rows = np.asarray(self._title_matches(needle, mask, genre_rows, None), dtype=np.int32)
+        if include_overview and self._overview_tokens:
+            extra = self._overview_matches(needle, mask)
+            if len(extra):
+                rows = np.union1d(rows, extra).astype(np.int32)
+        return rows
+
+    def sorted_matches(self, query="", genre="All", sort="relevance", include_overview=False):
+        """
+        (matching rows in `sort` order, their ranks ascending); cached per
+        query so paging deeper only slices these arrays.
+        """
+        key = (query.lower(), genre.lower(), sort, include_overview)
+        cached = self._page_cache.get(key)
+        if cached is not None:
+            return cached
+        order, rank = self.order(sort)
+        if not query and genre == "All":
+            cached = (order, np.arange(self.size, dtype=np.int32))
+        else:
+            rows = self.matches(query, genre, include_overview)
+            ranks = np.sort(rank[rows])
+            cached = (order[ranks], ranks)
+        if len(self._page_cache) >= _PAGE_CACHE_SIZE:
+            self._page_cache.clear()
+        self._page_cache[key] = cached
+        return cached
+
+    def page(self, query="", genre="All", sort="relevance", limit=12, cursor=None,
+             include_overview=False, count=False):
+        """
+        One page in `sort` order: (row ids, next cursor or None, total or None).
+        The cursor holds the rank of the last row returned, so any page is a
+        binary search + slice over presorted arrays, O(log n + limit).
+        Text queries in relevance order keep search()'s early-stopping scan
+        (resumed after the cursor) and report no total unless count=True
+        or the full match list is already cached.
+        """
+        _, rank = self.order(sort)
+        key = self._cursor_key(query, genre, sort, include_overview)
+        after = self._decode_cursor(cursor, key)
+        cached = (query.lower(), genre.lower(), sort, include_overview) in self._page_cache
+        if query and sort == "relevance" and not (include_overview or count or cached):
+            mask, genre_rows = self.genre_rows(genre)
+            rows = self._title_matches(query.lower(), mask, genre_rows, limit + 1, after=after)
+            total = None
+        else:
+            sorted_rows, ranks = self.sorted_matches(query, genre, sort, include_overview)
+            # needle in the array's dtype, or NumPy upcasts the whole array first
+            start = int(np.searchsorted(ranks, ranks.dtype.type(after), side="right"))
+            rows = sorted_rows[start:start + limit + 1].tolist()
+            total = len(sorted_rows)
+        more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = self._encode_cursor(int(rank[rows[-1]]), key) if more and rows else None
+        return rows, next_cursor, total
+
+    def _cursor_key(self, query, genre, sort, include_overview):
+        # Ties a cursor to its query and to this catalog's contents
+        text = f"{query.lower()}\x1f{genre.lower()}\x1f{sort}\x1f{include_overview}\x1f{self._digest}"
+        return zlib.crc32(text.encode("utf-8"))
+
+    @staticmethod
+    def _encode_cursor(rank, key):
+        return base64.urlsafe_b64encode(f"{rank}:{key}".encode()).decode().rstrip("=")
+
+    @staticmethod
+    def _decode_cursor(cursor, key):
+        if not cursor:
+            return -1
+        try:
+            rank, cursor_key = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode().split(":")
+            rank, cursor_key = int(rank), int(cursor_key)
+        except (ValueError, UnicodeDecodeError):
+            raise ValueError("malformed cursor")
+        if cursor_key != key:
+            raise ValueError("cursor belongs to a different query, sort or catalog")
+        return rank
+
+    def _title_matches(self, needle, mask, genre_rows, limit, after=-1):
+        if len(needle) >= 3:
+            postings = []
+            for gram in trigrams(needle):
+                posting = self._trigrams.get(gram)
+                if posting is None:
+                    return []
+                postings.append(posting)
+            postings.sort(key=len)
+            candidates, checks = postings[0], postings[1:]
+        else:
+            # Too short for trigrams: walk rows in rank order, stop early
+            candidates = genre_rows if genre_rows is not None else self._all_rows
+            checks = []
+            mask = None
+
+        if after >= 0:
+            candidates = candidates[np.searchsorted(candidates, candidates.dtype.type(after), side="right"):]
+        return self._scan(candidates, checks, needle, mask, limit)
+
+    def _scan(self, candidates, checks, needle, mask, limit):
+        titles = self._lower_titles
+        hits = []
+        start, step = 0, _FIRST_CHUNK
+        while start < len(candidates):
+            chunk = candidates[start:start + step]
+            start += step
+            step = min(step * 4, _MAX_CHUNK)
+
+            if mask is not None:
+                chunk = chunk[mask[chunk]]
+            for posting in checks:
+                if not len(chunk):
+                    break
+                chunk = chunk[_contains_sorted(posting, chunk)]
+
+            # Trigrams can overlap in the wrong order, so confirm the substring
+            for row in chunk.tolist():
+                if needle in titles[row]:
+                    hits.append(row)
+                    if len(hits) == limit:
+                        return hits
+        return hits
+
+    def _overview_matches(self, needle, mask):
+        postings = []
+        for token in set(tokenize(needle)):
+            posting = self._overview_tokens.get(token)
+            if posting is None:
+                return np.empty(0, dtype=np.int32)
+            postings.append(posting)
+        if not postings:
+            return np.empty(0, dtype=np.int32)
+
+        postings.sort(key=len)
+        rows = postings[0]
+        for posting in postings[1:]:
+            rows = rows[_contains_sorted(posting, rows)]
+        if mask is not None:
+            rows = rows[mask[rows]]
+        return rows
@@ -0,0 +1,130 @@
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+# ==========================================
+# PRE-FORK LAUNCHER
+# ==========================================
+# `uvicorn api:app --workers N` starts N interpreters that each parse the
+# catalog, build the title/search/trending indexes and load the model, so
+# memory grows by a full copy per worker. Here api.py is imported once in
+# this parent process and the workers are fork()ed from it:
+#   - NumPy arrays (search postings, sort orders, embedding tables, the
+#     quantized / IVF-PQ index) are never written after the fork, so their
+#     pages stay shared copy-on-write.
+#   - gc.freeze() moves every object built so far out of the collector's
+#     reach; otherwise the first full collection in each worker would write
+#     to every list/dict/tuple header and un-share them.
+#   - the memory-mapped catalog (`python catalog.py compile`) and the
+#     embedding tables are file pages, shared through the page cache.
+# Only the NumPy backend is forked: TensorFlow's runtime threads do not
+# survive fork(), and with the export TF is never imported at all.
+# A worker that dies is re-forked from the parent in milliseconds, without
+# reloading anything. Each worker still watches models/ for hot swaps
+# (a newly loaded version is private to the worker that loaded it).
+#
+#   python serve.py --workers 4 --port 8000
+
+
+def listen(host, port, backlog=2048):
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(api, sock, log_level):
+    import uvicorn
+
+    # Drop the parent's handlers; uvicorn installs its own graceful ones
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    api.start_runtime()
+    config = uvicorn.Config(api.app, log_level=log_level, timeout_graceful_shutdown=10)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def fork_worker(api, sock, log_level):
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            run_worker(api, sock, log_level)
+        except BaseException as e:
+            print(f"⚠️ Worker {os.getpid()} crashed: {e}", file=sys.stderr)
+            code = 1
+        finally:
+            # Never run the parent's atexit hooks / finalizers in a worker
+            os._exit(code)
+    return pid
+
+
+def supervise(api, sock, workers, log_level):
+    children = {fork_worker(api, sock, log_level) for _ in range(workers)}
+    print(f"✅ Forked {workers} workers: {sorted(children)}")
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if not stopping:
+            print(f"⚠️ Worker {pid} exited ({status}), re-forking")
+            time.sleep(0.1)   # don't spin if workers die on startup
+            children.add(fork_worker(api, sock, log_level))
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve api.py from N workers forked after one shared load")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    if os.getenv("RETRIEVAL_BACKEND", "numpy") != "numpy":
+        parser.error("serve.py forks workers and needs RETRIEVAL_BACKEND=numpy "
+                     "(export the model with `python retrieval.py export`)")
+    os.environ["RETRIEVAL_BACKEND"] = "numpy"
+    os.environ["API_PREFORK"] = "1"
+    # Share the cores out between the workers' BLAS thread pools (set before NumPy loads)
+    threads = str(max(1, (os.cpu_count() or 1) // args.workers))
+    for name in ("OPENBLAS_NUM_THREADS", "OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(name, threads)
+
+    sock = listen(args.host, args.port)
+    start = time.perf_counter()
+    import api
+    api.load()
+    # Build the lazy sort orders now so workers share them instead of each building its own
+    for sort in ("rating", "title"):
+        api.search_index.order(sort)
+    gc.collect()
+    gc.freeze()
+    print(f"✅ Shared state loaded in {time.perf_counter() - start:.1f}s "
+          f"(serving http://{args.host}:{args.port})")
+    supervise(api, sock, args.workers, args.log_level)
+
+
+if __name__ == "__main__":
+    main()
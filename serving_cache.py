@@ -0,0 +1,98 @@
+import glob
+import hashlib
+import os
+import pickle
+import threading
+
+import catalog
+import search_index
+import trending
+from retrieval import fingerprint
+
+# ==========================================
+# PRECOMPILED SERVING INDEXES (local disk)
+# ==========================================
+# Building the title, search and trending indexes is most of api.py's
+# startup on a large catalog (1M movies: ~20s, the search trigrams alone
+# ~17s). With SERVING_CACHE_DIR set, the built indexes are pickled there
+# once and later starts unpickle them instead (~1s). The file name is a
+# fingerprint of the catalog files, the index code and the build options,
+# so editing movies.csv, recompiling the catalog or upgrading the code
+# simply misses and rebuilds; older files are removed on save.
+#
+# The row accessor the indexes format responses from (catalog.row_tuples,
+# possibly memory-mapped) and locks are not stored: they are pickled as
+# references and re-attached on load.
+
+_LOCK_TYPE = type(threading.Lock())
+
+
+def cache_key(csv_path, catalog_path, **options):
+    # Same source load_catalog picks, so a stale compiled catalog never keys the cache
+    paths = [csv_path]
+    if os.path.isdir(catalog_path) and catalog.catalog_is_current(csv_path, catalog_path):
+        paths = [os.path.join(catalog_path, name) for name in sorted(os.listdir(catalog_path))]
+    paths += [module.__file__ for module in (catalog, search_index, trending)]
+    built_with = ",".join(f"{name}={value}" for name, value in sorted(options.items()))
+    return f"{fingerprint(paths)}-{hashlib.sha1(built_with.encode()).hexdigest()[:8]}"
+
+
+def _path(cache_dir, key):
+    return os.path.join(cache_dir, f"indexes-{key}.pkl")
+
+
+class _Pickler(pickle.Pickler):
+    def __init__(self, file, rows):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.rows = rows
+
+    def persistent_id(self, obj):
+        if obj is self.rows:
+            return "rows"
+        if isinstance(obj, _LOCK_TYPE):
+            return "lock"
+        return None
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, file, rows):
+        super().__init__(file)
+        self.rows = rows
+
+    def persistent_load(self, pid):
+        if pid == "rows":
+            return self.rows
+        if pid == "lock":
+            return threading.Lock()
+        raise pickle.UnpicklingError(f"unknown reference {pid!r}")
+
+
+def load_indexes(cache_dir, key, rows):
+    """
+    The cached {name: index} dict for `key`, bound to `rows`, or None.
+    """
+    path = _path(cache_dir, key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            return _Unpickler(f, rows).load()
+    except Exception as e:
+        print(f"⚠️ Serving cache {path} unreadable, rebuilding: {e}")
+        return None
+
+
+def save_indexes(cache_dir, key, rows, indexes):
+    """
+    Writes atomically (temp file + rename) and drops other keys' files.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _path(cache_dir, key)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        _Pickler(f, rows).dump(indexes)
+    os.replace(tmp, path)
+    for old in glob.glob(os.path.join(cache_dir, "indexes-*.pkl")):
+        if old != path:
+            os.remove(old)
+    return path
@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the repo root (flat layout, no package)
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+
+@pytest.fixture(scope="session")
+def api(tmp_path_factory):
+    """
+    api.py loaded eagerly over a small synthetic catalog (every third
+    movie is "Action|Sci-Fi", so genre rows overlap) and a stub export
+    served with NumPy. api.py is a module-level singleton: one per session.
+    """
+    from benchmarks.synthetic import make_catalog, make_stub_embeddings
+
+    workdir = tmp_path_factory.mktemp("api")
+    movie_db = make_catalog(300)
+    movie_db.loc[::3, "genre"] = "Action|Sci-Fi"
+    movie_db.to_csv(workdir / "movies.csv", index=False)
+    make_stub_embeddings(str(workdir / "my_embeddings"), movie_db, 50)
+    os.environ.update(API_EAGER_LOAD="1", RETRIEVAL_BACKEND="numpy", RECOMMEND_CACHE_WARMUP="0",
+                      MODELS_DIR=str(workdir / "models"))
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        import api
+    finally:
+        os.chdir(cwd)
+    return api
+
+
+@pytest.fixture
+def client(api):
+    from fastapi.testclient import TestClient
+    return TestClient(api.app)
@@ -0,0 +1,121 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from admission import Overloaded, WorkerPool
+from batcher import MicroBatcher
+
+
+class SlowModel:
+    """
+    batch_fn that records every item it computes and the peak number of
+    calls running at once.
+    """
+
+    def __init__(self, seconds=0.05):
+        self.seconds = seconds
+        self.computed = []
+        self.running = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, items):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(self.seconds)
+        with self.lock:
+            self.running -= 1
+            self.computed += items
+        return [item * 2 for item in items]
+
+
+def test_rejected_requests_are_never_submitted():
+    model = SlowModel()
+    pool = WorkerPool("inference", 1, max_pending=2)
+    batcher = MicroBatcher(model, max_batch_size=1, workers=1, executor=pool.executor)
+
+    async def call(i):
+        try:
+            return await pool.wait(lambda: batcher.submit(i))
+        except Overloaded:
+            return None
+
+    async def main():
+        return await asyncio.gather(*(call(i) for i in range(20)))
+
+    results = asyncio.run(main())
+    admitted = [r for r in results if r is not None]
+    assert len(admitted) == 2
+    assert pool.rejected == 18
+    time.sleep(0.2)
+    assert len(model.computed) == 2
+    assert pool.pending == 0
+
+
+def test_overloaded_carries_retry_after():
+    pool = WorkerPool("search", 1, max_pending=0)
+    with pytest.raises(Overloaded) as e:
+        asyncio.run(pool.run(lambda: None))
+    assert e.value.pool == "search" and e.value.retry_after >= 1
+
+
+def test_batcher_and_pool_share_the_worker_limit():
+    model = SlowModel(seconds=0.02)
+    pool = WorkerPool("inference", 2, max_pending=1000)
+    batcher = MicroBatcher(model, max_batch_size=4, max_wait_us=1000, workers=2, executor=pool.executor)
+
+    async def main():
+        singles = [pool.wait(lambda i=i: batcher.submit(i)) for i in range(40)]
+        batches = [pool.run(model, list(range(100 + 10 * j, 110 + 10 * j))) for j in range(10)]
+        return await asyncio.gather(*singles, *batches)
+
+    results = asyncio.run(main())
+    assert results[:40] == [i * 2 for i in range(40)]
+    assert model.peak <= 2
+    assert batcher.stats()["items"] == 40
+
+
+def test_batch_errors_reach_every_caller_and_free_the_slot():
+    calls = []
+
+    def flaky(items):
+        calls.append(items)
+        if len(calls) == 1:
+            raise ValueError("boom")
+        return items
+
+    batcher = MicroBatcher(flaky, max_batch_size=8, max_wait_us=0, workers=1)
+    with pytest.raises(ValueError):
+        batcher(1, timeout=5)
+    assert batcher(2, timeout=5) == 2
+
+
+@pytest.mark.parametrize("shared_executor", [False, True])
+def test_cancelled_caller_does_not_strand_its_batch(shared_executor):
+    model = SlowModel(seconds=0.01)
+    pool = WorkerPool("inference", 1, max_pending=10)
+    batcher = MicroBatcher(model, max_batch_size=8, max_wait_us=200_000, workers=1,
+                           executor=pool.executor if shared_executor else None)
+
+    async def main():
+        first = asyncio.ensure_future(pool.wait(lambda: batcher.submit(1)))
+        second = asyncio.ensure_future(pool.wait(lambda: batcher.submit(2)))
+        await asyncio.sleep(0.02)   # both queued, batch still collecting
+        first.cancel()
+        return await asyncio.wait_for(second, timeout=2)
+
+    assert asyncio.run(main()) == 4
+    assert model.computed == [2]
+    # The batcher keeps going afterwards
+    assert batcher(3, timeout=2) == 6
+    assert pool.pending == 0
+
+
+def test_recommend_batch_is_bounded(api, client):
+    ok = client.post("/recommend/batch", json={"user_ids": [str(i) for i in range(api.BATCH_MAX_USERS)]})
+    assert ok.status_code == 200
+    too_many = client.post("/recommend/batch", json={"user_ids": ["1"] * (api.BATCH_MAX_USERS + 1)})
+    assert too_many.status_code == 422
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from features import (MANIFEST, MOVIE_FEATURES, CandidateStore, feature_chunks, precompute_candidates,
+                      row_hashes, row_ids)
+
+SHARDS = 8
+
+
+class StubTower:
+    """
+    Deterministic movie tower: each row's vector is seeded by its features.
+    Counts the rows it embeds; `delay` makes later batches finish first.
+    """
+
+    def __init__(self, dim=4, delay=0.0):
+        self.dim = dim
+        self.delay = delay
+        self.rows = 0
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, batch):
+        with self.lock:
+            self.calls += 1
+            self.rows += len(batch["movie_title"])
+            call = self.calls
+        if self.delay:
+            time.sleep(self.delay / call)
+        return np.stack([embed(values, self.dim) for values in zip(*(batch[n] for n in MOVIE_FEATURES))])
+
+
+def embed(values, dim=4):
+    seed = int.from_bytes(hashlib.sha1("\x1f".join(values).encode()).digest()[:8], "little")
+    return np.random.default_rng(seed).normal(size=dim).astype(np.float32)
+
+
+def features(n=100):
+    return {
+        "movie_title": [f"Movie {i}" for i in range(n)],
+        "genres": ["Action|Drama" if i % 2 else "Comedy" for i in range(n)],
+        "text": [f"movie {i} a story" for i in range(n)],
+        "tmdb_id": [str(1000 + i) for i in range(n)],
+    }
+
+
+def expected(feats):
+    return np.stack([embed(values) for values in zip(*(feats[n] for n in MOVIE_FEATURES))])
+
+
+def run(tower, feats, store, version="v1", chunk_rows=30, **kwargs):
+    return precompute_candidates(tower, feature_chunks(feats, chunk_rows), version, store,
+                                 batch_size=16, shards=SHARDS, **kwargs)
+
+
+def shard_files(store):
+    return sorted(name for name in os.listdir(store) if name.startswith("shard-"))
+
+
+def shard_of(feats, row):
+    return f"shard-{row_ids(feats)[row] % SHARDS:05d}.npz"
+
+
+@pytest.fixture
+def store(tmp_path):
+    return str(tmp_path / "candidates")
+
+
+def test_round_trip(store):
+    feats = features()
+    titles, vectors, stats = run(StubTower(), feats, store)
+    assert titles == feats["movie_title"]
+    np.testing.assert_allclose(vectors, expected(feats))
+    assert stats["embedded"] == 100 and stats["shards_written"] == len(shard_files(store)) == SHARDS
+
+    loaded = CandidateStore(store).load("v1")
+    assert len(loaded.ids) == 100 and not loaded.corrupt
+    rows = loaded.lookup(row_ids(feats), row_hashes(feats))
+    np.testing.assert_allclose(loaded.vectors[rows], expected(feats))
+
+
+def test_unchanged_rerun_embeds_nothing(store):
+    feats = features()
+    run(StubTower(), feats, store)
+    inodes = {name: os.stat(os.path.join(store, name)).st_ino for name in shard_files(store)}
+
+    tower = StubTower()
+    _, vectors, stats = run(tower, feats, store)
+    assert tower.rows == 0 and stats["embedded"] == 0 and stats["shards_written"] == 0
+    assert stats["reused"] == 100
+    np.testing.assert_allclose(vectors, expected(feats))
+    assert {name: os.stat(os.path.join(store, name)).st_ino for name in shard_files(store)} == inodes
+
+
+def test_edited_row_rewrites_only_its_shard(store):
+    feats = features()
+    run(StubTower(), feats, store)
+    before = {name: os.stat(os.path.join(store, name)).st_ino for name in shard_files(store)}
+
+    feats["text"][42] += " remastered"
+    tower = StubTower()
+    _, vectors, stats = run(tower, feats, store)
+    assert tower.rows == 1 and stats["shards_written"] == 1
+    np.testing.assert_allclose(vectors, expected(feats))
+    after = {name: os.stat(os.path.join(store, name)).st_ino for name in shard_files(store)}
+    assert [name for name in after if after[name] != before[name]] == [shard_of(feats, 42)]
+
+
+def test_corrupt_shard_is_detected_and_reembedded(store):
+    feats = features()
+    run(StubTower(), feats, store)
+    name = shard_of(feats, 7)
+    path = os.path.join(store, name)
+    with open(path, "r+b") as f:
+        f.seek(os.path.getsize(path) // 2)
+        byte = f.read(1)
+        f.seek(-1, os.SEEK_CUR)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+    assert CandidateStore(store).load("v1").corrupt == [name]
+    tower = StubTower()
+    _, vectors, stats = run(tower, feats, store)
+    shard_rows = json.load(open(os.path.join(store, MANIFEST)))["files"][name]["rows"]
+    assert stats["corrupt_shards"] == 1 and tower.rows == shard_rows and stats["shards_written"] == 1
+    np.testing.assert_allclose(vectors, expected(feats))
+    assert not CandidateStore(store).load("v1").corrupt
+
+
+def test_new_tower_version_reembeds_everything(store):
+    feats = features()
+    run(StubTower(), feats, store)
+    tower = StubTower()
+    _, _, stats = run(tower, feats, store, version="v2")
+    assert tower.rows == 100 and stats["reused"] == 0
+    assert json.load(open(os.path.join(store, MANIFEST)))["tower"] == "v2"
+    assert len(CandidateStore(store).load("v1").ids) == 0
+
+
+def test_removed_rows_drop_their_shards(store):
+    feats = features(100)
+    run(StubTower(), feats, store)
+    kept = {name: values[:3] for name, values in feats.items()}
+    titles, vectors, stats = run(StubTower(), kept, store)
+    assert titles == kept["movie_title"] and stats["embedded"] == 0
+    assert shard_files(store) == sorted({shard_of(kept, i) for i in range(3)})
+    assert len(CandidateStore(store).load("v1").ids) == 3
+
+
+def test_missing_or_duplicate_tmdb_ids_fall_back_to_title_hashes():
+    feats = features(4)
+    feats["tmdb_id"] = ["1000", "", "1000", "not a number"]
+    ids = row_ids(feats)
+    assert ids[0] == 1000
+    assert (ids[1:] < 0).all() and len(set(ids.tolist())) == 4
+
+    # Ids handed out in an earlier chunk stay taken
+    seen = set()
+    first = row_ids({name: values[:1] for name, values in feats.items()}, seen)
+    rest = row_ids({name: values[1:] for name, values in feats.items()}, seen)
+    assert np.concatenate([first, rest]).tolist() == ids.tolist()
+
+
+def test_parallel_workers_keep_catalog_order(store):
+    feats = features(200)
+    tower = StubTower(delay=0.02)
+    titles, vectors, stats = run(tower, feats, store, workers=4, prefetch=2)
+    assert tower.calls > 4 and stats["embedded"] == 200
+    assert titles == feats["movie_title"]
+    np.testing.assert_allclose(vectors, expected(feats))
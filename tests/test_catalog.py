@@ -0,0 +1,56 @@
+import os
+
+import pandas as pd
+
+from catalog import ColumnarCatalog, catalog_is_current, compile_catalog, load_catalog
+from serving_cache import cache_key
+
+
+def write_csv(path, titles, overview=True):
+    df = pd.DataFrame({"title": titles, "genre": "Drama", "rating": "70", "poster_path": "",
+                       "overview": "A story.", "id": [str(i + 1) for i in range(len(titles))]})
+    if not overview:
+        df = df.drop(columns="overview")
+    df.to_csv(path, index=False)
+
+
+def test_compiled_catalog_is_used_while_current(tmp_path):
+    csv_path, catalog_path = str(tmp_path / "movies.csv"), str(tmp_path / "movies_catalog")
+    write_csv(csv_path, ["Heat", "Ronin"])
+    compile_catalog(csv_path, catalog_path)
+    assert catalog_is_current(csv_path, catalog_path)
+    assert isinstance(load_catalog(csv_path, catalog_path), ColumnarCatalog)
+
+    # Deployed without its CSV: nothing to compare against, still served
+    os.remove(csv_path)
+    assert isinstance(load_catalog(csv_path, catalog_path), ColumnarCatalog)
+
+
+def test_stale_catalog_falls_back_to_csv(tmp_path, capsys):
+    csv_path, catalog_path = str(tmp_path / "movies.csv"), str(tmp_path / "movies_catalog")
+    write_csv(csv_path, ["Heat", "Ronin"])
+    compile_catalog(csv_path, catalog_path)
+    stale_key = cache_key(csv_path, catalog_path)
+
+    write_csv(csv_path, ["Heat", "Ronin", "Collateral"])
+    movie_db = load_catalog(csv_path, catalog_path)
+    assert not isinstance(movie_db, ColumnarCatalog)
+    assert movie_db["title"].tolist() == ["Heat", "Ronin", "Collateral"]
+    assert "does not match" in capsys.readouterr().out
+    # Pickled serving indexes must not be reused for the old catalog
+    assert cache_key(csv_path, catalog_path) != stale_key
+
+    compile_catalog(csv_path, catalog_path)
+    assert load_catalog(csv_path, catalog_path)["title"].tolist() == ["Heat", "Ronin", "Collateral"]
+
+
+def test_recompile_drops_removed_columns(tmp_path):
+    csv_path, catalog_path = str(tmp_path / "movies.csv"), str(tmp_path / "movies_catalog")
+    write_csv(csv_path, ["Heat"])
+    compile_catalog(csv_path, catalog_path)
+    assert os.path.exists(os.path.join(catalog_path, "overview.blob.npy"))
+
+    write_csv(csv_path, ["Heat"], overview=False)
+    compile_catalog(csv_path, catalog_path)
+    assert not [name for name in os.listdir(catalog_path) if name.startswith("overview.")]
+    assert "overview" not in load_catalog(csv_path, catalog_path).columns
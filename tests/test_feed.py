@@ -0,0 +1,68 @@
+import pytest
+
+
+def titles(row):
+    return [movie["title"] for movie in row["movies"]]
+
+
+def test_each_title_appears_in_one_row_only(client):
+    feed = client.post("/feed", json={"user_id": "7", "genres": ["Action", "Sci-Fi"], "row_size": 8}).json()
+    assert [row["name"] for row in feed["rows"]] == ["recommended", "Action", "Sci-Fi"]
+    shown = [title for row in feed["rows"] for title in titles(row)]
+    assert len(shown) == len(set(shown))
+    # Overlapping "Action|Sci-Fi" movies are skipped in the second row, which still fills up
+    assert all(len(titles(row)) == 8 for row in feed["rows"][1:])
+
+
+@pytest.mark.parametrize("body", [
+    {"row_size": 0},
+    {"row_size": -5},
+    {"row_size": 51},
+    {"genres": [f"g{i}" for i in range(11)]},
+    {"genres": ["x" * 65]},
+])
+def test_feed_limits(client, body):
+    assert client.post("/feed", json=body).status_code == 422
+
+
+@pytest.mark.parametrize("query", ["row_size=0", "row_size=1000", "genres=" + ",".join(f"g{i}" for i in range(11))])
+def test_feed_get_limits(client, query):
+    assert client.get(f"/feed?{query}").status_code == 422
+
+
+def test_matching_etag_skips_building_the_feed(api, client, monkeypatch):
+    first = client.get("/feed?user_id=3&genres=Action&row_size=4")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"')
+
+    async def must_not_build(req):
+        raise AssertionError("feed built for a matching If-None-Match")
+
+    monkeypatch.setattr(api, "build_feed", must_not_build)
+    again = client.get("/feed?user_id=3&genres=Action&row_size=4", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+
+
+def test_etag_follows_the_feed_inputs(api, client, monkeypatch):
+    etag = lambda query: client.get(f"/feed?{query}").headers["etag"]
+    base = etag("user_id=3&genres=Action&row_size=4")
+    assert etag("user_id=4&genres=Action&row_size=4") != base
+    assert etag("user_id=3&genres=Sci-Fi&row_size=4") != base
+    assert etag("user_id=3&genres=Action&row_size=5") != base
+    monkeypatch.setattr(api, "model_version", lambda: "v2")
+    assert etag("user_id=3&genres=Action&row_size=4") != base
+
+
+def test_if_none_match_is_parsed_as_a_tag_list(client):
+    url = "/feed?user_id=3&genres=Action&row_size=4"
+    etag = client.get(url).headers["etag"]
+    opaque = etag.removeprefix("W/")
+    status = lambda header: client.get(url, headers={"If-None-Match": header}).status_code
+    assert status(f'"other", {etag}') == 304
+    assert status(f" {opaque} ") == 304          # weak comparison
+    assert status("*") == 304
+    # An entry that merely contains ours is a different tag
+    assert status(f"x{etag}") == 200
+    assert status(f'"other", "{etag}"') == 200
@@ -0,0 +1,72 @@
+import json
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+import fetch_real_data
+from fetch_real_data import TMDBClient, read_checkpoint, retry_after_seconds
+
+
+def test_retry_after_seconds_form():
+    assert retry_after_seconds("0.05") == 0.05
+    assert retry_after_seconds("120") == 120.0
+    assert retry_after_seconds("-3") == 0.0
+
+
+def test_retry_after_http_date_form():
+    when = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 <= retry_after_seconds(format_datetime(when, usegmt=True)) <= 30
+    past = datetime.now(timezone.utc) - timedelta(minutes=5)
+    assert retry_after_seconds(format_datetime(past, usegmt=True)) == 0.0
+
+
+def test_retry_after_garbage_falls_back_to_backoff():
+    assert retry_after_seconds("soon") is None
+    assert retry_after_seconds("") is None
+    assert retry_after_seconds("inf") is None
+    assert retry_after_seconds("nan") is None
+
+
+class FakeResponse:
+    def __init__(self, status, headers=None):
+        self.status_code = status
+        self.headers = headers or {}
+
+    def json(self):
+        return {"ok": True}
+
+
+@pytest.mark.parametrize("retry_after", ["86400", "inf", "Fri, 31 Dec 2100 23:59:59 GMT"])
+def test_retry_wait_is_capped(monkeypatch, retry_after):
+    client = TMDBClient("key", "http://tmdb.invalid/3", workers=1, rate=1000, max_backoff=2)
+    responses = iter([FakeResponse(429, {"Retry-After": retry_after}), FakeResponse(200)])
+    monkeypatch.setattr(client.session, "get", lambda *args, **kwargs: next(responses))
+    slept = []
+    monkeypatch.setattr(fetch_real_data.time, "sleep", slept.append)
+    assert client.get("/movie/popular") == {"ok": True}
+    assert len(slept) == 1 and 0 <= slept[0] <= 2
+
+
+RUN = {"output": "/data/movies.csv", "pages": 3}
+
+
+def test_checkpoint_skips_torn_line(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    rows = [{"title": "A", "id": 1}]
+    path.write_text(json.dumps({"run": RUN}) + "\n"
+                    + json.dumps({"page": 1, "rows": rows}) + "\n"
+                    + json.dumps({"page": 2, "rows": []}) + "\n"
+                    + '{"page": 3, "ro')
+    assert read_checkpoint(path, RUN) == {1: rows, 2: []}
+    assert read_checkpoint(tmp_path / "missing.jsonl", RUN) == {}
+
+
+def test_checkpoint_from_another_run_is_discarded(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    path.write_text(json.dumps({"run": RUN}) + "\n" + json.dumps({"page": 1, "rows": []}) + "\n")
+    assert read_checkpoint(path, dict(RUN, pages=5)) == {}
+    assert read_checkpoint(path, dict(RUN, output="/data/other.csv")) == {}
+    # Pre-header checkpoints (first line is a page) are not trusted either
+    path.write_text(json.dumps({"page": 1, "rows": []}) + "\n")
+    assert read_checkpoint(path, RUN) == {}
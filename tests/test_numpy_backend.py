@@ -0,0 +1,48 @@
+import os
+
+import numpy as np
+import pytest
+
+os.environ.setdefault("TF_USE_LEGACY_KERAS", "1")
+tf = pytest.importorskip("tensorflow")
+tfrs = pytest.importorskip("tensorflow_recommenders")
+
+from retrieval import NumpyRetrieval, SavedModelRetrieval, export_from_saved_model
+
+
+@pytest.fixture(scope="module")
+def saved_model(tmp_path_factory):
+    """
+    A tiny BruteForce index built the way train.py builds my_model:
+    StringLookup -> Embedding query tower over precomputed candidates.
+    """
+    rng = np.random.default_rng(0)
+    users = [str(u) for u in range(1, 41)]
+    titles = [f"Movie {i}" for i in range(200)]
+    lookup = tf.keras.layers.StringLookup(vocabulary=users, mask_token=None)
+    query_model = tf.keras.Sequential([lookup, tf.keras.layers.Embedding(len(users) + 1, 16)])
+    index = tfrs.layers.factorized_top_k.BruteForce(query_model, k=10)
+    index.index(tf.constant(rng.normal(size=(len(titles), 16)).astype(np.float32)), tf.constant(titles))
+    index(tf.constant(["1"]))
+    path = str(tmp_path_factory.mktemp("tf") / "my_model")
+    tf.saved_model.save(index, path)
+    return path, users
+
+
+def test_numpy_export_matches_saved_model_top_k(saved_model, tmp_path):
+    model_path, users = saved_model
+    export_from_saved_model(model_path, str(tmp_path / "my_embeddings"))
+    numpy_backend = NumpyRetrieval(str(tmp_path / "my_embeddings"))
+    tf_backend = SavedModelRetrieval(model_path)
+
+    user_ids = users + ["not-a-user"]
+    assert sorted(numpy_backend.known_users()) == sorted(users)
+    expected, got = tf_backend(user_ids), numpy_backend(user_ids)
+    scores, _ = numpy_backend.scores(user_ids)
+    for user, a, b, row in zip(user_ids, got, expected, scores):
+        assert len(a) == len(b) == 10, user
+        if a != b:
+            # Near-ties may swap places between TF and BLAS; nothing else may differ
+            assert set(a) == set(b), user
+            swapped = [i for i, (x, y) in enumerate(zip(a, b)) if x != y]
+            assert np.ptp(row[swapped]) < 1e-5, user
@@ -0,0 +1,34 @@
+import os
+
+import numpy as np
+
+from retrieval import load_embeddings, reindex_embeddings, save_embeddings
+
+
+def export(path, seed, index="brute"):
+    rng = np.random.default_rng(seed)
+    users = rng.normal(size=(5, 8)).astype(np.float32)
+    movies = rng.normal(size=(300, 8)).astype(np.float32)
+    save_embeddings(path, ["[UNK]", "1", "2", "3", "4"], users,
+                    [f"Movie {i}" for i in range(300)], movies, index=index)
+    return movies
+
+
+def test_resave_keeps_live_mmap_intact(tmp_path):
+    old = export(tmp_path, seed=0, index="int8")
+    live = load_embeddings(tmp_path)["movie_embeddings"]
+    new = export(tmp_path, seed=1, index="int8")
+
+    # The mapped file was replaced, not overwritten: old readers keep the old rows
+    np.testing.assert_array_equal(live, old)
+    np.testing.assert_array_equal(load_embeddings(tmp_path)["movie_embeddings"], new)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_reindex_while_mapped(tmp_path):
+    movies = export(tmp_path, seed=0)
+    live = load_embeddings(tmp_path)
+    reindex_embeddings(tmp_path, "float16")
+    assert load_embeddings(tmp_path)["meta"]["index"] == "float16"
+    np.testing.assert_array_equal(live["movie_embeddings"], movies)
+    assert os.path.exists(tmp_path / "index_float16.npz")
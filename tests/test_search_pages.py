@@ -0,0 +1,106 @@
+import pytest
+
+from catalog import _rating_value
+from search_index import SORTS, SearchIndex
+from benchmarks.synthetic import make_catalog
+
+
+@pytest.fixture(scope="module")
+def movie_db():
+    movie_db = make_catalog(500, seed=3)
+    # unparseable and missing ratings sort last under "rating", like -1
+    movie_db.loc[::7, "rating"] = "N/A"
+    movie_db.loc[::11, "rating"] = ""
+    movie_db.loc[::5, "rating"] = "80"    # plenty of ties
+    return movie_db
+
+
+@pytest.fixture(scope="module")
+def index(movie_db):
+    return SearchIndex(movie_db, index_overview=True)
+
+
+def expected(movie_db, query, genre, sort):
+    titles = movie_db["title"].tolist()
+    genres = movie_db["genre"].tolist()
+    rows = [i for i in range(len(titles))
+            if query.lower() in titles[i].lower() and (genre == "All" or genre.lower() in genres[i].lower())]
+    if sort == "rating":
+        ratings = movie_db["rating"].tolist()
+        rows.sort(key=lambda i: (-_rating_value(ratings[i]), i))
+    elif sort == "title":
+        rows.sort(key=lambda i: (titles[i].lower(), i))
+    return rows
+
+
+def walk(index, limit, **query):
+    rows, cursor, pages = [], None, 0
+    while True:
+        page, cursor, _ = index.page(limit=limit, cursor=cursor, **query)
+        rows += page
+        pages += 1
+        assert pages < 1000
+        if cursor is None:
+            return rows, pages
+
+
+@pytest.mark.parametrize("sort", SORTS)
+@pytest.mark.parametrize("query,genre", [("", "All"), ("", "Drama"), ("star", "All"), ("the", "Action"),
+                                         ("zzz", "All")])
+@pytest.mark.parametrize("limit", [1, 7, 50])
+def test_pages_cover_every_match_once_in_order(index, movie_db, sort, query, genre, limit):
+    rows, _ = walk(index, limit, query=query, genre=genre, sort=sort)
+    assert rows == expected(movie_db, query, genre, sort)
+
+
+def test_counted_and_early_stopping_relevance_pages_agree(movie_db):
+    # a fresh index, so the first walk takes the early-stopping scan (no cached match list)
+    index = SearchIndex(movie_db)
+    fast, _ = walk(index, 9, query="night", sort="relevance")
+    counted, _ = walk(index, 9, query="night", sort="relevance", count=True)
+    assert fast == counted == expected(movie_db, "night", "All", "relevance")
+
+
+def test_last_full_page_has_no_cursor(index, movie_db):
+    total = len(expected(movie_db, "", "Drama", "title"))
+    rows, pages = walk(index, total, genre="Drama", sort="title")
+    assert len(rows) == total and pages == 1
+    _, cursor, count = index.page(genre="Drama", sort="title", limit=total)
+    assert cursor is None and count == total
+
+
+def test_cursor_is_tied_to_its_query(index):
+    _, cursor, _ = index.page(sort="rating", limit=3)
+    with pytest.raises(ValueError, match="different query"):
+        index.page(sort="title", limit=3, cursor=cursor)
+    with pytest.raises(ValueError, match="different query"):
+        index.page(query="star", sort="rating", limit=3, cursor=cursor)
+    with pytest.raises(ValueError, match="malformed"):
+        index.page(sort="rating", limit=3, cursor="not-a-cursor")
+
+
+def test_cursor_is_tied_to_the_catalog_build(index, movie_db):
+    _, cursor, _ = index.page(sort="rating", limit=3)
+    assert SearchIndex(movie_db.copy(), index_overview=True).page(sort="rating", limit=3, cursor=cursor)
+    # Same row count, different contents (a re-fetch or hot reload)
+    rebuilt = movie_db.copy()
+    rebuilt.loc[0, "rating"] = "99"
+    with pytest.raises(ValueError, match="catalog"):
+        SearchIndex(rebuilt, index_overview=True).page(sort="rating", limit=3, cursor=cursor)
+
+
+def test_cursor_survives_new_pages_of_other_queries(index, movie_db):
+    first, cursor, _ = index.page(genre="Drama", sort="rating", limit=5)
+    index.page(query="star", sort="title", limit=5)
+    second, _, _ = index.page(genre="Drama", sort="rating", limit=5, cursor=cursor)
+    assert first + second == expected(movie_db, "", "Drama", "rating")[:10]
+
+
+def test_search_endpoint_pages_and_rejects_bad_cursors(client):
+    body = {"query": "", "genre": "Action", "sort": "title", "limit": 4}
+    first = client.post("/search", json=body).json()
+    second = client.post("/search", json={**body, "cursor": first["next_cursor"]}).json()
+    titles = [m["title"] for m in first["results"] + second["results"]]
+    assert len(titles) == 8 and titles == sorted(titles, key=str.lower)
+    assert client.post("/search", json={**body, "cursor": "garbage"}).status_code == 400
+    assert client.post("/search", json={**body, "sort": "year"}).status_code == 400
@@ -1,72 +1,349 @@
-import os
-os.environ["TF_USE_LEGACY_KERAS"] = "1" # Keep this fix
-
-import tensorflow as tf
-import tensorflow_datasets as tfds
-import tensorflow_recommenders as tfrs
-import numpy as np
-
-# 1. Load Data
-print("Loading data...")
-ratings = tfds.load("movielens/100k-ratings", split="train")
-movies = tfds.load("movielens/100k-movies", split="train")
-
-# 2. Map Data
-ratings = ratings.map(lambda x: {
-    "movie_title": x["movie_title"],
-    "user_id": x["user_id"],
-})
-movies = movies.map(lambda x: x["movie_title"])
-
-# 3. Vocabularies
-print("Building vocabularies...")
-user_ids_vocabulary = tf.keras.layers.StringLookup(mask_token=None)
-user_ids_vocabulary.adapt(ratings.map(lambda x: x["user_id"]))
-
-movie_titles_vocabulary = tf.keras.layers.StringLookup(mask_token=None)
-movie_titles_vocabulary.adapt(movies)
-
-# 4. Model
-class NetflixModel(tfrs.Model):
-    def __init__(self):
-        super().__init__()
-        self.user_model = tf.keras.Sequential([
-            user_ids_vocabulary,
-            tf.keras.layers.Embedding(user_ids_vocabulary.vocabulary_size(), 32)
-        ])
-        self.movie_model = tf.keras.Sequential([
-            movie_titles_vocabulary,
-            tf.keras.layers.Embedding(movie_titles_vocabulary.vocabulary_size(), 32)
-        ])
-        self.task = tfrs.tasks.Retrieval(
-            metrics=tfrs.metrics.FactorizedTopK(
-                candidates=movies.batch(128).map(self.movie_model)
-            )
-        )
-
-    def compute_loss(self, features, training=False):
-        user_embeddings = self.user_model(features["user_id"])
-        movie_embeddings = self.movie_model(features["movie_title"])
-        return self.task(user_embeddings, movie_embeddings)
-
-# 5. Train
-model = NetflixModel()
-model.compile(optimizer=tf.keras.optimizers.Adagrad(learning_rate=0.1))
-print("Training started...")
-model.fit(ratings.batch(4096), epochs=3)
-
-# 6. Save (THE FIX IS HERE)
-print("Building search index...")
-index = tfrs.layers.factorized_top_k.BruteForce(model.user_model)
-index.index_from_dataset(
-  tf.data.Dataset.zip((movies.batch(100), movies.batch(100).map(model.movie_model)))
-)
-
-# --- CRITICAL FIX: Run the model once so it creates the 'serving_default' signature ---
-print("Warming up model to generate signature...")
-_ = index(tf.constant(["42"])) 
-# ------------------------------------------------------------------------------------
-
-save_path = os.path.join(os.getcwd(), "my_model")
-tf.saved_model.save(index, save_path)
-print(f"SUCCESS: Model saved correctly to {save_path}")
\ No newline at end of file
+import os
+import time
+import argparse
+os.environ["TF_USE_LEGACY_KERAS"] = "1" # Keep this fix
+
+import tensorflow as tf
+import tensorflow_recommenders as tfrs
+import numpy as np
+
+from retrieval import save_embeddings, refresh_embeddings, load_embeddings
+from data_pipeline import interactions_dataset, scan_vocabularies, write_shards, ThroughputLogger
+from warm_start import save_checkpoint, load_checkpoint, grow_vocabulary
+from evaluate import leave_last_out, save_holdout
+from features import (GENRES, GENRE_SEP, HISTORY_SEP, MOVIE_FEATURES, STORE_DIR, FeatureScan, add_histories,
+                      catalog_chunks, feature_chunks, merge_candidates, movie_text, movielens_genres,
+                      precompute_candidates, save_trained_inputs, saved_tower_version, serving_features)
+
+parser = argparse.ArgumentParser(description="Train the two-tower model")
+parser.add_argument("--data", default="movielens",
+                    help='"movielens" (tfds 100k) or a glob of TFRecord shards, e.g. "logs/*.tfrecord"')
+parser.add_argument("--batch-size", type=int, default=4096)
+parser.add_argument("--shuffle-buffer", type=int, default=100_000, help="bounded; memory stays flat")
+parser.add_argument("--epochs", type=int, help="default: 3, or 1 with --warm-start")
+parser.add_argument("--export-shards", metavar="DIR",
+                    help="write the MovieLens ratings as TFRecord shards to DIR and exit")
+parser.add_argument("--warm-start", action="store_true",
+                    help="fine-tune the --checkpoint model on --data (the new interactions only)")
+parser.add_argument("--checkpoint", default=os.path.join(os.getcwd(), "my_checkpoint"))
+parser.add_argument("--holdout", metavar="CSV",
+                    help="MovieLens: keep each user's latest rating out of training and write it to CSV "
+                         "for evaluate.py; the export then holds the training titles, not --catalog")
+parser.add_argument("--catalog", default="movies.csv",
+                    help="live catalog whose titles become the serving candidates "
+                         "(training titles if missing or with --holdout)")
+args = parser.parse_args()
+args.epochs = args.epochs or (1 if args.warm_start else 3)
+AUTOTUNE = tf.data.AUTOTUNE
+run_start = time.perf_counter()
+
+# 1. Load Data
+print("Loading data...")
+if args.data == "movielens" or args.export_shards:
+    import tensorflow_datasets as tfds
+    ratings = tfds.load("movielens/100k-ratings", split="train")
+
+    # 2. Map Data (100k rows fit in memory: replay them in time order for the history feature)
+    records = {"user_id": [], "movie_title": [], "genres": [], "timestamp": []}
+    for x in ratings.as_numpy_iterator():
+        records["user_id"].append(x["user_id"].decode("utf-8"))
+        records["movie_title"].append(x["movie_title"].decode("utf-8"))
+        records["genres"].append(movielens_genres(x["movie_genres"]))
+        records["timestamp"].append(int(x["timestamp"]))
+    if args.holdout and not args.export_shards:
+        # Leave-last-out: evaluate.py scores the export on what each user watched next
+        held = leave_last_out(records["user_id"], records["timestamp"])
+        save_holdout(args.holdout, *[[v for v, h in zip(records[name], held) if h]
+                                     for name in ("user_id", "movie_title")])
+        records = {name: [v for v, h in zip(values, held) if not h] for name, values in records.items()}
+        print(f"Held out {int(held.sum())} ratings (each user's latest) to {args.holdout}")
+    records["text"] = [movie_text(title) for title in records["movie_title"]]
+    records["tmdb_id"] = [""] * len(records["movie_title"])   # MovieLens has no TMDB ids
+    records["history"] = add_histories(records["user_id"], records["movie_title"], records["timestamp"])
+    records["timestamp"] = np.asarray(records["timestamp"], dtype=np.int64)
+
+    if args.export_shards:
+        rows = (dict(zip(records, values)) for values in zip(*records.values()))
+        count = write_shards(rows, args.export_shards)
+        print(f"SUCCESS: Wrote {count} ratings to {args.export_shards}")
+        raise SystemExit(0)
+
+    # cache once, reshuffle every epoch
+    ratings = tf.data.Dataset.from_tensor_slices(records)
+    scan_data = ratings.batch(args.batch_size)
+    train_data = (ratings.cache()
+                  .shuffle(args.shuffle_buffer, reshuffle_each_iteration=True)
+                  .batch(args.batch_size)
+                  .prefetch(AUTOTUNE))
+else:
+    # Sharded logs are streamed from disk every epoch (no cache)
+    scan_data = interactions_dataset(args.data, batch_size=args.batch_size)
+    train_data = interactions_dataset(args.data, batch_size=args.batch_size,
+                                      shuffle_buffer=args.shuffle_buffer)
+
+# 3. Vocabularies (one streaming pass instead of an adapt() pass per column)
+print("Building vocabularies...")
+scan = FeatureScan()
+user_ids, movie_titles, num_records = scan_vocabularies(scan_data, on_batch=scan.update)
+candidates = scan.candidates()          # training candidates: every title seen, with its features
+latest_history = scan.histories()       # what the user tower sees at export time
+trained_inputs = scan.trained           # optional movie inputs the data carries (TMDB id, overview)
+print(f"{num_records} interactions, {len(user_ids)} users, {len(movie_titles)} movies")
+
+user_table = movie_table = shared = None
+if args.warm_start:
+    # Old ids keep their rows and trained weights; new ids are appended
+    previous = load_checkpoint(args.checkpoint)
+    user_vocab, user_table, new_users = grow_vocabulary(
+        previous["user_vocab"], previous["user_table"], user_ids)
+    movie_vocab, movie_table, new_movies = grow_vocabulary(
+        previous["movie_vocab"], previous["movie_table"], movie_titles)
+    user_ids, movie_titles = user_vocab[1:], movie_vocab[1:]
+    extra = previous["extra"]
+    shared = {name.split("/", 1)[1]: value for name, value in extra.items() if name.startswith("weights/")}
+    if "candidates/movie_title" in extra:
+        old = {name: extra[f"candidates/{name}"].tolist() for name in MOVIE_FEATURES}
+        candidates = merge_candidates(old, candidates)
+        latest_history = {**dict(zip(extra["history/user_id"].tolist(), extra["history/value"].tolist())),
+                          **latest_history}
+    trained_inputs |= set(previous["meta"].get("trained_inputs", []))
+    print(f"Warm start from {args.checkpoint}: +{new_users} users, +{new_movies} movies")
+
+user_ids_vocabulary = tf.keras.layers.StringLookup(mask_token=None, vocabulary=user_ids)
+movie_titles_vocabulary = tf.keras.layers.StringLookup(mask_token=None, vocabulary=movie_titles)
+genre_lookup = tf.keras.layers.StringLookup(vocabulary=GENRES, mask_token="", output_mode="multi_hot")
+candidate_data = tf.data.Dataset.from_tensor_slices(candidates)
+
+# 4. Model
+# Both towers add up one 32-d vector per feature (see features.py):
+#   user:  user_id embedding + mean of the recent-history title embeddings
+#   movie: title embedding (when in the vocabulary) + genre multi-hot
+#          projection + mean of the hashed text token embeddings + hashed
+#          TMDB id embedding (when known)
+# Text, history and TMDB ids share nothing with the vocabularies, so a
+# catalog title MovieLens never saw still lands near similar movies.
+DIM = 32
+HASH_BINS = 1 << 15
+
+def initializer(table):
+    # table: warm-start weights (one row per vocabulary entry, OOV first, for id embeddings)
+    return "uniform" if table is None else tf.keras.initializers.Constant(table)
+
+def embedding(rows, table=None):
+    return tf.keras.layers.Embedding(rows, DIM, embeddings_initializer=initializer(table))
+
+def hashed(strings):
+    return tf.ragged.map_flat_values(tf.strings.to_hash_bucket_fast, strings, HASH_BINS)
+
+def bag(layer, text, sep=None):
+    # mean embedding of the hashed tokens of each string; "" gives zeros
+    tokens = tf.strings.split(text, sep=sep)
+    vectors = tf.ragged.map_flat_values(layer, hashed(tokens))
+    count = tf.cast(tokens.row_lengths(), tf.float32)[:, None]
+    return tf.reduce_sum(vectors, axis=1) / tf.maximum(count, 1.0)
+
+class UserTower(tf.keras.Model):
+    def __init__(self, user_table=None, shared=None):
+        super().__init__()
+        shared = shared or {}
+        # lookups are attributes so the SavedModel tracks their tables
+        self.id_lookup = user_ids_vocabulary
+        self.id_embedding = embedding(user_ids_vocabulary.vocabulary_size(), user_table)
+        self.history_embedding = embedding(HASH_BINS, shared.get("user_history"))
+
+    def call(self, features):
+        return (self.id_embedding(self.id_lookup(features["user_id"]))
+                + bag(self.history_embedding, features["history"], sep=HISTORY_SEP))
+
+class MovieTower(tf.keras.Model):
+    def __init__(self, movie_table=None, shared=None):
+        super().__init__()
+        shared = shared or {}
+        self.title_lookup = movie_titles_vocabulary
+        self.genre_lookup = genre_lookup
+        self.title_embedding = embedding(movie_titles_vocabulary.vocabulary_size(), movie_table)
+        self.text_embedding = embedding(HASH_BINS, shared.get("movie_text"))
+        self.id_embedding = embedding(HASH_BINS, shared.get("movie_id"))
+        kernel = shared.get("movie_genres")
+        self.genre_projection = tf.keras.layers.Dense(
+            DIM, use_bias=False, kernel_initializer="glorot_uniform" if kernel is None else initializer(kernel))
+
+    def call(self, features):
+        genres = self.genre_lookup(tf.strings.split(features["genres"], sep=GENRE_SEP).to_tensor(""))
+        tmdb_id = features["tmdb_id"]
+        known_id = tf.cast(tmdb_id != "", tf.float32)[:, None]
+        # Titles outside the vocabulary hit the OOV row (0), which training
+        # never updates: mask it so unseen catalog titles do not all share
+        # one random offset and are placed by their content features alone
+        title_ids = self.title_lookup(features["movie_title"])
+        known_title = tf.cast(title_ids != 0, tf.float32)[:, None]
+        return (known_title * self.title_embedding(title_ids)
+                + self.genre_projection(genres)
+                + bag(self.text_embedding, features["text"])
+                + known_id * self.id_embedding(tf.strings.to_hash_bucket_fast(tmdb_id, HASH_BINS)))
+
+class NetflixModel(tfrs.Model):
+    def __init__(self, user_table=None, movie_table=None, shared=None):
+        super().__init__()
+        self.user_model = UserTower(user_table, shared)
+        self.movie_model = MovieTower(movie_table, shared)
+        self.task = tfrs.tasks.Retrieval(
+            metrics=tfrs.metrics.FactorizedTopK(
+                candidates=candidate_data.batch(128).map(self.movie_model)
+            )
+        )
+
+    def compute_loss(self, features, training=False):
+        user_embeddings = self.user_model(features)
+        movie_embeddings = self.movie_model(features)
+        return self.task(user_embeddings, movie_embeddings)
+
+    def shared_weights(self):
+        # everything but the id tables, for the warm-start checkpoint
+        return {
+            "user_history": self.user_model.history_embedding.get_weights()[0],
+            "movie_text": self.movie_model.text_embedding.get_weights()[0],
+            "movie_id": self.movie_model.id_embedding.get_weights()[0],
+            "movie_genres": self.movie_model.genre_projection.get_weights()[0],
+        }
+
+# 5. Train
+model = NetflixModel(user_table, movie_table, shared)
+model.compile(optimizer=tf.keras.optimizers.Adagrad(learning_rate=0.1))
+if args.warm_start:
+    before = model.evaluate(scan_data, return_dict=True, verbose=0)
+print("Training started...")
+model.fit(train_data, epochs=args.epochs, callbacks=[ThroughputLogger(num_records)])
+if args.warm_start:
+    after = model.evaluate(scan_data, return_dict=True, verbose=0)
+    print("Retrieval metrics on the new interactions (before -> after fine-tuning):")
+    for name in sorted(after):
+        if "top" in name:
+            print(f"  {name}: {before[name]:.4f} -> {after[name]:.4f} ({after[name] - before[name]:+.4f})")
+
+# 6. Precompute the serving tables
+# Users: their tower over the latest history. Candidates: the movie tower
+# over the whole live catalog, in batches; serving then only does one
+# matmul against these two tables.
+print("Embedding users...")
+user_vocab = user_ids_vocabulary.get_vocabulary()
+user_data = tf.data.Dataset.from_tensor_slices(
+    {"user_id": user_vocab, "history": [latest_history.get(u, "") for u in user_vocab]})
+user_embeddings = np.concatenate([model.user_model(batch).numpy() for batch in user_data.batch(4096)])
+
+# The movie tower is saved on its own so a refreshed catalog can be
+# re-embedded without retraining: python features.py embed
+tower_path = os.path.join(os.getcwd(), "my_movie_tower")
+serve_movies = tf.function(
+    lambda features: {"embedding": model.movie_model(features)},
+    input_signature=[{name: tf.TensorSpec([None], tf.string, name=name) for name in MOVIE_FEATURES}],
+)
+tf.saved_model.save(model.movie_model, tower_path, signatures={"serving_default": serve_movies})
+save_trained_inputs(tower_path, trained_inputs)
+
+if args.holdout and args.data == "movielens":
+    # The held-out titles are MovieLens titles ("Heat (1995)"), which the
+    # catalog does not use: export the training titles so evaluate.py can
+    # rank them. `python features.py embed` switches back to the catalog.
+    serving_candidates = feature_chunks(candidates)
+    print(f"--holdout: exporting the {len(candidates['movie_title'])} training titles for evaluate.py")
+elif os.path.exists(args.catalog):
+    serving_candidates = catalog_chunks(args.catalog)
+    print(f"Embedding the catalog candidates from {args.catalog}...")
+else:
+    serving_candidates = feature_chunks(candidates)
+    print(f"{args.catalog} not found; serving the {len(candidates['movie_title'])} training titles")
+# Inputs training never saw (MovieLens: TMDB ids, overviews) kept their
+# random init; blank them so they do not add noise to every candidate
+print(f"Trained optional inputs: {', '.join(sorted(trained_inputs)) or 'none'}")
+serving_candidates = (serving_features(chunk, trained_inputs) for chunk in serving_candidates)
+embeddings_path = os.path.join(os.getcwd(), "my_embeddings")
+movie_titles, movie_embeddings, precompute_stats = precompute_candidates(
+    lambda batch: model.movie_model({name: tf.constant(v.astype(str)) for name, v in batch.items()}).numpy(),
+    serving_candidates, saved_tower_version(tower_path), os.path.join(embeddings_path, STORE_DIR),
+    batch_size=4096,
+)
+print(f"{precompute_stats['rows']} candidates ({precompute_stats['embedded']} embedded, "
+      f"{precompute_stats['reused']} unchanged) in {precompute_stats['seconds']:.1f}s")
+
+print("Building search index...")
+# Query side of the SavedModel is the precomputed user table, so it keeps
+# taking plain user_id strings and agrees with the NumPy export
+query_model = tf.keras.Sequential([
+    user_ids_vocabulary,
+    tf.keras.layers.Embedding(len(user_vocab), DIM, embeddings_initializer=initializer(user_embeddings),
+                              trainable=False),
+])
+index = tfrs.layers.factorized_top_k.BruteForce(query_model)
+index.index(tf.constant(movie_embeddings), tf.constant(movie_titles))
+
+# --- CRITICAL FIX: Run the model once so it creates the 'serving_default' signature ---
+print("Warming up model to generate signature...")
+_ = index(tf.constant(["42"]))
+# ------------------------------------------------------------------------------------
+
+save_path = os.path.join(os.getcwd(), "my_model")
+tf.saved_model.save(index, save_path)
+print(f"SUCCESS: Model saved correctly to {save_path}")
+
+# 7. Export flat embedding tables so api.py can serve with NumPy (no TF)
+print("Exporting embeddings...")
+user_weights = model.user_model.id_embedding.get_weights()[0]
+movie_weights = model.movie_model.title_embedding.get_weights()[0]
+refreshed = None
+if args.warm_start and os.path.exists(os.path.join(embeddings_path, "meta.json")):
+    # Keep the saved candidate order and index; re-encode the vectors that moved
+    saved = load_embeddings(embeddings_path, mmap=False)
+    old_vectors = dict(zip(saved["movie_titles"].tolist(), saved["movie_embeddings"]))
+    changed = {title for title, vector in zip(movie_titles, movie_embeddings)
+               if title in old_vectors and not np.array_equal(old_vectors[title], vector)}
+    try:
+        refreshed = refresh_embeddings(
+            embeddings_path,
+            user_ids=user_vocab,
+            user_embeddings=user_embeddings,
+            movie_titles=movie_titles,
+            movie_embeddings=movie_embeddings,
+            changed_titles=changed,
+        )
+        print(f"SUCCESS: Refreshed {refreshed} of {len(movie_titles)} candidates in {embeddings_path}")
+    except ValueError:
+        print("Catalog dropped titles since the last export; rebuilding the index")
+if refreshed is None:
+    save_embeddings(
+        embeddings_path,
+        user_ids=user_vocab,
+        user_embeddings=user_embeddings,
+        movie_titles=movie_titles,
+        movie_embeddings=movie_embeddings,
+        index=os.getenv("RETRIEVAL_INDEX", "brute"),  # "ivfpq" for large catalogs, "int8" for memory
+    )
+    print(f"SUCCESS: Embeddings saved to {embeddings_path}")
+
+# 8. Checkpoint for the next --warm-start run
+seconds = time.perf_counter() - run_start
+full_seconds = previous["meta"].get("full_seconds") if args.warm_start else seconds
+extra = {f"weights/{name}": value for name, value in model.shared_weights().items()}
+extra.update({f"candidates/{name}": np.asarray(candidates[name], dtype=str) for name in MOVIE_FEATURES})
+extra["history/user_id"] = np.asarray(list(latest_history), dtype=str)
+extra["history/value"] = np.asarray(list(latest_history.values()), dtype=str)
+save_checkpoint(
+    args.checkpoint,
+    user_vocab=user_vocab,
+    user_table=user_weights,
+    movie_vocab=movie_titles_vocabulary.get_vocabulary(),
+    movie_table=movie_weights,
+    extra=extra,
+    mode="warm" if args.warm_start else "full",
+    seconds=round(seconds, 1),
+    full_seconds=full_seconds and round(full_seconds, 1),
+    records=num_records,
+    epochs=args.epochs,
+    trained_inputs=sorted(trained_inputs),
+)
+print(f"SUCCESS: Checkpoint saved to {args.checkpoint}")
+if args.warm_start and full_seconds:
+    print(f"⏱️ Warm start took {seconds:.1f}s vs {full_seconds:.1f}s for the last full retrain "
+          f"({full_seconds / seconds:.1f}x faster)")
+else:
+    print(f"⏱️ Total {seconds:.1f}s")
@@ -0,0 +1,111 @@
+import threading
+
+import numpy as np
+
+from catalog import _rating_value
+
+# ==========================================
+# TRENDING / FALLBACK PICKS
+# ==========================================
+# Used to top up /recommend when the model returns too few known titles.
+# Everything is computed once at load:
+#   score      0.7 * popularity + 0.3 * rating, where popularity comes from
+#              catalog order (fetch_real_data.py writes TMDB's popular list
+#              best first) and rating is the 0-100 vote average
+#   pools      top_n rows overall and per genre, best first, as ready-made
+#              response dicts plus cumulative score arrays
+# A request then only draws a few weighted samples (searchsorted on the
+# cumulative array) and slices preformatted dicts; no pandas, no formatting.
+
+BACKFILL_MODES = ("trending", "genre")
+
+
+def _scores(ratings):
+    n = len(ratings)
+    popularity = 1.0 - np.arange(n) / max(n, 1)
+    # Missing or unparseable ratings (the CSV path keeps raw strings) count as 50
+    rating = np.array([_rating_value(r) for r in ratings])
+    rating = np.where(rating < 0, 50.0, rating) / 100.0
+    return 0.7 * popularity + 0.3 * rating
+
+
+class _Pool:
+    def __init__(self, rows, scores, formatted):
+        order = rows[np.argsort(-scores[rows], kind="stable")]
+        self.items = [formatted(int(i)) for i in order]
+        self.titles = [item["title"] for item in self.items]
+        self.cumulative = np.cumsum(scores[order])
+
+
+class TrendingIndex:
+    """
+    rows: (title, poster_path, rating) sequence (catalog.row_tuples).
+    top_n: pool size overall and per genre.
+    """
+
+    def __init__(self, movie_db, rows, top_n=200, seed=None):
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self.pools = {}
+        self.genres = []
+        if movie_db is None or len(movie_db) == 0:
+            return
+
+        ratings = movie_db["rating"].tolist() if "rating" in movie_db.columns else [""] * len(rows)
+        scores = _scores(ratings)
+        self.genres = movie_db["genre"].tolist() if "genre" in movie_db.columns else []
+
+        def formatted(i):
+            title, poster_path, rating = rows[i]
+            return {"title": title, "poster_path": poster_path, "rating": f"{rating}% Match"}
+
+        def top(candidates):
+            if len(candidates) > top_n:
+                candidates = candidates[np.argpartition(-scores[candidates], top_n - 1)[:top_n]]
+            return _Pool(candidates, scores, formatted)
+
+        self.pools[None] = top(np.arange(len(rows)))
+        by_genre = {}
+        for i, genre in enumerate(self.genres):
+            if genre:
+                by_genre.setdefault(genre, []).append(i)
+        for genre, members in by_genre.items():
+            self.pools[genre] = top(np.array(members))
+
+    def top(self, n, genre=None):
+        pool = self.pools.get(genre) or self.pools.get(None)
+        return pool.items[:n] if pool else []
+
+    def sample(self, n, genre=None, exclude=()):
+        """
+        n distinct picks, weighted by score, from the genre pool (or overall).
+        Titles in `exclude` are skipped; short pools are topped up from the
+        overall pool.
+        """
+        picks, seen = [], set(exclude)
+        for key in ([genre, None] if genre else [None]):
+            pool = self.pools.get(key)
+            if pool is None:
+                continue
+            with self._lock:
+                draws = self._rng.random(4 * n) * pool.cumulative[-1]
+            order = np.searchsorted(pool.cumulative, draws, side="right").tolist()
+            # Weighted draws first, then the pool in rank order if draws collided
+            for i in order + list(range(len(pool.items))):
+                if len(picks) == n:
+                    return picks
+                if i < len(pool.items) and pool.titles[i] not in seen:
+                    seen.add(pool.titles[i])
+                    picks.append(pool.items[i])
+        return picks
+
+    def dominant_genre(self, rows):
+        """
+        Most common genre among catalog rows (e.g. the model's picks), or None.
+        """
+        counts = {}
+        for row in rows:
+            genre = self.genres[row] if row < len(self.genres) else ""
+            if genre:
+                counts[genre] = counts.get(genre, 0) + 1
+        return max(counts, key=counts.get) if counts else None
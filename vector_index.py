@@ -0,0 +1,384 @@
+import os
+import time
+
+import numpy as np
+
+# ==========================================
+# VECTOR INDEXES FOR MAXIMUM INNER PRODUCT SEARCH
+# ==========================================
+#   "brute" - exact: one matmul over every candidate (the tfrs BruteForce baseline)
+#   "ivfpq" - approximate: inverted file over k-means lists + product-quantized
+#             residuals, scored with per-query lookup tables (asymmetric distance)
+#   "int8" / "float16"
+#           - brute force over a compressed copy of the candidates (int8 with a
+#             per-row scale, or half precision), float32 re-rank of the shortlist
+#
+# Every index has search(queries [n, d], k) -> (scores [n, k], ids [n, k]),
+# update(ids, vectors) for changed rows, nbytes() and save(path);
+# load_index(path) reads either kind back.
+
+INDEX_KINDS = ("brute", "ivfpq", "int8", "float16")
+QUANTIZED_KINDS = ("int8", "float16")
+
+
+def save_atomic(path, write):
+    """
+    Runs write(file) against a temp file next to `path`, then renames it into
+    place. The API memory-maps these files; overwriting one in place would
+    pull pages out from under a live mapping (SIGBUS), a rename leaves the
+    old inode alive until it is unmapped.
+    """
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def top_k(scores, k):
+    """
+    Row-wise top-k of a [n, M] score matrix, best first.
+    argpartition is O(M) per row; only the k survivors get sorted.
+    """
+    k = min(k, scores.shape[1])
+    if k == scores.shape[1]:
+        idx = np.argsort(-scores, axis=1)
+    else:
+        idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, idx, axis=1), axis=1)
+        idx = np.take_along_axis(idx, order, axis=1)
+    return np.take_along_axis(scores, idx, axis=1), idx
+
+
+def kmeans(x, n_clusters, n_iter=20, sample=100_000, seed=0):
+    """
+    Plain Lloyd's k-means on (a sample of) x. Returns [n_clusters, d] centroids.
+    """
+    rng = np.random.default_rng(seed)
+    if len(x) > sample:
+        x = x[rng.choice(len(x), sample, replace=False)]
+    n_clusters = min(n_clusters, len(x))
+    centroids = x[rng.choice(len(x), n_clusters, replace=False)].copy()
+
+    for _ in range(n_iter):
+        assign = nearest(x, centroids)
+        sums = np.stack([np.bincount(assign, weights=x[:, j], minlength=n_clusters)
+                         for j in range(x.shape[1])], axis=1)
+        counts = np.bincount(assign, minlength=n_clusters)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        # Re-seed empty clusters on random points so no list stays unused
+        if not filled.all():
+            centroids[~filled] = x[rng.choice(len(x), int((~filled).sum()))]
+    return centroids
+
+
+def nearest(x, centroids, chunk=65536):
+    """
+    Index of the closest centroid (L2) for every row of x, in chunks.
+    """
+    c_norms = (centroids ** 2).sum(axis=1)
+    out = np.empty(len(x), dtype=np.int32)
+    for start in range(0, len(x), chunk):
+        block = x[start:start + chunk]
+        out[start:start + chunk] = np.argmin(c_norms - 2 * block @ centroids.T, axis=1)
+    return out
+
+
+def pq_encode(residuals, codebooks):
+    """
+    uint8 code of the nearest codeword for every sub-vector of every row.
+    """
+    m, _, sub = codebooks.shape
+    codes = np.empty((len(residuals), m), dtype=np.uint8)
+    for j in range(m):
+        codes[:, j] = nearest(residuals[:, j * sub:(j + 1) * sub], codebooks[j])
+    return codes
+
+
+class BruteForceIndex:
+    kind = "brute"
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def search(self, queries, k):
+        return top_k(queries @ self.vectors.T, k)
+
+    def nbytes(self):
+        return self.vectors.nbytes
+
+    def update(self, ids, vectors=None):
+        if vectors is not None:
+            self.vectors = vectors
+        return len(ids)
+
+    def save(self, path):
+        # Brute force scores the raw table; nothing extra to store
+        pass
+
+
+class IVFPQIndex:
+    """
+    IVF with product quantization.
+    n_lists: coarse k-means lists; n_probe: lists scanned per query;
+    n_subvectors: PQ splits of each residual (dim must divide evenly),
+    each coded with 256 centroids -> one uint8 per subvector.
+    refine: when the raw vectors are attached, the best k * refine PQ
+    candidates are re-scored exactly before the final top-k.
+    """
+    kind = "ivfpq"
+
+    def __init__(self, centroids, codebooks, codes, list_ids, list_offsets, n_probe=16,
+                 vectors=None, refine=4):
+        self.centroids = centroids          # [n_lists, d]
+        self.codebooks = codebooks          # [m, 256, d/m]
+        self.codes = codes                  # [M, m] uint8, grouped by list
+        self.list_ids = list_ids            # [M] original candidate id, grouped by list
+        self.list_offsets = list_offsets    # [n_lists + 1]
+        self.n_probe = n_probe
+        self.vectors = vectors
+        self.refine = refine
+
+    @classmethod
+    def build(cls, vectors, n_lists=None, n_subvectors=8, n_probe=16, refine=4, seed=0):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        n, dim = vectors.shape
+        if dim % n_subvectors:
+            raise ValueError(f"dim {dim} is not divisible by n_subvectors {n_subvectors}")
+        n_lists = n_lists or max(1, int(np.sqrt(n)))
+
+        centroids = kmeans(vectors, n_lists, seed=seed).astype(np.float32)
+        assign = nearest(vectors, centroids)
+        residuals = vectors - centroids[assign]
+
+        sub = dim // n_subvectors
+        codebooks = np.zeros((n_subvectors, 256, sub), dtype=np.float32)
+        for m in range(n_subvectors):
+            part = residuals[:, m * sub:(m + 1) * sub]
+            # 64 training points per codeword is plenty for 256-entry codebooks
+            book = kmeans(part, 256, sample=256 * 64, seed=seed + m + 1)
+            codebooks[m, :len(book)] = book
+        codes = pq_encode(residuals, codebooks)
+
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=len(centroids))
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        return cls(centroids, codebooks, codes[order], order.astype(np.int32), offsets,
+                   n_probe, vectors=vectors, refine=refine)
+
+    def update(self, ids, vectors=None):
+        """
+        Re-encodes candidates `ids` (changed or appended rows of `vectors`)
+        with the existing centroids and codebooks and moves them to their
+        new lists. No k-means retraining, so cost is O(changed + M) memcpy.
+        Returns the number of rows updated.
+        """
+        if vectors is not None:
+            self.vectors = vectors
+        if self.vectors is None:
+            raise ValueError("update() needs the raw vectors")
+        ids = np.unique(np.asarray(ids, dtype=np.int64))
+        if not len(ids):
+            return 0
+        fresh = np.asarray(self.vectors[ids], dtype=np.float32)
+        assign = nearest(fresh, self.centroids)
+        codes = pq_encode(fresh - self.centroids[assign], self.codebooks)
+
+        n_lists = len(self.centroids)
+        lists = np.repeat(np.arange(n_lists), np.diff(self.list_offsets))
+        keep = ~np.isin(self.list_ids, ids)
+        lists = np.concatenate([lists[keep], assign])
+        order = np.argsort(lists, kind="stable")
+        self.codes = np.concatenate([self.codes[keep], codes])[order]
+        self.list_ids = np.concatenate([self.list_ids[keep], ids.astype(self.list_ids.dtype)])[order]
+        counts = np.bincount(lists, minlength=n_lists)
+        self.list_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        return len(ids)
+
+    def search(self, queries, k):
+        n_probe = min(self.n_probe, len(self.centroids))
+        m, _, sub = self.codebooks.shape
+        shortlist = k * self.refine if self.vectors is not None and self.refine > 1 else k
+        coarse = queries @ self.centroids.T
+        probes = np.argpartition(-coarse, n_probe - 1, axis=1)[:, :n_probe]
+
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        ids = np.full((len(queries), k), -1, dtype=np.int64)  # -1: fewer than k candidates probed
+        for qi, query in enumerate(queries):
+            # Lookup table: query sub-vector . every codeword, [m, 256]
+            lut = np.einsum("ms,mcs->mc", query.reshape(m, sub), self.codebooks)
+            parts, bias = [], []
+            for lst in probes[qi]:
+                start, end = self.list_offsets[lst], self.list_offsets[lst + 1]
+                if end > start:
+                    parts.append(np.arange(start, end))
+                    bias.append(np.full(end - start, coarse[qi, lst], dtype=np.float32))
+            if not parts:
+                continue
+            rows = np.concatenate(parts)
+            approx = np.concatenate(bias) + lut[np.arange(m), self.codes[rows]].sum(axis=1)
+            best_scores, best = top_k(approx[None, :], shortlist)
+            best_scores, best_ids = best_scores[0], self.list_ids[rows[best[0]]]
+            if shortlist > k:
+                exact, order = top_k((self.vectors[best_ids] @ query)[None, :], k)
+                best_scores, best_ids = exact[0], best_ids[order[0]]
+            found = len(best_ids)
+            scores[qi, :found] = best_scores
+            ids[qi, :found] = best_ids
+        return scores, ids
+
+    def nbytes(self):
+        # Attached raw vectors are the shared embedding table, not index memory
+        return sum(a.nbytes for a in (self.centroids, self.codebooks, self.codes,
+                                      self.list_ids, self.list_offsets))
+
+    def save(self, path):
+        save_atomic(path, lambda f: np.savez(f, centroids=self.centroids, codebooks=self.codebooks,
+                                             codes=self.codes, list_ids=self.list_ids,
+                                             list_offsets=self.list_offsets, n_probe=np.int64(self.n_probe)))
+
+    @classmethod
+    def load(cls, path, vectors=None):
+        data = np.load(path)
+        return cls(data["centroids"], data["codebooks"], data["codes"],
+                   data["list_ids"], data["list_offsets"], int(data["n_probe"]),
+                   vectors=vectors)
+
+
+def quantize_int8(vectors):
+    """
+    Symmetric per-row quantization: row ~= codes * scale, scale = max|row| / 127.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+class QuantizedIndex:
+    """
+    Exact-style brute force over quantized candidates: int8 (1 byte per
+    dim + a float32 scale per row, ~4x smaller) or float16 (2x smaller).
+    Queries stay float32; candidates are widened to float32 `chunk` rows
+    at a time (NumPy has no int8 GEMM), so no full-precision copy of the
+    table is ever materialized. The best k * refine per query are then
+    re-scored against the float32 table when it is attached (memory-mapped,
+    so only the shortlisted rows are read).
+    """
+
+    def __init__(self, kind, codes, scales=None, vectors=None, refine=4, chunk=16384):
+        if kind not in QUANTIZED_KINDS:
+            raise ValueError(f"Unknown quantized kind {kind!r}, expected one of {QUANTIZED_KINDS}")
+        self.kind = kind
+        self.codes = codes          # [M, d] int8 or float16
+        self.scales = scales        # [M] float32 (int8 only)
+        self.vectors = vectors
+        self.refine = refine
+        self.chunk = chunk
+
+    @classmethod
+    def build(cls, kind, vectors, refine=4):
+        if kind == "int8":
+            codes, scales = quantize_int8(vectors)
+            return cls(kind, codes, scales, vectors=vectors, refine=refine)
+        return cls(kind, np.asarray(vectors, dtype=np.float16), vectors=vectors, refine=refine)
+
+    def search(self, queries, k):
+        queries = np.asarray(queries, dtype=np.float32)
+        total = len(self.codes)
+        exact = self.vectors is not None and self.refine > 1
+        shortlist = min(k * self.refine if exact else k, total)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        best_ids = np.empty((len(queries), 0), dtype=np.int64)
+        for start in range(0, total, self.chunk):
+            block = self.codes[start:start + self.chunk].astype(np.float32)
+            scores = queries @ block.T
+            if self.scales is not None:
+                scores *= self.scales[start:start + self.chunk]
+            scores, ids = top_k(scores, shortlist)
+            # Merge with the running shortlist from earlier chunks
+            best_scores, order = top_k(np.concatenate([best_scores, scores], axis=1), shortlist)
+            best_ids = np.take_along_axis(np.concatenate([best_ids, ids + start], axis=1), order, axis=1)
+        if exact and shortlist > k:
+            rescored = np.einsum("nd,nkd->nk", queries, np.asarray(self.vectors[best_ids], dtype=np.float32))
+            best_scores, order = top_k(rescored, k)
+            best_ids = np.take_along_axis(best_ids, order, axis=1)
+        return best_scores[:, :k], best_ids[:, :k]
+
+    def update(self, ids, vectors=None):
+        """
+        Re-quantizes changed rows and appends new ones (rows past the end).
+        """
+        if vectors is not None:
+            self.vectors = vectors
+        if self.vectors is None:
+            raise ValueError("update() needs the raw vectors")
+        ids = np.unique(np.asarray(ids, dtype=np.int64))
+        if not len(ids):
+            return 0
+        grow = len(self.vectors) - len(self.codes)
+        if grow > 0:
+            self.codes = np.concatenate([self.codes, np.zeros((grow, self.codes.shape[1]), self.codes.dtype)])
+            if self.scales is not None:
+                self.scales = np.concatenate([self.scales, np.ones(grow, np.float32)])
+        fresh = np.asarray(self.vectors[ids], dtype=np.float32)
+        if self.kind == "int8":
+            self.codes[ids], self.scales[ids] = quantize_int8(fresh)
+        else:
+            self.codes[ids] = fresh.astype(np.float16)
+        return len(ids)
+
+    def nbytes(self):
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def save(self, path):
+        arrays = {"codes": self.codes, "refine": np.int64(self.refine)}
+        if self.scales is not None:
+            arrays["scales"] = self.scales
+        save_atomic(path, lambda f: np.savez(f, **arrays))
+
+    @classmethod
+    def load(cls, path, kind, vectors=None):
+        data = np.load(path)
+        scales = data["scales"] if "scales" in data.files else None
+        return cls(kind, data["codes"], scales, vectors=vectors, refine=int(data["refine"]))
+
+
+def index_file(embeddings_path, kind):
+    return os.path.join(embeddings_path, f"index_{kind}.npz")
+
+
+def build_index(kind, vectors, **params):
+    if kind == "brute":
+        return BruteForceIndex(vectors)
+    if kind == "ivfpq":
+        return IVFPQIndex.build(vectors, **params)
+    if kind in QUANTIZED_KINDS:
+        return QuantizedIndex.build(kind, vectors, **params)
+    raise ValueError(f"Unknown index kind {kind!r}, expected one of {INDEX_KINDS}")
+
+
+def load_index(embeddings_path, kind, vectors, n_probe=None):
+    """
+    Loads a saved index next to the embeddings, building it if it was never saved.
+    """
+    if kind == "brute":
+        return BruteForceIndex(vectors)
+    path = index_file(embeddings_path, kind)
+    if os.path.exists(path):
+        if kind in QUANTIZED_KINDS:
+            index = QuantizedIndex.load(path, kind, vectors=vectors)
+        else:
+            index = IVFPQIndex.load(path, vectors=vectors)
+    else:
+        start = time.perf_counter()
+        index = build_index(kind, vectors)
+        print(f"⚠️ No saved {kind} index, built one in {time.perf_counter() - start:.1f}s")
+    if n_probe and kind == "ivfpq":
+        index.n_probe = n_probe
+    return index
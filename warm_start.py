@@ -0,0 +1,64 @@
+import json
+import os
+
+import numpy as np
+
+# ==========================================
+# WARM-START CHECKPOINTS
+# ==========================================
+# train.py keeps the trainable state of both towers here so the next run
+# can fine-tune on new interactions instead of retraining from scratch:
+#   user_vocab.npy  / user_table.npy    StringLookup vocabulary (row 0 = OOV) + Embedding weights
+#   movie_vocab.npy / movie_table.npy   same for the movie tower
+#   extra.npz                           everything else train.py hands over: the shared
+#                                       content / history layer weights and the
+#                                       candidate features (see features.py)
+#   meta.json                           how the last run trained (mode, seconds, records, ...)
+# Vocabularies only ever grow: existing ids keep their row, new ids are
+# appended, so embedding rows stay aligned across runs.
+
+
+def save_checkpoint(path, user_vocab, user_table, movie_vocab, movie_table, extra=None, **meta):
+    os.makedirs(path, exist_ok=True)
+    if len(user_vocab) != len(user_table) or len(movie_vocab) != len(movie_table):
+        raise ValueError("vocabulary and embedding table sizes differ")
+    np.save(os.path.join(path, "user_vocab.npy"), np.asarray(user_vocab, dtype=str))
+    np.save(os.path.join(path, "user_table.npy"), np.asarray(user_table, dtype=np.float32))
+    np.save(os.path.join(path, "movie_vocab.npy"), np.asarray(movie_vocab, dtype=str))
+    np.save(os.path.join(path, "movie_table.npy"), np.asarray(movie_table, dtype=np.float32))
+    np.savez(os.path.join(path, "extra.npz"), **{name: np.asarray(v) for name, v in (extra or {}).items()})
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+
+
+def load_checkpoint(path):
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    extra = {}
+    if os.path.exists(os.path.join(path, "extra.npz")):
+        with np.load(os.path.join(path, "extra.npz")) as saved:
+            extra = {name: saved[name] for name in saved.files}
+    return {
+        "user_vocab": np.load(os.path.join(path, "user_vocab.npy")).tolist(),
+        "user_table": np.load(os.path.join(path, "user_table.npy")),
+        "movie_vocab": np.load(os.path.join(path, "movie_vocab.npy")).tolist(),
+        "movie_table": np.load(os.path.join(path, "movie_table.npy")),
+        "extra": extra,
+        "meta": meta,
+    }
+
+
+def grow_vocabulary(vocab, table, seen, seed=0):
+    """
+    Appends ids from `seen` that are not in `vocab` yet.
+    Old rows are copied as-is; new rows get Keras' default Embedding init
+    (uniform +-0.05). Returns (vocab, table, number of new ids).
+    """
+    known = set(vocab)
+    new_ids = [i for i in seen if i not in known]
+    if not new_ids:
+        return list(vocab), np.array(table, dtype=np.float32), 0
+    rng = np.random.default_rng(seed)
+    new_rows = rng.uniform(-0.05, 0.05, (len(new_ids), table.shape[1])).astype(np.float32)
+    return list(vocab) + new_ids, np.concatenate([table, new_rows]).astype(np.float32), len(new_ids)
+